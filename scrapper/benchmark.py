@@ -0,0 +1,253 @@
+import argparse
+import gc
+import hashlib
+import json
+import multiprocessing
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Any, List, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then left out
+    resource = None
+
+import main
+import serialization
+from fixtures import FIXTURE_DIR, load_fixtures
+from parsing import SOUP_BACKENDS, available_backends, parse_html
+
+# Times the parse step, every extract_* function and the whole pipeline on the committed
+# fixtures (see fixtures.py), and writes the numbers as JSON for comparison between commits.
+# The report records a digest of every fixture, and runs are only compared on pages whose
+# HTML was the same.
+# Usage: python benchmark.py -o before.json ... python benchmark.py --compare before.json
+
+# Each extractor as a function of (soup, url)
+EXTRACTORS: Dict[str, Callable[[Any, str], Any]] = {
+    "is_disambiguation_page": lambda soup, url: main.is_disambiguation_page(soup),
+    "extract_page_metadata": main.extract_page_metadata,
+    "extract_infobox_and_determine_type": lambda soup, url: main.extract_infobox_and_determine_type(soup),
+    "extract_introduction": lambda soup, url: main.extract_introduction(soup),
+    "extract_table_of_contents": lambda soup, url: main.extract_table_of_contents(soup),
+    "extract_sections": lambda soup, url: main.extract_sections(soup),
+    "extract_images": lambda soup, url: main.extract_images(soup),
+    "extract_tables": lambda soup, url: main.extract_tables(soup),
+    "extract_references": lambda soup, url: main.extract_references(soup),
+    "extract_categories": lambda soup, url: main.extract_categories(soup),
+    "extract_external_links": lambda soup, url: main.extract_external_links(soup),
+    "extract_related_pages": lambda soup, url: main.extract_related_pages(soup),
+    "extract_coordinates": lambda soup, url: main.extract_coordinates(soup),
+    "extract_language_links": lambda soup, url: main.extract_language_links(soup),
+    "extract_lists": lambda soup, url: main.extract_lists(soup),
+    "extract_disambiguation": lambda soup, url: main.extract_disambiguation(soup),
+    "extract_taxonomic_data": lambda soup, url: main.extract_taxonomic_data(soup),
+    "extract_media": lambda soup, url: main.extract_media(soup),
+    "extract_page_stats": lambda soup, url: main.extract_page_stats(soup),
+}
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Run func `repeat` times and return its min and median wall time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"min_ms": round(min(timings), 3), "median_ms": round(statistics.median(timings), 3)}
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Peak bytes allocated by Python while running func."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _status_bytes(field: str) -> Optional[int]:
+    """A memory figure from /proc/self/status (Linux), in bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _request_rss(html_content: str, url: str, backend: str) -> int:
+    gc.collect()
+    try:
+        # Reset the peak to the current size, so earlier peaks (imports) don't hide this one
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before = _status_bytes("VmRSS")
+    except OSError:
+        before = None
+    if before is None:
+        # Without /proc, only growth beyond the peak so far shows up
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        main.build_page_result(html_content, url, backend)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024) - before
+    main.build_page_result(html_content, url, backend)
+    return _status_bytes("VmHWM") - before
+
+
+def peak_rss(html_content: str, url: str, backend: str) -> Optional[int]:
+    """Bytes the peak resident set grows by while one request is extracted.
+
+    Each measurement runs in a fresh process, since the peak of this one never goes down.
+    """
+    if resource is None:
+        return None
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_request_rss, (html_content, url, backend))
+
+
+def benchmark_page(title: str, html_content: str, backend: str, repeat: int) -> Dict[str, Any]:
+    url = f"https://en.wikipedia.org/wiki/{title}"
+    # The extract_* functions need a complete soup; the native backend only builds part of one
+    soup_backend = backend if backend in SOUP_BACKENDS else "lxml"
+    soup = parse_html(html_content, soup_backend).soup
+    page = parse_html(html_content, backend)
+
+    result = main.build_page_result(html_content, url, backend)
+    return {
+        "html_bytes": len(html_content.encode('utf-8')),
+        "parse": time_call(lambda: parse_html(html_content, backend), repeat),
+        "walk": time_call(lambda: page.walk(), repeat),
+        "extractors": {name: time_call(lambda: extract(soup, url), repeat) for name, extract in EXTRACTORS.items()},
+        "pipeline": time_call(lambda: main.build_page_result(html_content, url, backend), repeat),
+        "pipeline_peak_bytes": peak_memory(lambda: main.build_page_result(html_content, url, backend)),
+        "pipeline_peak_rss_bytes": peak_rss(html_content, url, backend),
+        "serialization": benchmark_serialization(result, repeat),
+    }
+
+
+def benchmark_serialization(result: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """Time and size of the result in each response encoding, and of the JSON body compressed."""
+    encoders = {"application/json (stdlib)": serialization.stdlib_json}
+    for media_type, encode in serialization.ENCODERS.items():
+        if encode not in encoders.values():  # skip aliases such as application/x-msgpack
+            encoders[media_type] = encode
+    encodings = {}
+    for media_type, encode in encoders.items():
+        encodings[media_type] = dict(time_call(lambda: encode(result), repeat), bytes=len(encode(result)))
+    body = serialization.fast_json(result)
+    compression = {}
+    for coding, compress in serialization.COMPRESSORS.items():
+        compression[coding] = dict(time_call(lambda: compress(body), repeat), bytes=len(compress(body)))
+    return {"encodings": encodings, "json_compression": compression}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def fixture_digest(html_content: str) -> str:
+    return hashlib.sha1(html_content.encode("utf-8")).hexdigest()[:16]
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """Format per-page pipeline timings of two runs side by side."""
+    lines = []
+    changed = sorted(title for title, digest in after.get("fixtures", {}).items()
+                     if before.get("fixtures", {}).get(title) not in (None, digest))
+    if changed:
+        lines.append(f"not compared, the fixture HTML differs: {', '.join(changed)}")
+    for backend, pages in after["results"].items():
+        for title, stats in pages.items():
+            old = before["results"].get(backend, {}).get(title)
+            if not old or title in changed:
+                continue
+            old_ms, new_ms = old["pipeline"]["median_ms"], stats["pipeline"]["median_ms"]
+            change = (new_ms - old_ms) / old_ms * 100 if old_ms else 0.0
+            lines.append(f"{backend:<12} {title:<32} {old_ms:>10.1f} ms -> {new_ms:>10.1f} ms ({change:+.1f}%)")
+    return lines
+
+
+def memory_summary(report: Dict[str, Any]) -> List[str]:
+    """Format peak memory per request for every backend, e.g. lxml against lxml-scoped."""
+    lines = []
+    for backend, pages in report["results"].items():
+        for title, stats in pages.items():
+            rss = stats.get("pipeline_peak_rss_bytes")
+            rss_text = "n/a" if rss is None else f"{rss / 1048576:.1f} MiB"
+            lines.append(f"{backend:<12} {title:<32} peak RSS {rss_text:>10}  "
+                         f"peak Python allocations {stats['pipeline_peak_bytes'] / 1048576:.1f} MiB")
+    return lines
+
+
+def serialization_summary(report: Dict[str, Any]) -> List[str]:
+    """Format serialization time and wire size per encoding against stdlib JSON."""
+    lines = []
+    for backend, pages in report["results"].items():
+        for title, stats in pages.items():
+            encodings = stats["serialization"]["encodings"]
+            rows = list(encodings.items())
+            # Compressed bodies cost the fast JSON encoding plus the compression
+            for coding, compressed in stats["serialization"]["json_compression"].items():
+                total_ms = encodings["application/json"]["median_ms"] + compressed["median_ms"]
+                rows.append((f"application/json + {coding}", dict(compressed, median_ms=round(total_ms, 3))))
+            baseline_bytes = encodings["application/json (stdlib)"]["bytes"]
+            for name, timing in rows:
+                lines.append(f"{backend:<12} {title:<32} {name:<28} {timing['median_ms']:>8.2f} ms "
+                             f"{timing['bytes']:>10} bytes ({timing['bytes'] / baseline_bytes * 100:5.1f}%)")
+    return lines
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline on saved fixtures")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="directory of saved article HTML")
+    parser.add_argument("--backend", action="append", help="parser backend (default: all available)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare this run with")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures in {args.fixtures}", file=sys.stderr)
+        return 1
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "fixtures": {title: fixture_digest(html_content) for title, html_content in fixtures.items()},
+        "results": {
+            backend: {title: benchmark_page(title, html_content, backend, args.repeat)
+                      for title, html_content in fixtures.items()}
+            for backend in (args.backend or available_backends())
+        },
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    print("\n".join(serialization_summary(report)), file=sys.stderr)
+    print("\n".join(memory_summary(report)), file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), report)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Dict, Any, Iterator, Optional, Set, Tuple
+
+from main import build_page_result, resolve_fields
+from models import model_fields
+from result_cache import page_identity
+
+try:
+    from warcio.archiveiterator import ArchiveIterator # type: ignore
+except ImportError:  # warcio is only needed for WARC input
+    ArchiveIterator = None
+
+# Runs the extraction pipeline over saved article HTML, without the API or the network.
+# Usage: python bulk.py <html directory | archive.warc[.gz]> -o results.jsonl [-j WORKERS]
+
+HTML_EXTENSIONS = ('.html', '.htm')
+
+
+def iter_directory(directory: str) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Yield (record id, path, None) for every HTML file below a directory."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.lower().endswith(HTML_EXTENSIONS):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory), path, None
+
+
+def iter_warc(warc_path: str) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Yield (target URI, None, html) for every HTML response record in a WARC file."""
+    if ArchiveIterator is None:
+        raise SystemExit("Reading WARC files needs the warcio package")
+    with open(warc_path, 'rb') as stream:
+        for record in ArchiveIterator(stream):
+            if record.rec_type != 'response' or not record.http_headers:
+                continue
+            if 'html' not in (record.http_headers.get_header('Content-Type') or ''):
+                continue
+            uri = record.rec_headers.get_header('WARC-Target-URI')
+            html_content = record.content_stream().read().decode('utf-8', errors='replace')
+            yield uri, None, html_content
+
+
+def page_url(record_id: str, html_content: str) -> str:
+    """Best URL for a saved page: its canonical link, else one derived from the record id."""
+    identity = page_identity(html_content)
+    if identity:
+        return f"https://en.wikipedia.org/wiki/{identity[0]}"
+    if record_id.startswith('http'):
+        return record_id
+    title = os.path.splitext(os.path.basename(record_id))[0]
+    return f"https://en.wikipedia.org/wiki/{title}"
+
+
+# Set in each worker process by _init_worker
+_worker_options: Dict[str, Any] = {}
+
+
+def _init_worker(fields: Optional[Set[str]], parser_backend: Optional[str]):
+    _worker_options["fields"] = fields
+    _worker_options["parser_backend"] = parser_backend
+
+
+def process_record(item: Tuple[str, Optional[str], Optional[str]]) -> Tuple[bool, str]:
+    """Extract one page and return (succeeded, JSONL record)."""
+    record_id, path, html_content = item
+    try:
+        if html_content is None:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                html_content = f.read()
+        url = page_url(record_id, html_content)
+        result = build_page_result(html_content, url, _worker_options.get("parser_backend"), _worker_options.get("fields"))
+        record = {"id": record_id, "url": url, "result": result}
+    except Exception as e:
+        record = {"id": record_id, "error": f"{type(e).__name__}: {e}"}
+    return "result" in record, json.dumps(record, ensure_ascii=False, default=model_fields)
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Return the ids of pages already extracted into the output file.
+
+    A partly written last line is dropped, and so are error records, so that pages which
+    failed (a timeout, say) are extracted again on resume.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    valid_bytes = errors = 0
+    with open(output_path, 'rb') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                record_id = record["id"]
+            except (ValueError, KeyError):
+                break
+            if not line.endswith(b"\n"):
+                break
+            valid_bytes += len(line)
+            if "result" in record:
+                done.add(record_id)
+            else:
+                errors += 1
+    if not errors:
+        with open(output_path, 'r+b') as f:
+            f.truncate(valid_bytes)
+        return done
+    # Copy the complete result records over the old file
+    with open(output_path, 'rb') as f, open(output_path + ".tmp", 'wb') as out:
+        for line in f:
+            if valid_bytes <= 0:
+                break
+            valid_bytes -= len(line)
+            if b'"result"' in line and "result" in json.loads(line):
+                out.write(line)
+    os.replace(output_path + ".tmp", output_path)
+    return done
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Extract saved Wikipedia article HTML to JSONL")
+    parser.add_argument("input", help="directory of .html files, or a .warc / .warc.gz file")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to write (resumed if it exists)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--fields", help="comma-separated result fields to keep")
+    parser.add_argument("--exclude", help="comma-separated result fields to leave out")
+    parser.add_argument("--parser", dest="parser_backend", help="parser backend (see parsing.py)")
+    parser.add_argument("--chunksize", type=int, default=8, help="pages sent to a worker at a time")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress reports")
+    args = parser.parse_args()
+
+    try:
+        fields = resolve_fields(args.fields, args.exclude)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if os.path.isdir(args.input):
+        records = iter_directory(args.input)
+    else:
+        records = iter_warc(args.input)
+
+    # Records already in the output are skipped, so an interrupted run can be restarted;
+    # pages that failed are tried again
+    done = load_checkpoint(args.output)
+    if done:
+        print(f"Resuming: {len(done)} pages already done", file=sys.stderr)
+    pending = (record for record in records if record[0] not in done)
+
+    processed = errors = 0
+    started = last_report = time.perf_counter()
+    with open(args.output, 'a', encoding='utf-8') as out, \
+            Pool(args.workers, initializer=_init_worker, initargs=(fields, args.parser_backend)) as pool:
+        for succeeded, line in pool.imap_unordered(process_record, pending, chunksize=args.chunksize):
+            out.write(line + "\n")
+            processed += 1
+            if not succeeded:
+                errors += 1
+            now = time.perf_counter()
+            if now - last_report >= args.report_every:
+                out.flush()
+                rate = processed / (now - started)
+                print(f"{processed} pages, {errors} errors, {rate:.1f} pages/sec", file=sys.stderr)
+                last_report = now
+
+    elapsed = time.perf_counter() - started
+    rate = processed / elapsed if elapsed else 0.0
+    print(json.dumps({"pages": processed, "errors": errors, "seconds": round(elapsed, 3),
+                      "pages_per_sec": round(rate, 2)}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+
+from fixtures import FIXTURE_DIR, load_fixtures
+from main import build_page_result
+from parsing import SCOPED_BACKEND, available_backends
+from serialization import fast_json
+
+# Checks that every parser backend produces identical JSON for the saved fixtures; the
+# same comparison runs as part of the tests (tests/test_backends.py).
+# Usage: python check_backends.py [--fixtures DIR]
+
+# Fields a backend is known to compute differently: a scoped parse never sees the skin's
+# paragraphs, images and headings, so its page statistics count the article alone
+EXPECTED_DIFFERENCES = {SCOPED_BACKEND: {"page_stats"}}
+
+
+def compare_backends(html_content: str, url: str, backends=None) -> dict:
+    """Return {backend: [differing top-level keys]} relative to html.parser."""
+    backends = backends or available_backends()
+    reference = json.loads(fast_json(build_page_result(html_content, url, "html.parser")))
+    differences = {}
+    for backend in backends:
+        result = json.loads(fast_json(build_page_result(html_content, url, backend)))
+        differences[backend] = sorted(
+            key for key in set(reference) | set(result) if reference.get(key) != result.get(key)
+        )
+    return differences
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare parser backend output on saved fixtures")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="directory of saved article HTML")
+    parser.add_argument("--backend", action="append", help="backend to check (default: all available)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures in {args.fixtures}")
+        return 1
+
+    failed = False
+    for title, html_content in fixtures.items():
+        url = f"https://en.wikipedia.org/wiki/{title}"
+        for backend, keys in compare_backends(html_content, url, args.backend).items():
+            unexpected = [key for key in keys if key not in EXPECTED_DIFFERENCES.get(backend, ())]
+            status = "ok" if not unexpected else "MISMATCH in " + ", ".join(unexpected)
+            if keys and not unexpected:
+                status += " (differs as expected in " + ", ".join(keys) + ")"
+            print(f"{title:<40} {backend:<12} {status}")
+            failed = failed or bool(unexpected)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Page type classification. Each rule maps keywords found in one kind of evidence (the
+# infobox class, the category links or the introduction) to a page type. Within a tier the
+# first matching rule wins, and the tiers are consulted in order, so the class of the
+# infobox beats the categories, which beat the introduction.
+
+TIERS = ("class", "category", "intro")
+
+CLASSIFICATION_RULES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    # Infobox class names (matched case-sensitively against the joined class attribute)
+    ("class", "person", ("biography", "vcard")),
+    ("class", "place", ("geography", "settlement", "country", "SettlementBox")),
+    ("class", "species", ("species", "taxobox")),
+    ("class", "organization", ("organization", "company")),
+    ("class", "event", ("event", "conflict")),
+    ("class", "media", ("book", "album", "film", "television", "game")),
+    ("class", "structure", ("building", "structure")),
+    # Category links (lower-cased)
+    ("category", "person", ("person", "people", "births", "deaths")),
+    ("category", "place", ("city", "town", "country", "place", "geography")),
+    ("category", "species", ("species", "animal", "plant", "fungus")),
+    ("category", "organization", ("organization", "company", "corporation")),
+    ("category", "event", ("event", "conflict", "war", "battle")),
+    ("category", "media", ("book", "film", "movie", "album", "television")),
+    ("category", "concept", ("concept", "theory", "philosophy")),
+    # First paragraph of the article (lower-cased)
+    ("intro", "person", (" born ", " died ", "is an american", "is a british")),
+    ("intro", "place", ("city", "town", "capital", "country", "region")),
+    ("intro", "species", ("species", "genus", "family", "phylum")),
+    ("intro", "organization", ("company", "corporation", "organization", "founded")),
+    ("intro", "event", ("event", "conflict", "war", "battle", "took place")),
+    ("intro", "media", ("book", "novel", "film", "movie", "album", "tv series")),
+    ("intro", "concept", ("concept", "theory", "philosophy", "refers to")),
+]
+
+# How much a matched keyword in each tier counts towards a page type's score, and the
+# highest confidence a decision made by that tier can have
+TIER_WEIGHTS = {"class": 3.0, "category": 2.0, "intro": 1.0}
+TIER_CONFIDENCE = {"class": 0.95, "category": 0.8, "intro": 0.6}
+
+
+class KeywordAutomaton:
+    """Aho-Corasick matcher: finds every occurrence of a set of keywords in one pass over a text."""
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]]):
+        # State 0 is the root; each state has its transitions, a failure link and the
+        # payloads of the keywords ending there
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Any]] = [[]]
+        for keyword, payload in keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(payload)
+
+        # Breadth-first pass to set the failure links
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state].extend(self._out[self._fail[next_state]])
+
+    def iter_matches(self, text: str) -> Iterator[Any]:
+        """Yield the payload of every keyword occurrence in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                yield from out[state]
+
+
+class Classification(NamedTuple):
+    page_type: str
+    confidence: float
+    # The tier that decided the page type, and the type each tier on its own points to
+    tier: Optional[str]
+    tier_types: Dict[str, str]
+
+
+def compile_rules(rules: List[Tuple[str, str, Tuple[str, ...]]]) -> KeywordAutomaton:
+    """Build one automaton over all keywords; each match carries (tier, rule index, page type, keyword)."""
+    return KeywordAutomaton(
+        (keyword, (tier, index, page_type, keyword))
+        for index, (tier, page_type, keywords) in enumerate(rules)
+        for keyword in keywords
+    )
+
+
+_automaton = compile_rules(CLASSIFICATION_RULES)
+
+
+def classify(class_text: str = "", category_text: str = "", intro_text: str = "") -> Classification:
+    """Score every page type against the infobox class, category and introduction text."""
+    texts = {"class": class_text, "category": category_text.lower(), "intro": intro_text.lower()}
+    scores: Dict[str, float] = {}
+    tier_types: Dict[str, str] = {}
+    for tier in TIERS:
+        best_rule = None
+        seen = set()
+        for match in _automaton.iter_matches(texts[tier]):
+            match_tier, index, page_type, keyword = match
+            if match_tier != tier or match in seen:
+                continue
+            seen.add(match)
+            scores[page_type] = scores.get(page_type, 0.0) + TIER_WEIGHTS[tier]
+            if best_rule is None or index < best_rule[0]:
+                best_rule = (index, page_type)
+        if best_rule is not None:
+            tier_types[tier] = best_rule[1]
+
+    for tier in TIERS:
+        if tier in tier_types:
+            page_type = tier_types[tier]
+            confidence = TIER_CONFIDENCE[tier] * scores[page_type] / sum(scores.values())
+            return Classification(page_type, round(confidence, 3), tier, tier_types)
+    return Classification("unknown", 0.0, None, tier_types)
@@ -0,0 +1,111 @@
+import os
+
+# Settings for the scraper service, read from the environment at import time.
+
+# HTML parser backend: "html.parser", "lxml" (both through BeautifulSoup), "lxml-native" or
+# "lxml-scoped" (a BeautifulSoup tree of only the parts of the page the extractors read)
+PARSER_BACKEND = os.environ.get("WIKIFY_PARSER_BACKEND", "lxml")
+
+# With the lxml-native backend, parse a downloaded page as its body arrives instead of after
+PARSE_WHILE_DOWNLOADING = os.environ.get("WIKIFY_PARSE_WHILE_DOWNLOADING", "1") == "1"
+
+# User-Agent sent to Wikipedia to identify the scraper
+USER_AGENT = os.environ.get(
+    "WIKIFY_USER_AGENT",
+    "MyWikipediaBot/1.0 (https://example.com/mybot; myemail@example.com)"
+)
+
+# Upstream HTTP client: timeouts in seconds, connection pool limits and HTTP/2 (needs the h2 package)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("WIKIFY_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("WIKIFY_HTTP_READ_TIMEOUT", "20"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("WIKIFY_HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("WIKIFY_HTTP_MAX_KEEPALIVE", "50"))
+HTTP2 = os.environ.get("WIKIFY_HTTP2", "1") == "1"
+
+# Where pages are fetched from; point it at stub_server.py to test without Wikipedia
+WIKI_BASE_URL = os.environ.get("WIKIFY_WIKI_BASE_URL", "https://en.wikipedia.org").rstrip("/")
+# How pages are fetched: "page" downloads the skinned /wiki/ page, "parse" only the article
+# body and metadata through the MediaWiki action=parse API (see mediawiki.py)
+FETCH_MODE = os.environ.get("WIKIFY_FETCH_MODE", "page")
+
+# Upstream request policy (see upstream.py): requests per second and burst size (a rate
+# of 0 disables the limit), the adaptive concurrency limit's start and bounds, and retries
+# with jittered exponential backoff (base and cap in seconds). Retry-After is honored up
+# to UPSTREAM_RETRY_AFTER_MAX seconds.
+UPSTREAM_RATE = float(os.environ.get("WIKIFY_UPSTREAM_RATE", "50"))
+UPSTREAM_BURST = float(os.environ.get("WIKIFY_UPSTREAM_BURST", "20"))
+UPSTREAM_INITIAL_CONCURRENCY = int(os.environ.get("WIKIFY_UPSTREAM_INITIAL_CONCURRENCY", "16"))
+UPSTREAM_MIN_CONCURRENCY = int(os.environ.get("WIKIFY_UPSTREAM_MIN_CONCURRENCY", "1"))
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get("WIKIFY_UPSTREAM_MAX_CONCURRENCY", "64"))
+UPSTREAM_MAX_RETRIES = int(os.environ.get("WIKIFY_UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.environ.get("WIKIFY_UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.environ.get("WIKIFY_UPSTREAM_BACKOFF_MAX", "10"))
+UPSTREAM_RETRY_AFTER_MAX = float(os.environ.get("WIKIFY_UPSTREAM_RETRY_AFTER_MAX", "60"))
+
+# Raw HTML page cache: in-memory byte budget, on-disk directory ("" disables it) and the
+# number of seconds a cached page is served before it is revalidated with a conditional GET
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("WIKIFY_PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+PAGE_CACHE_DIR = os.environ.get(
+    "WIKIFY_PAGE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "pages")
+)
+PAGE_CACHE_TTL = float(os.environ.get("WIKIFY_PAGE_CACHE_TTL", "300"))
+# Longest wait, in seconds, for another worker that is fetching the same page
+PAGE_LOCK_TIMEOUT = float(os.environ.get("WIKIFY_PAGE_LOCK_TIMEOUT", "30"))
+
+# Parsed result cache: maximum number of results kept and their time to live in seconds
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("WIKIFY_RESULT_CACHE_MAX_ENTRIES", "1000"))
+RESULT_CACHE_TTL = float(os.environ.get("WIKIFY_RESULT_CACHE_TTL", "3600"))
+
+# Batch scraping: most titles per request, concurrent upstream fetches per batch and
+# worker processes used for parsing (0 means one per CPU core)
+BATCH_MAX_TITLES = int(os.environ.get("WIKIFY_BATCH_MAX_TITLES", "500"))
+BATCH_FETCH_CONCURRENCY = int(os.environ.get("WIKIFY_BATCH_FETCH_CONCURRENCY", "16"))
+PARSE_PROCESSES = int(os.environ.get("WIKIFY_PARSE_PROCESSES", "0"))
+
+# Response compression: bodies smaller than this many bytes are sent uncompressed, and the
+# levels used for gzip, brotli and zstd
+COMPRESS_MIN_BYTES = int(os.environ.get("WIKIFY_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("WIKIFY_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("WIKIFY_BROTLI_QUALITY", "5"))
+ZSTD_LEVEL = int(os.environ.get("WIKIFY_ZSTD_LEVEL", "3"))
+
+# Watchlist refresh job (see watchlist.py): its SQLite database, seconds between refresh
+# cycles (0 runs a cycle only when asked to), most pages re-scraped per cycle, and the
+# number of concurrent revision checks and re-scrapes
+WATCHLIST_DB = os.environ.get(
+    "WIKIFY_WATCHLIST_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "watchlist.sqlite3")
+)
+WATCHLIST_INTERVAL = float(os.environ.get("WIKIFY_WATCHLIST_INTERVAL", "0"))
+WATCHLIST_REFRESH_BUDGET = int(os.environ.get("WIKIFY_WATCHLIST_REFRESH_BUDGET", "1000"))
+WATCHLIST_CHECK_CONCURRENCY = int(os.environ.get("WIKIFY_WATCHLIST_CHECK_CONCURRENCY", "4"))
+WATCHLIST_SCRAPE_CONCURRENCY = int(os.environ.get("WIKIFY_WATCHLIST_SCRAPE_CONCURRENCY", "8"))
+
+# Link-graph crawler (see crawler.py): concurrent page fetches, the number of titles its
+# visited sets are sized for and their false-positive rate at that size, and the number
+# of crawled pages between checkpoints
+CRAWL_CONCURRENCY = int(os.environ.get("WIKIFY_CRAWL_CONCURRENCY", "8"))
+CRAWL_BLOOM_CAPACITY = int(os.environ.get("WIKIFY_CRAWL_BLOOM_CAPACITY", "10000000"))
+CRAWL_BLOOM_ERROR_RATE = float(os.environ.get("WIKIFY_CRAWL_BLOOM_ERROR_RATE", "0.001"))
+CRAWL_CHECKPOINT_EVERY = int(os.environ.get("WIKIFY_CRAWL_CHECKPOINT_EVERY", "500"))
+
+# Local full-text search (see search_index.py): its directory (empty keeps the index in
+# memory only), documents buffered in memory before they are written out as a segment,
+# and the number of segments that triggers a background merge of the smallest ones
+SEARCH_INDEX_DIR = os.environ.get(
+    "WIKIFY_SEARCH_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "search")
+)
+SEARCH_FLUSH_DOCS = int(os.environ.get("WIKIFY_SEARCH_FLUSH_DOCS", "2000"))
+SEARCH_MERGE_FACTOR = int(os.environ.get("WIKIFY_SEARCH_MERGE_FACTOR", "8"))
+
+# Title aliases (see titles.py): the SQLite database that maps requested titles to the
+# canonical titles of their pages (empty keeps it in memory only), the number of mappings
+# also kept in memory, and the seconds a mapping is used before its title is fetched again
+TITLE_ALIAS_DB = os.environ.get(
+    "WIKIFY_TITLE_ALIAS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "aliases.sqlite3")
+)
+TITLE_ALIAS_CACHE_ENTRIES = int(os.environ.get("WIKIFY_TITLE_ALIAS_CACHE_ENTRIES", "100000"))
+TITLE_ALIAS_TTL = float(os.environ.get("WIKIFY_TITLE_ALIAS_TTL", "86400"))
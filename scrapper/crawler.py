@@ -0,0 +1,401 @@
+import argparse
+import array
+import asyncio
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+from config import CRAWL_CONCURRENCY, CRAWL_BLOOM_CAPACITY, CRAWL_BLOOM_ERROR_RATE, CRAWL_CHECKPOINT_EVERY
+from models import model_fields
+from titles import normalize_title
+
+# Crawls the article link graph out from seed titles, breadth first or most linked-to
+# first, through the regular extraction pipeline (related_pages gives the links). A crawl
+# directory holds everything, so an interrupted crawl resumes where it last checkpointed:
+#
+#   pages.jsonl   one record per crawled page: {"title", "depth", "result" | "error"}
+#   nodes.tsv     "<id>\t<title>" for every title seen, crawled or not
+#   edges.bin     the link graph: pairs of little-endian uint64 node ids (source, target)
+#   state.json    options (mode, depth, page budget, fields), counters and the frontier;
+#                 bloom.bin, bloom-named.bin: the visited sets
+#
+# Pages crawled after the last checkpoint are crawled again on resume, so their records
+# and edges can appear twice.
+#
+#   python crawler.py crawl/ --seed Albert_Einstein --depth 2 --max-pages 10000 --mode priority
+
+CRAWL_MODES = ("bfs", "priority")
+
+# Options of a new crawl that are not given; a resumed crawl keeps the ones it was started with
+DEFAULT_OPTIONS: Dict[str, Any] = {"mode": "bfs", "max_depth": 2, "max_pages": 1000, "fields": None}
+
+Scraper = Callable[[str, Optional[set]], Awaitable[Dict[str, Any]]]
+
+
+def title_id(title: str) -> int:
+    """A stable 64-bit node id for a title."""
+    return int.from_bytes(hashlib.blake2b(title.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def link_title(url: str) -> Optional[str]:
+    """The title a related_pages URL points at, or None for anything but a plain article link."""
+    parts = urlsplit(url)
+    if not parts.path.startswith('/wiki/') or parts.query:
+        return None
+    title = unquote(parts.path[len('/wiki/'):])
+    return normalize_title(title) if title else None
+
+
+class BloomFilter:
+    """A fixed-size set of strings with no false negatives and, once `capacity` items are
+    in, about `error_rate` false positives. Ten million titles at 0.1% take 18 MB.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, item: str) -> List[int]:
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Add an item; returns False if it was (probably) in the set already."""
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        self.count += added
+        return added
+
+    def save(self, path: str):
+        with open(path + ".tmp", 'wb') as f:
+            f.write(self.bits)
+        os.replace(path + ".tmp", path)
+
+    def state(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "error_rate": self.error_rate, "count": self.count}
+
+    @classmethod
+    def load(cls, path: str, state: Dict[str, Any]) -> "BloomFilter":
+        with open(path, 'rb') as f:
+            bits = bytearray(f.read())
+        return cls(state["capacity"], state["error_rate"], bits, state["count"])
+
+
+class Frontier:
+    """Titles waiting to be crawled, with their depth.
+
+    "bfs" pops them in discovery order; "priority" pops the title linked to by the most
+    crawled pages so far, ties in discovery order.
+    """
+
+    def __init__(self, mode: str = "bfs"):
+        self.mode = mode
+        self._queue: "deque[Tuple[str, int]]" = deque()
+        # Priority mode: title -> (links, discovery order, depth), and a heap with an entry
+        # per change of a title's link count; out of date entries are skipped when popped
+        self._waiting: Dict[str, Tuple[int, int, int]] = {}
+        self._heap: List[Tuple[int, int, str]] = []
+        self._order = 0
+
+    def __len__(self) -> int:
+        return len(self._queue) if self.mode == "bfs" else len(self._waiting)
+
+    def push(self, title: str, depth: int, links: int = 1):
+        if self.mode == "bfs":
+            self._queue.append((title, depth))
+            return
+        self._order += 1
+        self._waiting[title] = (links, self._order, depth)
+        heapq.heappush(self._heap, (-links, self._order, title))
+
+    def link(self, title: str):
+        """Count another link to a title that is waiting, moving it up in priority mode."""
+        if self.mode == "priority" and title in self._waiting:
+            links, order, depth = self._waiting[title]
+            self._waiting[title] = (links + 1, order, depth)
+            heapq.heappush(self._heap, (-(links + 1), order, title))
+
+    def pop(self) -> Tuple[str, int]:
+        if self.mode == "bfs":
+            return self._queue.popleft()
+        while True:
+            negative_links, _, title = heapq.heappop(self._heap)
+            waiting = self._waiting.get(title)
+            if waiting is not None and waiting[0] == -negative_links:
+                del self._waiting[title]
+                return title, waiting[2]
+
+    def entries(self) -> List[Tuple[str, int, int]]:
+        """(title, depth, links) of every waiting title, in discovery order."""
+        if self.mode == "bfs":
+            return [(title, depth, 1) for title, depth in self._queue]
+        ordered = sorted(self._waiting.items(), key=lambda item: item[1][1])
+        return [(title, depth, links) for title, (links, _, depth) in ordered]
+
+
+def _truncate_partial(path: str, record_size: Optional[int] = None):
+    """Drop a partly written last record: a line without its newline, or a short binary record."""
+    if not os.path.exists(path):
+        return
+    size = os.path.getsize(path)
+    if record_size:
+        valid = size - size % record_size
+    else:
+        # Search backwards for the last newline
+        valid = 0
+        with open(path, 'rb') as f:
+            end = size
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    valid = start + newline + 1
+                    break
+                end = start
+    if valid != size:
+        with open(path, 'r+b') as f:
+            f.truncate(valid)
+
+
+class Crawler:
+    """Crawls from seeds up to `max_depth` links away, stopping after `max_pages` pages.
+
+    `scrape(title, fields)` runs the extraction pipeline (main.load_page_result); at most
+    `concurrency` pages are fetched at once. `fields` limits the results written to
+    pages.jsonl; related_pages is always extracted to find the links. Options left as None
+    take DEFAULT_OPTIONS, or on resume the ones the crawl was started with; giving a resumed
+    crawl a different mode, depth, page budget or set of fields raises ValueError.
+    """
+
+    def __init__(self, directory: str, scrape: Scraper, mode: Optional[str] = None, max_depth: Optional[int] = None,
+                 max_pages: Optional[int] = None, fields: Optional[Set[str]] = None,
+                 concurrency: int = CRAWL_CONCURRENCY, checkpoint_every: int = CRAWL_CHECKPOINT_EVERY,
+                 capacity: int = CRAWL_BLOOM_CAPACITY, error_rate: float = CRAWL_BLOOM_ERROR_RATE):
+        self.directory = directory
+        self.scrape = scrape
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+        self.stats = {"crawled": 0, "failed": 0, "edges": 0}
+        os.makedirs(directory, exist_ok=True)
+
+        given = {"mode": mode, "max_depth": max_depth, "max_pages": max_pages,
+                 "fields": None if fields is None else sorted(fields)}
+        state_path = self._path("state.json")
+        self.resumed = os.path.exists(state_path)
+        if self.resumed:
+            with open(state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            # Checkpoints from before options were saved only have the mode
+            options = dict(DEFAULT_OPTIONS, **state.get("options", {"mode": state["mode"]}))
+            conflicts = [name for name, value in given.items() if value is not None and value != options[name]]
+            if conflicts:
+                raise ValueError(f"{directory} is a crawl with different options: "
+                                 + ", ".join(f"{name} {options[name]!r}, not {given[name]!r}" for name in conflicts))
+        else:
+            options = dict(DEFAULT_OPTIONS, **{name: value for name, value in given.items() if value is not None})
+        self.options = options
+        self.max_depth = options["max_depth"]
+        self.max_pages = options["max_pages"]
+        self.fields = None if options["fields"] is None else set(options["fields"])
+
+        if self.resumed:
+            self.frontier = Frontier(options["mode"])
+            for title, depth, links in state["frontier"]:
+                self.frontier.push(title, depth, links)
+            # Titles queued at least once, and titles written to nodes.tsv
+            self.queued = BloomFilter.load(self._path("bloom.bin"), state["queued"])
+            self.named = BloomFilter.load(self._path("bloom-named.bin"), state["named"])
+            self.stats.update(state["stats"])
+        else:
+            if options["mode"] not in CRAWL_MODES:
+                raise ValueError(f"Unknown crawl mode '{options['mode']}', expected one of {', '.join(CRAWL_MODES)}")
+            self.frontier = Frontier(options["mode"])
+            self.queued = BloomFilter(capacity, error_rate)
+            self.named = BloomFilter(capacity, error_rate)
+        self._in_flight: Dict[str, int] = {}
+        self._started = self.stats["crawled"] + self.stats["failed"]
+        self._changed: Optional[asyncio.Condition] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # --- Output ---
+
+    def _open(self):
+        for name, record_size in (("pages.jsonl", None), ("nodes.tsv", None), ("edges.bin", 16)):
+            _truncate_partial(self._path(name), record_size)
+        self._pages = open(self._path("pages.jsonl"), 'a', encoding='utf-8')
+        self._nodes = open(self._path("nodes.tsv"), 'a', encoding='utf-8')
+        self._edges = open(self._path("edges.bin"), 'ab')
+
+    def _close(self):
+        for f in (self._pages, self._nodes, self._edges):
+            f.close()
+
+    def _name(self, title: str) -> int:
+        node = title_id(title)
+        if self.named.add(title):
+            self._nodes.write(f"{node}\t{title}\n")
+        return node
+
+    def checkpoint(self):
+        """Flush the output and save the frontier, with pages in flight, and the visited sets."""
+        for f in (self._pages, self._nodes, self._edges):
+            f.flush()
+        self.queued.save(self._path("bloom.bin"))
+        self.named.save(self._path("bloom-named.bin"))
+        frontier = [(title, depth, 1) for title, depth in self._in_flight.items()] + self.frontier.entries()
+        state = {"mode": self.frontier.mode, "options": self.options, "stats": self.stats, "frontier": frontier,
+                 "queued": self.queued.state(), "named": self.named.state()}
+        path = self._path("state.json")
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    # --- Crawl ---
+
+    def _discover(self, title: str, depth: int):
+        if self.queued.add(title):
+            self.frontier.push(title, depth)
+        else:
+            self.frontier.link(title)
+
+    async def run(self, seeds: List[str] = ()) -> Dict[str, Any]:
+        """Crawl until the frontier is empty or the page budget is spent; returns the counters."""
+        self._open()
+        self._changed = asyncio.Condition()
+        if not self.resumed:
+            for seed in seeds:
+                self._name(normalize_title(seed))
+                self._discover(normalize_title(seed), 0)
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+        finally:
+            self.checkpoint()
+            self._close()
+        return dict(self.stats, frontier=len(self.frontier), seconds=round(time.perf_counter() - started, 3))
+
+    async def _worker(self):
+        while True:
+            async with self._changed:
+                # Pages in flight may still add to an empty frontier
+                while not self.frontier and self._in_flight:
+                    await self._changed.wait()
+                if not self.frontier or self._started >= self.max_pages:
+                    self._changed.notify_all()
+                    return
+                title, depth = self.frontier.pop()
+                self._in_flight[title] = depth
+                self._started += 1
+            try:
+                await self._crawl(title, depth)
+            finally:
+                async with self._changed:
+                    del self._in_flight[title]
+                    self._changed.notify_all()
+
+    async def _crawl(self, title: str, depth: int):
+        wanted = None if self.fields is None else self.fields | {"related_pages"}
+        try:
+            result = await self.scrape(title, wanted)
+        except Exception as e:
+            self.stats["failed"] += 1
+            self._pages.write(json.dumps({"title": title, "depth": depth, "error": f"{type(e).__name__}: {e}"},
+                                         ensure_ascii=False) + "\n")
+            return
+
+        source = title_id(title)
+        edges = array.array('Q')
+        targets = dict.fromkeys(link_title(page.url) for page in result.get("related_pages", []))
+        for target in targets:
+            if not target or target == title:
+                continue
+            edges.extend((source, self._name(target)))
+            if depth < self.max_depth:
+                self._discover(target, depth + 1)
+        if sys.byteorder != 'little':
+            edges.byteswap()
+        edges.tofile(self._edges)
+        self.stats["edges"] += len(edges) // 2
+
+        if self.fields is not None and "related_pages" not in self.fields:
+            result = {k: v for k, v in result.items() if k != "related_pages"}
+        self._pages.write(json.dumps({"title": title, "depth": depth, "result": result}, ensure_ascii=False,
+                                     default=model_fields) + "\n")
+        self.stats["crawled"] += 1
+        if self.stats["crawled"] % self.checkpoint_every == 0:
+            self.checkpoint()
+
+
+def read_edges(directory: str) -> Tuple[Dict[int, str], "array.array"]:
+    """Load a crawl's link graph: {node id: title} and the flat (source, target) id array."""
+    nodes = {}
+    with open(os.path.join(directory, "nodes.tsv"), encoding='utf-8') as f:
+        for line in f:
+            node, _, title = line.rstrip("\n").partition("\t")
+            nodes[int(node)] = title
+    edges = array.array('Q')
+    with open(os.path.join(directory, "edges.bin"), 'rb') as f:
+        edges.frombytes(f.read())
+    if sys.byteorder != 'little':
+        edges.byteswap()
+    return nodes, edges
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Crawl the Wikipedia link graph from seed titles")
+    parser.add_argument("directory", help="crawl directory (resumed if it holds a checkpoint)")
+    parser.add_argument("--seed", action="append", default=[], help="title to start from (repeatable)")
+    parser.add_argument("--mode", choices=CRAWL_MODES, help="crawl order (default: bfs)")
+    parser.add_argument("--depth", type=int, help="most links away from a seed (default: 2)")
+    parser.add_argument("--max-pages", type=int, help="pages to crawl in total (default: 1000)")
+    parser.add_argument("--fields", help="comma-separated result fields to write")
+    parser.add_argument("--exclude", help="comma-separated result fields to leave out")
+    parser.add_argument("-j", "--concurrency", type=int, default=CRAWL_CONCURRENCY, help="concurrent page fetches")
+    args = parser.parse_args()
+
+    from main import load_page_result, resolve_fields  # main.py is the pipeline being driven
+    try:
+        fields = resolve_fields(args.fields, args.exclude)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Options left out keep their saved values when a crawl is resumed
+    try:
+        crawler = Crawler(args.directory, lambda title, wanted: load_page_result(title, wanted), args.mode,
+                          args.depth, args.max_pages, fields, args.concurrency)
+    except ValueError as e:
+        parser.error(str(e))
+    if crawler.resumed:
+        print(f"Resuming: {crawler.stats['crawled']} pages crawled, {len(crawler.frontier)} waiting", file=sys.stderr)
+    elif not args.seed:
+        parser.error("a new crawl needs at least one --seed")
+    print(json.dumps(asyncio.run(crawler.run(args.seed))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
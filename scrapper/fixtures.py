@@ -0,0 +1,61 @@
+import os
+import sys
+from typing import Dict, Iterable, Optional
+from urllib.parse import quote, unquote
+
+import httpx # type: ignore
+
+from config import USER_AGENT
+
+# Saved article HTML used by the backend equivalence tests and the benchmarks. The committed
+# set holds trimmed copies of the FIXTURE_TITLES articles, a few KB each, so results stay
+# comparable between runs; fetch_fixtures() saves the live articles to LIVE_FIXTURE_DIR
+# instead, to check against with --fixtures.
+FIXTURE_DIR = os.environ.get(
+    "WIKIFY_FIXTURE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+)
+LIVE_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "fixtures")
+
+# A representative spread of article shapes, keyed by kind
+FIXTURE_TITLES = {
+    "person": "Albert_Einstein",
+    "city": "New_York_City",
+    "war": "World_War_II",
+    "species": "Tiger",
+    "disambiguation": "Mercury",
+    "list": "List_of_sovereign_states",
+}
+
+
+def fixture_path(title: str, fixture_dir: str = FIXTURE_DIR) -> str:
+    return os.path.join(fixture_dir, quote(title, safe='') + ".html")
+
+
+def load_fixtures(fixture_dir: str = FIXTURE_DIR) -> Dict[str, str]:
+    """Return {title: html} for every saved fixture."""
+    fixtures = {}
+    if not os.path.isdir(fixture_dir):
+        return fixtures
+    for filename in sorted(os.listdir(fixture_dir)):
+        if filename.endswith(".html"):
+            with open(os.path.join(fixture_dir, filename), encoding="utf-8") as f:
+                fixtures[unquote(filename[:-len(".html")])] = f.read()
+    return fixtures
+
+
+def fetch_fixtures(titles: Optional[Iterable[str]] = None, fixture_dir: str = LIVE_FIXTURE_DIR):
+    """Download the current article HTML from Wikipedia into `fixture_dir`."""
+    os.makedirs(fixture_dir, exist_ok=True)
+    for title in titles or FIXTURE_TITLES.values():
+        response = httpx.get(f"https://en.wikipedia.org/wiki/{title}", headers={'User-Agent': USER_AGENT}, timeout=30,
+                             follow_redirects=True)
+        response.raise_for_status()
+        with open(fixture_path(title, fixture_dir), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"saved {title} ({len(response.text)} chars)")
+
+
+if __name__ == "__main__":
+    # Usage: python fixtures.py [Title ...], then e.g. python check_backends.py --fixtures .cache/fixtures
+    fetch_fixtures(sys.argv[1:] or None)
@@ -0,0 +1,49 @@
+import httpx # type: ignore
+from typing import Optional
+
+from config import (
+    USER_AGENT, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP2
+)
+
+try:
+    import h2 # type: ignore # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# One pooled client shared by every request, so connections to Wikipedia are reused
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared upstream client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE
+            ),
+            http2=HTTP2 and _HTTP2_AVAILABLE,
+            follow_redirects=True
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_html(url: str) -> str:
+    """GET a page through the upstream policy and return its body, raising httpx.HTTPError on failure."""
+    from upstream import upstream  # upstream.py builds on this module
+    response = await upstream.get(url)
+    response.raise_for_status()
+    return response.text
@@ -1,133 +1,633 @@
-from fastapi import FastAPI, HTTPException, Query # type: ignore
-import requests # type: ignore
+from fastapi import FastAPI, Header, HTTPException, Query # type: ignore
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse # type: ignore
+from fastapi.concurrency import run_in_threadpool # type: ignore
+import httpx # type: ignore
 from bs4 import BeautifulSoup # type: ignore
 import re
-from typing import Dict, List, Any, Optional
-import json
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator, Tuple
+import asyncio
+import dataclasses
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+from pydantic import BaseModel # type: ignore
 from urllib.parse import urljoin, unquote
+from config import (
+    BATCH_MAX_TITLES, BATCH_FETCH_CONCURRENCY, PARSE_PROCESSES, WIKI_BASE_URL, WATCHLIST_INTERVAL, FETCH_MODE,
+    PARSE_WHILE_DOWNLOADING
+)
+from http_client import close_client
+from page_cache import expire_page, fetch_page_html, page_cache, page_fetches
+from result_cache import canonical_title, page_identity, result_cache
+from parsing import NATIVE_BACKEND, ParsedPage, StreamingParse, parse_html, resolve_backend
+from classifier import classify
+from mediawiki import page_url, read_page_data
+from tables import TABLE_FORMATS, format_tables, to_arrow_ipc, to_parquet
+from walker import VISITORS, walk_document
+from metrics import StageTimer, NULL_TIMER, HTML_LENGTH, RESULT_BYTES, render_metrics
+from singleflight import SingleFlight
+from upstream import upstream
+from watchlist import Watchlist
+from search_index import SEARCHABLE_FIELDS, search_index
+from titles import title_aliases
+from serialization import ENCODERS, encode_body, fast_json, negotiate_coding, negotiate_media_type
+from models import ExternalLink, Image, LanguageLink, PageMetadata, PageStats, RelatedPage, Section, TocEntry, json_schema
 
-app = FastAPI()
+# Worker processes for parsing batches, created on first use
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES or None)
+    return _parse_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _parse_pool
+    # Refresh the watchlist in the background when a schedule is configured
+    refresher = asyncio.create_task(watchlist.run_forever()) if WATCHLIST_INTERVAL > 0 else None
+    yield
+    if refresher is not None:
+        refresher.cancel()
+    # Write out search documents still held in memory
+    await run_in_threadpool(search_index.close)
+    title_aliases.close()
+    # Release the pooled upstream connections and parse workers on shutdown
+    await close_client()
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/v1/longSearch")
-def scrape_wikipedia(query: str = Query(..., description="Wikipedia page title, e.g., 'Albert_Einstein', 'New_York_City', 'World_War_II'")):
-    # Clean up the query to handle URL-encoded characters
-    query = unquote(query)
+async def scrape_wikipedia(query: str = Query(..., description="Wikipedia page title, e.g., 'Albert_Einstein', 'New_York_City', 'World_War_II'"),
+                           fields: Optional[str] = Query(None, description="Comma-separated result fields to return, e.g., 'page_metadata,summary,infobox_data,sections'"),
+                           exclude: Optional[str] = Query(None, description="Comma-separated result fields to leave out"),
+                           table_format: str = Query("rows", description="Table orientation: 'rows' or 'columns'"),
+                           accept: Optional[str] = Header(None),
+                           accept_encoding: Optional[str] = Header(None)):
+    # Work out which result fields were asked for
+    try:
+        wanted_fields = resolve_fields(fields, exclude)
+        resolve_table_format(table_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, coding = negotiate_response(accept, accept_encoding)
+    
+    # Every stage is timed and reported in the Server-Timing header and on /metrics
+    timer = StageTimer()
+    try:
+        result = await load_page_result(unquote(query), wanted_fields, timer=timer)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching URL: {e}")
+    result = with_table_format(result, table_format)
+    
+    # JSON, MessagePack or CBOR as the client prefers, compressed when it accepts that;
+    # encoding and compressing a large page is CPU-bound, so it runs off the event loop
+    body, headers = await run_in_threadpool(encode_body, result, media_type, coding, timer)
+    RESULT_BYTES.observe(len(body))
+    timer.observe()
+    headers["Server-Timing"] = timer.server_timing()
+    return Response(content=body, headers=headers)
+
+class BatchRequest(BaseModel):
+    titles: List[str]
+    fields: Optional[str] = None
+    exclude: Optional[str] = None
+    table_format: str = "rows"
+
+@app.post("/v1/longSearch/batch")
+async def scrape_wikipedia_batch(request: BatchRequest, accept: Optional[str] = Header(None),
+                                 accept_encoding: Optional[str] = Header(None)):
+    """Scrape many titles at once. Results keep the input order; failures are reported per title."""
+    if len(request.titles) > BATCH_MAX_TITLES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TITLES} titles per batch")
+    try:
+        wanted_fields = resolve_fields(request.fields, request.exclude)
+        resolve_table_format(request.table_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, coding = negotiate_response(accept, accept_encoding)
+    
+    # Bound the upstream fetches; parsing is spread over the process pool
+    fetch_limit = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+    parse_pool = get_parse_pool()
+    
+    async def scrape_one(title: str) -> Dict[str, Any]:
+        timer = StageTimer()
+        try:
+            result = await load_page_result(unquote(title), wanted_fields, fetch_limit, parse_pool, timer)
+            return {"title": title, "result": with_table_format(result, request.table_format)}
+        except httpx.HTTPError as e:
+            return {"title": title, "error": f"Error fetching URL: {e}"}
+        except Exception as e:
+            return {"title": title, "error": f"Error processing page: {e}"}
+        finally:
+            timer.observe()
+    
+    results = await asyncio.gather(*(scrape_one(title) for title in request.titles))
+    body, headers = await run_in_threadpool(encode_body, {"results": results}, media_type, coding)
+    return Response(content=body, headers=headers)
+
+@app.get("/v1/longSearch/stream")
+async def scrape_wikipedia_stream(query: str = Query(..., description="Wikipedia page title, e.g., 'Albert_Einstein', 'New_York_City', 'World_War_II'"),
+                                  fields: Optional[str] = Query(None, description="Comma-separated result fields to return"),
+                                  exclude: Optional[str] = Query(None, description="Comma-separated result fields to leave out"),
+                                  table_format: str = Query("rows", description="Table orientation: 'rows' or 'columns'")):
+    """Stream the result as NDJSON, sending each field as soon as it is extracted (see iter_ndjson)."""
+    try:
+        wanted_fields = resolve_fields(fields, exclude)
+        resolve_table_format(table_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Construct the external URL using the provided query as the title
-    external_api_url = f"https://en.wikipedia.org/wiki/{query}"
+    query = unquote(query)
+    external_api_url = f"{WIKI_BASE_URL}/wiki/{query}"
+    title = await title_aliases.resolve(query)
+    timer = StageTimer()
+    try:
+        with timer.stage("fetch"):
+            html_content = await fetch_page_html(title, page_url(title))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching URL: {e}")
+    HTML_LENGTH.observe(len(html_content))
+    await learn_title(query, title, html_content)
     
-    # Define headers to identify your bot/script
-    headers = {
-        'User-Agent': 'MyWikipediaBot/1.0 (https://example.com/mybot; myemail@example.com)'
-    }
+    identity = page_identity(html_content)
+    cached_result = result_cache.get(*identity) if identity else None
+    if cached_result is not None:
+        parts = project_result(with_request_url(cached_result, external_api_url), wanted_fields).items()
+    else:
+        parts = iter_page_result(html_content, external_api_url, None, wanted_fields, timer)
+    if table_format != "rows":
+        parts = ((name, format_tables(value, table_format) if name == "tables" else value) for name, value in parts)
+    # The header can only carry the stages finished before the body starts
+    headers = {"Server-Timing": timer.server_timing()}
+    
+    def body() -> Iterator[bytes]:
+        size = 0
+        for line in iter_ndjson(parts):
+            size += len(line)
+            yield line
+        RESULT_BYTES.observe(size)
+        timer.observe()
+    
+    # Starlette drives the synchronous generator from its threadpool
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers=headers)
+
+@app.get("/v1/longSearch/tables")
+async def scrape_wikipedia_tables(query: str = Query(..., description="Wikipedia page title, e.g., 'Albert_Einstein', 'New_York_City', 'World_War_II'"),
+                                  format: str = Query("rows", description="'rows', 'columns', 'arrow' (IPC stream) or 'parquet'"),
+                                  index: Optional[int] = Query(None, description="Position of a single table to return; required for 'arrow' and 'parquet'")):
+    """The data tables of a page, as JSON or, one table at a time, as Arrow or Parquet."""
+    binary_formats = {"arrow": (to_arrow_ipc, "application/vnd.apache.arrow.stream"),
+                      "parquet": (to_parquet, "application/vnd.apache.parquet")}
+    if format not in TABLE_FORMATS and format not in binary_formats:
+        raise HTTPException(status_code=400, detail=f"Unknown table format '{format}', expected one of "
+                                                    f"{', '.join(TABLE_FORMATS + tuple(binary_formats))}")
+    if format in binary_formats and index is None:
+        raise HTTPException(status_code=400, detail=f"The {format} format returns one table; pass its index")
     
-    # --- Fetch HTML Content ---
     try:
-        response = requests.get(external_api_url, headers=headers)
-        response.raise_for_status()
-        html_content = response.text
-    except requests.exceptions.RequestException as e:
+        result = await load_page_result(unquote(query), {"tables"})
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching URL: {e}")
+    tables = result.get("tables", [])
+    if index is not None and not 0 <= index < len(tables):
+        raise HTTPException(status_code=404, detail=f"Table {index} not found; the page has {len(tables)} tables")
     
-    # Create a BeautifulSoup object to parse the HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
+    if format in binary_formats:
+        encode, media_type = binary_formats[format]
+        try:
+            content = encode(tables[index])
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        return Response(content=content, media_type=media_type)
+    
+    tables = format_tables(tables, format)
+    return tables[index] if index is not None else {"tables": tables}
+
+async def load_page_result(query: str, wanted_fields: Optional[set] = None,
+                           fetch_limit: Optional[asyncio.Semaphore] = None,
+                           parse_pool: Optional[ProcessPoolExecutor] = None,
+                           timer: StageTimer = NULL_TIMER) -> Dict[str, Any]:
+    """Fetch a page and return its (possibly cached) extraction result.
+
+    `query` is a page title as it is written, not URL-encoded; the endpoints decode their
+    input, so a title with a literal "%" such as "100%_(song)" reaches this unchanged.
+    `fetch_limit` bounds concurrent upstream fetches; `parse_pool` runs parsing in worker
+    processes instead of the threadpool. Concurrent calls for the same page and fields
+    share one fetch and extraction. Raises httpx.HTTPError when the fetch fails.
+    """
+    # Construct the external URL using the provided query as the title
+    external_api_url = f"{WIKI_BASE_URL}/wiki/{query}"
+    
+    # Other spellings and redirects of a page seen before are fetched under its canonical title
+    title = await title_aliases.resolve(query)
+    key = (title, None if wanted_fields is None else tuple(sorted(wanted_fields)))
+    started = time.perf_counter()
+    result, shared = await page_results.do(
+        key, lambda: extract_page_result(query, title, external_api_url, wanted_fields, fetch_limit, parse_pool, timer)
+    )
+    if shared:
+        # The stages were timed by the request that did the work
+        timer.add("coalesced", time.perf_counter() - started)
+        return with_request_url(result, external_api_url)
+    return result
+
+# Concurrent identical requests share one fetch and extraction (see load_page_result)
+page_results = SingleFlight()
+
+async def extract_page_result(query: str, title: str, external_api_url: str, wanted_fields: Optional[set],
+                              fetch_limit: Optional[asyncio.Semaphore], parse_pool: Optional[ProcessPoolExecutor],
+                              timer: StageTimer) -> Dict[str, Any]:
+    """The work behind load_page_result: fetch `title`, then reuse a cached result or extract one.
+
+    `query` is the title as requested, which `external_api_url` names; `title` is what it resolved to.
+    """
+    # --- Fetch HTML Content ---
+    # Served from the page cache when possible, revalidated with a conditional GET when stale.
+    # With the lxml-native backend, a downloaded page is parsed while it arrives.
+    stream = None
+    if PARSE_WHILE_DOWNLOADING and parse_pool is None and FETCH_MODE == "page" and resolve_backend() == NATIVE_BACKEND:
+        stream = StreamingParse()
+    fetch_url = page_url(title)
+    try:
+        async with fetch_limit or nullcontext():
+            with timer.stage("fetch"):
+                if stream is None:
+                    html_content = await fetch_page_html(title, fetch_url)
+                else:
+                    html_content, cached_result = await stream_page_html(title, fetch_url, stream)
+                    if html_content is None:
+                        # The head named a revision that was already extracted
+                        await learn_title(query, title, stream.head)
+                        timer.add("result_cache_hit", 0.0)
+                        return project_result(with_request_url(cached_result, external_api_url), wanted_fields)
+        HTML_LENGTH.observe(len(html_content))
+        await learn_title(query, title, html_content)
+        
+        # A page revision that was already extracted needs no parsing at all
+        identity = page_identity(html_content)
+        if identity:
+            cached_result = result_cache.get(*identity)
+            if cached_result is not None:
+                timer.add("result_cache_hit", 0.0)
+                return project_result(with_request_url(cached_result, external_api_url), wanted_fields)
+        
+        # Parsing is CPU-bound, so run it off the event loop
+        page = await stream.page(html_content) if stream is not None else None
+    finally:
+        # Ends the parse of a download that is not used, e.g. after a result cache hit
+        if stream is not None:
+            stream.discard()
+    if page is not None:
+        timer.add("parse_while_downloading", stream.seconds)
+    if parse_pool is None:
+        result = await run_in_threadpool(build_page_result, html_content, external_api_url, None, wanted_fields, timer,
+                                         page)
+    else:
+        # Stages inside a worker process can't be timed individually
+        with timer.stage("extract_in_process"):
+            result = await asyncio.get_running_loop().run_in_executor(
+                parse_pool, build_page_result, html_content, external_api_url, None, wanted_fields
+            )
+    # Only complete results are cached; projections of them are cheap
+    if identity and wanted_fields is None:
+        result_cache.put(*identity, result)
+    # Newly extracted revisions become searchable (see search_index.py)
+    if identity and (wanted_fields is None or SEARCHABLE_FIELDS <= wanted_fields):
+        await run_in_threadpool(search_index.add_page, identity[0], result, identity[1])
+    return result
+
+async def stream_page_html(query: str, external_api_url: str,
+                           stream: StreamingParse) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Fetch a page for `stream` to parse, looking up its revision as soon as the head is in.
+
+    Returns (HTML, None), or (None, cached result) when the result cache already has that
+    revision; the rest of the body then downloads in the background to refresh the page cache.
+    """
+    fetch = asyncio.ensure_future(fetch_page_html(query, external_api_url, on_text=stream.feed))
+    head = asyncio.ensure_future(stream.head_ready.wait())
+    try:
+        await asyncio.wait((fetch, head), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        head.cancel()
+    if not fetch.done():
+        identity = page_identity(stream.head)
+        cached_result = result_cache.get(*identity) if identity else None
+        if cached_result is not None:
+            stream.discard()
+            _background_tasks.add(fetch)
+            fetch.add_done_callback(_background_tasks.discard)
+            # Nobody awaits the download any more; a failure only shows in the upstream stats
+            fetch.add_done_callback(lambda task: task.cancelled() or task.exception())
+            return None, cached_result
+    return await fetch, None
+
+async def learn_title(query: str, title: str, html_content: str):
+    """Remember the canonical title of a fetched page for the query and the title it was fetched under."""
+    canonical = canonical_title(html_content)
+    if canonical:
+        await title_aliases.learn((query, title), canonical)
+
+def with_request_url(result: Dict[str, Any], url: str) -> Dict[str, Any]:
+    """Return a cached result with page_metadata.url set to the URL of the current request."""
+    metadata = result.get("page_metadata")
+    if not metadata or metadata.url == url:
+        return result
+    return dict(result, page_metadata=dataclasses.replace(metadata, url=url))
+
+@app.get("/v1/schema")
+def result_schema():
+    """JSON Schema of the /v1/longSearch result, for clients to validate or generate types from."""
+    return json_schema()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage latency and size histograms in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/v1/cache/stats")
+def cache_stats():
+    """Counters for the page and result caches, shared concurrent fetches and extractions, and title aliases."""
+    return {"page_cache": page_cache.snapshot(), "result_cache": result_cache.snapshot(),
+            "page_fetches": page_fetches.snapshot(), "page_results": page_results.snapshot(),
+            "title_aliases": title_aliases.snapshot()}
+
+@app.get("/v1/upstream/stats")
+def upstream_stats():
+    """Requests, retries and throttling seen by the upstream policy, and its current concurrency limit."""
+    return upstream.snapshot()
+
+async def refresh_page(title: str) -> Dict[str, Any]:
+    """Scrape a page again, revalidating it upstream even if its cached copy is still fresh."""
+    await expire_page(await title_aliases.resolve(title))
+    return await load_page_result(title)
+
+# Titles kept fresh by re-scraping them when their revision changes (see watchlist.py)
+watchlist = Watchlist(scrape=refresh_page)
+
+# Keeps background tasks referenced until they finish
+_background_tasks: set = set()
+
+class WatchlistRequest(BaseModel):
+    titles: List[str]
+
+@app.post("/v1/watchlist")
+async def watchlist_add(request: WatchlistRequest):
+    """Start keeping titles fresh."""
+    return {"added": await watchlist.add([unquote(title) for title in request.titles])}
+
+@app.post("/v1/watchlist/remove")
+async def watchlist_remove(request: WatchlistRequest):
+    """Stop keeping titles fresh."""
+    return {"removed": await watchlist.remove([unquote(title) for title in request.titles])}
+
+@app.get("/v1/watchlist/stats")
+async def watchlist_stats():
+    """How many watched titles are unchecked, changed or missing, and what the last refresh cycle did."""
+    return await watchlist.snapshot()
+
+@app.post("/v1/watchlist/refresh", status_code=202)
+async def watchlist_refresh():
+    """Start a refresh cycle in the background; its report appears in the stats when it finishes."""
+    if watchlist.refreshing:
+        raise HTTPException(status_code=409, detail="A refresh cycle is already running")
+    task = asyncio.create_task(watchlist.refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return {"started": True}
+
+@app.get("/v1/search")
+def search(q: str = Query(..., description="Words to look for in the sections, introductions and infoboxes of scraped pages"),
+           limit: int = Query(10, ge=1, le=100, description="Most hits to return")):
+    """BM25-ranked sections of pages scraped so far; never fetches anything upstream."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="The query is empty")
+    return search_index.search(q, limit)
+
+@app.get("/v1/search/stats")
+def search_stats():
+    """Pages, documents and segments in the search index, and its indexing, flush and merge counters."""
+    return search_index.snapshot()
+
+# Every field of the /v1/longSearch result, in output order, with the fields it is computed from
+RESULT_FIELDS: Dict[str, tuple] = {
+    "page_metadata": (),
+    "page_type": (),
+    "page_type_confidence": (),
+    "summary": ("introduction", "sections", "page_type"),
+    "infobox_data": (),
+    "introduction": (),
+    "table_of_contents": (),
+    "sections": (),
+    "images": (),
+    "tables": (),
+    "lists": (),
+    "coordinates": (),
+    "references": (),
+    "external_links": (),
+    "related_pages": (),
+    "language_links": (),
+    "categories": (),
+    "special_data": ("page_type", "infobox_data", "sections"),
+    "disambiguation_info": (),
+    "taxonomic_data": ("page_type",),
+    "media": (),
+    "page_stats": (),
+    "html_length": (),
+    # Only produced for disambiguation pages
+    "disambiguation_options": (),
+}
+
+def resolve_fields(fields: Optional[str] = None, exclude: Optional[str] = None) -> Optional[set]:
+    """Turn comma-separated `fields` / `exclude` parameters into the set of fields to return.
+
+    Returns None when every field is wanted. Raises ValueError for unknown field names.
+    """
+    if not fields and not exclude:
+        return None
+    requested = set(RESULT_FIELDS)
+    if fields:
+        requested = {name.strip() for name in fields.split(',') if name.strip()}
+    excluded = {name.strip() for name in (exclude or '').split(',') if name.strip()}
+    unknown = (requested | excluded) - set(RESULT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return requested - excluded
+
+def negotiate_response(accept: Optional[str], accept_encoding: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Pick the body media type and content coding from the request headers (see serialization.py)."""
+    media_type = negotiate_media_type(accept)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Can only respond with {', '.join(ENCODERS)}")
+    return media_type, negotiate_coding(accept_encoding)
+
+def resolve_table_format(table_format: str) -> str:
+    """Validate the table orientation asked for; raises ValueError for unknown ones."""
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format '{table_format}', expected one of {', '.join(TABLE_FORMATS)}")
+    return table_format
+
+def with_table_format(result: Dict[str, Any], table_format: str) -> Dict[str, Any]:
+    """Return the result with its tables in the requested orientation (see tables.format_tables)."""
+    if table_format == "rows" or not result.get("tables"):
+        return result
+    return dict(result, tables=format_tables(result["tables"], table_format))
+
+def expand_fields(fields: Iterable[str]) -> set:
+    """Add the fields that the given fields are computed from, recursively."""
+    needed = set()
+    pending = list(fields)
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(RESULT_FIELDS[name])
+    return needed
+
+def build_page_result(html_content: str, external_api_url: str, parser_backend: Optional[str] = None,
+                      fields: Optional[set] = None, timer: StageTimer = NULL_TIMER,
+                      page: Optional[ParsedPage] = None) -> Dict[str, Any]:
+    """Parse article HTML and run the extractors over it, producing the /v1/longSearch result.
+
+    `fields` (see resolve_fields) limits the output; extractors for fields that are neither
+    requested nor needed by a requested field are not run. `page` is the HTML already
+    parsed, if it was (see StreamingParse).
+    """
+    parts = dict(iter_page_result(html_content, external_api_url, parser_backend, fields, timer, page))
+    return {k: parts[k] for k in RESULT_FIELDS if k in parts}
+
+def iter_page_result(html_content: str, external_api_url: str, parser_backend: Optional[str] = None,
+                     fields: Optional[set] = None, timer: StageTimer = NULL_TIMER,
+                     page: Optional[ParsedPage] = None) -> Iterator[Tuple[str, Any]]:
+    """Yield the (field, value) pairs of the result as soon as each one is extracted.
+
+    Page metadata and the infobox come first, before the document walk; empty and
+    unrequested fields are skipped. Each step is timed into `timer` (see metrics.py).
+    """
+    requested = set(RESULT_FIELDS) if fields is None else set(fields)
+    needed = expand_fields(requested)
+    values: Dict[str, Any] = {}
+    
+    def ready(*names: str) -> Iterator[Tuple[str, Any]]:
+        for name in names:
+            if name in requested and values.get(name):
+                yield name, values[name]
+    
+    # Parse the HTML with the configured backend (see parsing.py)
+    if page is None:
+        with timer.stage("parse"):
+            page = parse_html(html_content, parser_backend)
+    soup = page.soup
+    # Compact documents from the action=parse API carry their metadata ready-made (see mediawiki.py)
+    page_data = read_page_data(html_content)
     
     # Check if the page is a disambiguation page
-    if is_disambiguation_page(soup):
-        return extract_disambiguation_page(soup, external_api_url)
+    if is_disambiguation_page(soup) or (page_data is not None and page_data["disambiguation"]):
+        with timer.stage("disambiguation_page"):
+            values = extract_disambiguation_page(page.full_soup(), external_api_url)
+        yield from ready(*values)
+        return
     
     # --- Extract Data ---
     
     # 1. Page Title and basic metadata
-    page_metadata = extract_page_metadata(soup, external_api_url)
+    if "page_metadata" in needed:
+        with timer.stage("page_metadata"):
+            values["page_metadata"] = extract_page_metadata(soup, external_api_url)
+        yield from ready("page_metadata")
     
     # 2. Determine page type and extract appropriate infobox data
-    page_type, infobox_data = extract_infobox_and_determine_type(soup)
+    if needed & {"page_type", "page_type_confidence", "infobox_data"}:
+        with timer.stage("infobox"):
+            category_text = ' '.join(page_data["categories"]) if page_data else None
+            values["page_type"], values["infobox_data"], values["page_type_confidence"] = \
+                extract_infobox_and_determine_type(soup, page.introduction(), category_text)
+        yield from ready("page_type", "page_type_confidence", "infobox_data")
+    
+    # Walk the document once for every extractor that needs a full-tree scan
+    # (3. introduction, 5. sections, 6. images, 7. tables, 8. references, 10. external links,
+    # 11. related pages, 16. lists, 17. hatnotes, 19. media and 20. page statistics)
+    walk_timings = None if timer is NULL_TIMER else {}
+    with timer.stage("walk"):
+        values.update(page.walk([name for name in VISITORS if name in needed], walk_timings))
+    for name, seconds in (walk_timings or {}).items():
+        timer.add(f"walk.{name}", seconds)
+    # Free the article body the remaining extractors don't read (scoped parses only)
+    page.release_body()
     
-    # 3. Introduction (First Non-Empty Paragraph)
-    introduction = extract_introduction(soup)
+    # 15. Generate summary
+    if "summary" in needed:
+        with timer.stage("summary"):
+            values["summary"] = generate_summary(values["introduction"], values["sections"], values["page_type"])
+    yield from ready("summary", "introduction")
     
     # 4. Table of Contents
-    toc = extract_table_of_contents(soup)
-    
-    # 5. Extract all sections with their content
-    sections = extract_sections(soup)
-    
-    # 6. Extract all images with their captions
-    images = extract_images(soup)
-    
-    # 7. Extract all tables
-    tables = extract_tables(soup)
-    
-    # 8. Extract references/citations
-    references = extract_references(soup)
-    
-    # 9. Extract categories
-    categories = extract_categories(soup)
-    
-    # 10. Extract external links
-    external_links = extract_external_links(soup)
-    
-    # 11. Related Wikipedia pages (internal links)
-    related_pages = extract_related_pages(soup)
+    if "table_of_contents" in needed:
+        with timer.stage("table_of_contents"):
+            values["table_of_contents"] = extract_table_of_contents(soup)
+    yield from ready("table_of_contents", "sections", "images", "tables", "lists")
     
     # 12. Extract coordinates (for geographical articles)
-    coordinates = extract_coordinates(soup)
+    if "coordinates" in needed:
+        with timer.stage("coordinates"):
+            values["coordinates"] = extract_coordinates(soup)
+    yield from ready("coordinates", "references", "external_links", "related_pages")
     
     # 13. Extract language links
-    language_links = extract_language_links(soup)
-    
-    # 14. Extract special data based on page type
-    special_data = extract_special_data(soup, page_type, infobox_data, sections)
-    
-    # 15. Generate summary
-    summary = generate_summary(introduction, sections, page_type)
+    if "language_links" in needed:
+        with timer.stage("language_links"):
+            if page_data:
+                values["language_links"] = [LanguageLink(link["language"], link["url"]) for link in page_data["language_links"]]
+            else:
+                values["language_links"] = extract_language_links(soup)
     
-    # 16. Extract lists (if available)
-    lists = extract_lists(soup)
+    # 9. Extract categories
+    if "categories" in needed:
+        with timer.stage("categories"):
+            values["categories"] = page_data["categories"] if page_data else extract_categories(soup)
     
-    # 17. Extract hatnotes and disambiguation info
-    disambiguation_info = extract_disambiguation(soup)
+    # 14. Extract special data based on page type
+    if "special_data" in needed:
+        with timer.stage("special_data"):
+            values["special_data"] = extract_special_data(soup, values["page_type"], values["infobox_data"], values["sections"])
+    yield from ready("language_links", "categories", "special_data", "disambiguation_info")
     
     # 18. Extract taxonomic classification (for species pages)
-    taxonomic_data = extract_taxonomic_data(soup) if page_type == "species" else {}
-    
-    # 19. Extract associated media (audio, video)
-    media = extract_media(soup)
-    
-    # 20. Extract page statistics
-    page_stats = extract_page_stats(soup)
-    
-    # Build and return the result
-    result = {
-        "page_metadata": page_metadata,
-        "page_type": page_type,
-        "summary": summary,
-        "infobox_data": infobox_data,
-        "introduction": introduction,
-        "table_of_contents": toc,
-        "sections": sections,
-        "images": images,
-        "tables": tables,
-        "lists": lists,
-        "coordinates": coordinates,
-        "references": references,
-        "external_links": external_links,
-        "related_pages": related_pages,
-        "language_links": language_links,
-        "categories": categories,
-        "special_data": special_data,
-        "disambiguation_info": disambiguation_info,
-        "taxonomic_data": taxonomic_data,
-        "media": media,
-        "page_stats": page_stats,
-        "html_length": len(html_content)
-    }
-    
-    # Remove empty fields for cleaner output
-    result = {k: v for k, v in result.items() if v}
+    if "taxonomic_data" in needed:
+        with timer.stage("taxonomic_data"):
+            values["taxonomic_data"] = extract_taxonomic_data(soup) if values["page_type"] == "species" else {}
     
-    return result
+    values["html_length"] = len(html_content)
+    yield from ready("taxonomic_data", "media", "page_stats", "html_length")
+
+def iter_ndjson(parts: Iterable[Tuple[str, Any]]) -> Iterator[bytes]:
+    """Encode result parts as NDJSON lines: one line per field, one per entry for list fields."""
+    try:
+        for field, value in parts:
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    yield _ndjson_line({"field": field, "index": index, "value": item})
+            else:
+                yield _ndjson_line({"field": field, "value": value})
+    except Exception as e:
+        # The status line has already been sent, so report the failure in-band
+        yield _ndjson_line({"error": f"Error processing page: {e}"})
+        return
+    yield _ndjson_line({"done": True})
+
+def _ndjson_line(record: Dict[str, Any]) -> bytes:
+    return fast_json(record) + b"\n"
+
+def project_result(result: Dict[str, Any], fields: Optional[set]) -> Dict[str, Any]:
+    """Limit a full result to the requested fields."""
+    if fields is None:
+        return result
+    return {k: v for k, v in result.items() if k in fields}
 
 def is_disambiguation_page(soup: BeautifulSoup) -> bool:
     """Check if the current page is a disambiguation page."""
@@ -188,41 +688,42 @@ def extract_disambiguation_page(soup: BeautifulSoup, url: str) -> Dict[str, Any]
     return {
         "page_metadata": page_metadata,
         "page_type": "disambiguation",
+        "page_type_confidence": 1.0,
         "introduction": introduction,
         "disambiguation_options": options
     }
 
-def extract_page_metadata(soup: BeautifulSoup, url: str) -> Dict[str, Any]:
+def extract_page_metadata(soup: BeautifulSoup, url: str) -> PageMetadata:
     """Extract basic page metadata."""
-    metadata = {
-        "title": soup.title.string.strip() if soup.title else "Title not found",
-        "url": url,
-        "canonical_url": "",
-        "description": "",
-        "last_modified": "",
-        "protection_status": {},
-        "talk_page": "",
-        "view_history": ""
-    }
+    metadata = PageMetadata(
+        title=soup.title.string.strip() if soup.title else "Title not found",
+        url=url,
+        canonical_url="",
+        description="",
+        last_modified="",
+        protection_status={},
+        talk_page="",
+        view_history=""
+    )
     
     # Extract page title without " - Wikipedia" suffix
-    if " - Wikipedia" in metadata["title"]:
-        metadata["title"] = metadata["title"].split(" - Wikipedia")[0].strip()
+    if " - Wikipedia" in metadata.title:
+        metadata.title = metadata.title.split(" - Wikipedia")[0].strip()
     
     # Extract canonical URL
     canonical_link = soup.find('link', rel='canonical')
     if canonical_link and canonical_link.get('href'):
-        metadata["canonical_url"] = canonical_link['href']
+        metadata.canonical_url = canonical_link['href']
     
     # Extract meta description
     meta_desc = soup.find('meta', attrs={'name': 'description'})
     if meta_desc and meta_desc.get('content'):
-        metadata["description"] = meta_desc['content']
+        metadata.description = meta_desc['content']
     
     # Extract last modified date
     footer_info = soup.find('li', id='footer-info-lastmod')
     if footer_info:
-        metadata["last_modified"] = footer_info.get_text(strip=True)
+        metadata.last_modified = footer_info.get_text(strip=True)
     
     # Extract protection status
     protection_banner = soup.find('div', {'id': 'mw-indicator-protection-status'})
@@ -231,52 +732,49 @@ def extract_page_metadata(soup: BeautifulSoup, url: str) -> Dict[str, Any]:
         for link in protection_links:
             protection_type = link.get('title', '')
             if protection_type:
-                metadata["protection_status"][protection_type] = True
+                metadata.protection_status[protection_type] = True
     
     # Extract talk page link
     talk_tab = soup.find('li', id='ca-talk')
     if talk_tab and talk_tab.find('a'):
         talk_link = talk_tab.find('a').get('href', '')
         if talk_link:
-            metadata["talk_page"] = urljoin(url, talk_link)
+            metadata.talk_page = urljoin(url, talk_link)
     
     # Extract view history link
     history_tab = soup.find('li', id='ca-history')
     if history_tab and history_tab.find('a'):
         history_link = history_tab.find('a').get('href', '')
         if history_link:
-            metadata["view_history"] = urljoin(url, history_link)
+            metadata.view_history = urljoin(url, history_link)
     
     return metadata
 
-def extract_infobox_and_determine_type(soup: BeautifulSoup) -> tuple:
-    """Extract infobox data and determine the page type based on infobox class and content."""
-    page_type = "unknown"
+def extract_infobox_and_determine_type(soup: BeautifulSoup, introduction: Optional[str] = None,
+                                       category_text: Optional[str] = None) -> tuple:
+    """Extract infobox data and determine the page type (see classifier.py).
+
+    Returns (page_type, infobox_data, confidence). Pass `introduction` and `category_text`
+    when they are already known to avoid extracting them a second time.
+    """
     infobox_data = {}
     
     # Try to find any infobox
     infobox = soup.find('table', class_=lambda c: c and 'infobox' in c)
+    class_text = ' '.join(infobox.get('class', [])) if infobox else ''
+    if category_text is None:
+        categories = soup.find('div', id='mw-normal-catlinks')
+        category_text = categories.get_text() if categories else ''
+    intro = introduction if introduction is not None else extract_introduction(soup)
+    
+    # Score every page type against the infobox class, categories and introduction at once
+    classification = classify(class_text, category_text, intro)
     
     if infobox:
         # Store infobox class as it helps determine content type
-        infobox_classes = infobox.get('class', [])
-        infobox_data["_infobox_class"] = ' '.join(infobox_classes)
-        
-        # Determine page type based on infobox class
-        if any(cls in ' '.join(infobox_classes) for cls in ['biography', 'vcard']):
-            page_type = "person"
-        elif any(cls in ' '.join(infobox_classes) for cls in ['geography', 'settlement', 'country', 'SettlementBox']):
-            page_type = "place"
-        elif any(cls in ' '.join(infobox_classes) for cls in ['species', 'taxobox']):
-            page_type = "species"
-        elif any(cls in ' '.join(infobox_classes) for cls in ['organization', 'company']):
-            page_type = "organization"
-        elif any(cls in ' '.join(infobox_classes) for cls in ['event', 'conflict']):
-            page_type = "event"
-        elif any(cls in ' '.join(infobox_classes) for cls in ['book', 'album', 'film', 'television', 'game']):
-            page_type = "media"
-        elif any(cls in ' '.join(infobox_classes) for cls in ['building', 'structure']):
-            page_type = "structure"
+        infobox_data["_infobox_class"] = class_text
+        # Rows are interpreted by what the infobox class alone says the page is
+        infobox_type = classification.tier_types.get("class", "unknown")
         
         # Extract caption if available
         caption = infobox.find('caption')
@@ -296,156 +794,64 @@ def extract_infobox_and_determine_type(soup: BeautifulSoup) -> tuple:
                 label = header_cell.get_text(strip=True)
                 
                 # Process common infobox fields based on the label
-                process_infobox_field(label, data_cell, infobox_data, page_type)
+                process_infobox_field(label, data_cell, infobox_data, infobox_type)
             
             # Row with just an image (common in many infoboxes)
             elif not header_cell and data_cell:
                 extract_infobox_image(data_cell, infobox_data)
     
-    # Additional page type detection based on categories
-    if page_type == "unknown":
-        categories = soup.find('div', id='mw-normal-catlinks')
-        if categories:
-            cat_text = categories.get_text().lower()
-            
-            if any(term in cat_text for term in ['person', 'people', 'births', 'deaths']):
-                page_type = "person"
-            elif any(term in cat_text for term in ['city', 'town', 'country', 'place', 'geography']):
-                page_type = "place"
-            elif any(term in cat_text for term in ['species', 'animal', 'plant', 'fungus']):
-                page_type = "species"
-            elif any(term in cat_text for term in ['organization', 'company', 'corporation']):
-                page_type = "organization"
-            elif any(term in cat_text for term in ['event', 'conflict', 'war', 'battle']):
-                page_type = "event"
-            elif any(term in cat_text for term in ['book', 'film', 'movie', 'album', 'television']):
-                page_type = "media"
-            elif any(term in cat_text for term in ['concept', 'theory', 'philosophy']):
-                page_type = "concept"
-    
-    # If still unknown, try to determine from content
-    if page_type == "unknown":
-        intro = extract_introduction(soup)
-        intro_lower = intro.lower()
-        
-        if any(term in intro_lower for term in [' born ', ' died ', 'is an american', 'is a british']):
-            page_type = "person"
-        elif any(term in intro_lower for term in ['city', 'town', 'capital', 'country', 'region']):
-            page_type = "place"
-        elif any(term in intro_lower for term in ['species', 'genus', 'family', 'phylum']):
-            page_type = "species"
-        elif any(term in intro_lower for term in ['company', 'corporation', 'organization', 'founded']):
-            page_type = "organization"
-        elif any(term in intro_lower for term in ['event', 'conflict', 'war', 'battle', 'took place']):
-            page_type = "event"
-        elif any(term in intro_lower for term in ['book', 'novel', 'film', 'movie', 'album', 'tv series']):
-            page_type = "media"
-        elif any(term in intro_lower for term in ['concept', 'theory', 'philosophy', 'refers to']):
-            page_type = "concept"
-    
-    return page_type, infobox_data
+    return classification.page_type, infobox_data, classification.confidence
+
+# Regexes used by the infobox field handlers, compiled once
+CITATION_RE = re.compile(r'\[\d+\]')
+AGE_RE = re.compile(r'age\s+(\d+)', re.IGNORECASE)
+AGE_IN_PARENS_RE = re.compile(r'\(\s*age\s+\d+\s*\)')
+LEADING_PAREN_RE = re.compile(r'^\s*\(\s*')
+TRAILING_PAREN_RE = re.compile(r'\s*\)\s*$')
+MONTH_OR_NUMBER_RE = re.compile(r'^(January|February|March|April|May|June|July|August|September|October|November|December|\d+)$')
+DAY_MONTH_YEAR_RE = re.compile(r'(\d{1,2}\s+\w+\s+\d{4})')
+AGED_RE = re.compile(r'\(aged\s+\d+\)')
+CAUSE_OF_DEATH_RE = re.compile(r'(?:cause of death|died from|died of)[:\s]+([^)]+)', re.IGNORECASE)
+AGE_AT_DEATH_RE = re.compile(r'\(aged\s+(\d+)\)', re.IGNORECASE)
+MARRIAGE_RE = re.compile(r'\(\s*(?:m\.|married)\s*([\d\w\s\-–]+)(?:(?:;|,|\s+to\s+)?\s*(?:div\.|divorced)\s*([\d\w\s\-–]+))?\s*\)', re.IGNORECASE)
+MARRIED_DATE_RE = re.compile(r'\(\s*(?:m\.|married)\s*([\d\w\s\-–]+)\s*\)', re.IGNORECASE)
+DATE_RANGE_RE = re.compile(r'\(\s*([\d\w\s\-–]+)\s*(?:to|–|-)\s*([\d\w\s\-–]+|\bpresent\b)\s*\)', re.IGNORECASE)
+NUMBER_RE = re.compile(r'([\d,]+)')
+YEAR_IN_PARENS_RE = re.compile(r'\((\d{4})\)')
+AREA_RE = re.compile(r'([\d,.]+)\s*(km²|sq\s*km|square\s*kilometers?|mi²|square\s*miles?)', re.IGNORECASE)
+COORDINATES_RE = re.compile(r'([-\d.]+)[°\s]*[NS][;\s]*([-\d.]+)[°\s]*[EW]')
+DATE_RES = [
+    re.compile(r'(\d{1,2}\s+\w+\s+\d{4})'),  # 25 December 2000
+    re.compile(r'(\w+\s+\d{1,2},\s+\d{4})'),  # December 25, 2000
+    re.compile(r'(\d{4})'),  # Just year
+]
+URL_RE = re.compile(r'https?://')
+
+# Handler for one infobox row: (data cell, infobox data to fill in, cleaned label)
+InfoboxHandler = Callable[[BeautifulSoup, Dict[str, Any], str], None]
+
+# Infobox row handlers keyed by (page type, lower-cased label); a page type of None
+# applies to every page type. Filled in at the end of this module.
+INFOBOX_HANDLERS: Dict[Tuple[Optional[str], str], InfoboxHandler] = {}
+
+def register_infobox_handler(labels: Iterable[str], handler: InfoboxHandler, page_types: Iterable[Optional[str]] = (None,)):
+    """Use `handler` for infobox rows with one of `labels` on pages of the given types.
+
+    Handlers for a specific page type take precedence over those registered for all types;
+    registering a label again replaces its handler.
+    """
+    for page_type in page_types:
+        for label in labels:
+            INFOBOX_HANDLERS[(page_type, label.lower())] = handler
 
 def process_infobox_field(label: str, data_cell: BeautifulSoup, infobox_data: Dict[str, Any], page_type: str):
-    """Process an infobox field based on its label and page type."""
+    """Process an infobox field with the handler registered for its label and page type."""
     label_lower = label.lower()
-    clean_label = re.sub(r'\[\d+\]', '', label).strip()
-    
-    # Person-specific fields
-    if page_type == "person" and label_lower in ['born', 'birth date', 'date of birth']:
-        extract_birth_info(data_cell, infobox_data)
-    
-    elif page_type == "person" and label_lower in ['died', 'death date', 'date of death']:
-        extract_death_info(data_cell, infobox_data)
-    
-    elif page_type == "person" and label_lower in ['spouse', 'spouses', 'partner', 'partners']:
-        extract_relationship_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "person" and label_lower in ['occupations', 'occupation', 'profession', 'professions']:
-        extract_list_or_text(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "person" and label_lower in ['known for', 'notable works', 'works']:
-        extract_list_or_text(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "person" and label_lower in ['education', 'alma mater', 'school']:
-        extract_list_or_text(data_cell, infobox_data, clean_label)
-    
-    # Place-specific fields
-    elif page_type == "place" and label_lower in ['population', 'population total']:
-        extract_population_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "place" and label_lower in ['area', 'area total']:
-        extract_area_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "place" and label_lower in ['coordinates', 'location', 'position']:
-        extract_location_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "place" and label_lower in ['country', 'state', 'province', 'region']:
-        extract_administrative_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "place" and label_lower in ['time zone', 'climate', 'elevation']:
-        extract_generic_field(data_cell, infobox_data, clean_label)
-    
-    # Organization-specific fields
-    elif page_type == "organization" and label_lower in ['founded', 'formation', 'established']:
-        extract_date_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "organization" and label_lower in ['headquarters', 'location']:
-        extract_location_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "organization" and label_lower in ['key people', 'leaders', 'ceo', 'chairman']:
-        extract_people_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "organization" and label_lower in ['industry', 'sector', 'revenue', 'employees']:
-        extract_generic_field(data_cell, infobox_data, clean_label)
-    
-    # Event-specific fields
-    elif page_type == "event" and label_lower in ['date', 'period', 'duration']:
-        extract_date_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "event" and label_lower in ['location', 'place', 'venue']:
-        extract_location_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "event" and label_lower in ['participants', 'combatants']:
-        extract_participants_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "event" and label_lower in ['casualties', 'result', 'outcome']:
-        extract_generic_field(data_cell, infobox_data, clean_label)
-    
-    # Media-specific fields
-    elif page_type == "media" and label_lower in ['author', 'director', 'producer', 'creator']:
-        extract_people_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "media" and label_lower in ['release date', 'published', 'publication date']:
-        extract_date_info(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "media" and label_lower in ['genre', 'language', 'budget', 'box office']:
-        extract_generic_field(data_cell, infobox_data, clean_label)
-    
-    # Species-specific fields
-    elif page_type == "species" and label_lower in ['kingdom', 'phylum', 'class', 'order', 'family', 'genus']:
-        extract_taxonomic_field(data_cell, infobox_data, clean_label)
-    
-    elif page_type == "species" and label_lower in ['binomial', 'conservation status', 'range']:
-        extract_generic_field(data_cell, infobox_data, clean_label)
-    
-    # Structure-specific fields
-    elif page_type == "structure" and label_lower in ['architect', 'architecture', 'built', 'height']:
-        extract_generic_field(data_cell, infobox_data, clean_label)
-    
-    # Concept-specific fields
-    elif page_type == "concept" and label_lower in ['field', 'sub-fields', 'main proponents']:
-        extract_list_or_text(data_cell, infobox_data, clean_label)
-    
-    # Common fields for all page types
-    elif label_lower in ['website', 'url', 'homepage']:
-        extract_website_info(data_cell, infobox_data, clean_label)
-    
-    elif label_lower in ['image', 'map', 'photo', 'flag', 'logo']:
-        extract_infobox_image(data_cell, infobox_data, clean_label)
-    
-    # Default extraction for any other field
-    else:
-        extract_generic_field(data_cell, infobox_data, clean_label)
+    clean_label = CITATION_RE.sub('', label).strip()
+    handler = (INFOBOX_HANDLERS.get((page_type, label_lower))
+               or INFOBOX_HANDLERS.get((None, label_lower))
+               or extract_generic_field)
+    handler(data_cell, infobox_data, clean_label)
 
 def extract_generic_field(data_cell: BeautifulSoup, infobox_data: Dict[str, Any], label: str):
     """Extract data from a generic infobox field."""
@@ -487,8 +893,8 @@ def extract_generic_field(data_cell: BeautifulSoup, infobox_data: Dict[str, Any]
             else:
                 infobox_data[label] = text
 
-def extract_infobox_image(data_cell: BeautifulSoup, infobox_data: Dict[str, Any]):
-    """Extract image information from an infobox cell."""
+def extract_infobox_image(data_cell: BeautifulSoup, infobox_data: Dict[str, Any], label: Optional[str] = None):
+    """Extract image information from an infobox cell (images are collected under "images", whatever the label)."""
     # Look for image elements
     img = data_cell.find('img')
     if img:
@@ -526,7 +932,7 @@ def extract_birth_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any]):
     age_tag = data_cell.find('span', class_='noprint ForceAgeToShow')
     if age_tag:
         age_text = age_tag.get_text(strip=True)
-        age_match = re.search(r'age\s+(\d+)', age_text, re.IGNORECASE)
+        age_match = AGE_RE.search(age_text)
         if age_match:
             birth_info['age'] = age_match.group(1)
     
@@ -539,13 +945,13 @@ def extract_birth_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any]):
         cell_text = data_cell.get_text(strip=True)
         if 'date' in birth_info:
             # Remove the birth date and clean up
-            place_text = re.sub(birth_info['date'], '', cell_text).strip()
+            place_text = cell_text.replace(birth_info['date'], '').strip()
             # Remove age information if present
             if 'age' in birth_info:
-                place_text = re.sub(r'\(\s*age\s+\d+\s*\)', '', place_text).strip()
+                place_text = AGE_IN_PARENS_RE.sub('', place_text).strip()
             # Clean up remaining text
-            place_text = re.sub(r'^\s*\(\s*', '', place_text)
-            place_text = re.sub(r'\s*\)\s*$', '', place_text)
+            place_text = LEADING_PAREN_RE.sub('', place_text)
+            place_text = TRAILING_PAREN_RE.sub('', place_text)
             if place_text:
                 birth_info['place'] = place_text
     
@@ -557,7 +963,7 @@ def extract_birth_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any]):
             link_text = link.get_text(strip=True)
             # Skip reference numbers and date parts
             if (link_text and not link_text.isdigit() and 
-                not re.match(r'^(January|February|March|April|May|June|July|August|September|October|November|December|\d+)$', link_text)):
+                not MONTH_OR_NUMBER_RE.match(link_text)):
                 birthplace_parts.append({
                     "name": link_text,
                     "url": urljoin('https://en.wikipedia.org', link.get('href', ''))
@@ -579,7 +985,7 @@ def extract_death_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any]):
     
     # If no specific class, try to extract from raw text
     if 'date' not in death_info:
-        date_match = re.search(r'(\d{1,2}\s+\w+\s+\d{4})', data_cell.get_text(strip=True))
+        date_match = DAY_MONTH_YEAR_RE.search(data_cell.get_text(strip=True))
         if date_match:
             death_info['date'] = date_match.group(1)
     
@@ -592,24 +998,24 @@ def extract_death_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any]):
         cell_text = data_cell.get_text(strip=True)
         if 'date' in death_info:
             # Remove the death date and clean up
-            place_text = re.sub(death_info['date'], '', cell_text).strip()
-            place_text = re.sub(r'^\s*\(\s*', '', place_text)
-            place_text = re.sub(r'\s*\)\s*$', '', place_text)
+            place_text = cell_text.replace(death_info['date'], '').strip()
+            place_text = LEADING_PAREN_RE.sub('', place_text)
+            place_text = TRAILING_PAREN_RE.sub('', place_text)
             
             # Remove age at death if present
-            place_text = re.sub(r'\(aged\s+\d+\)', '', place_text).strip()
+            place_text = AGED_RE.sub('', place_text).strip()
             
             if place_text:
                 death_info['place'] = place_text
     
     # Extract cause of death if mentioned
     cell_text = data_cell.get_text(strip=True)
-    cause_match = re.search(r'(?:cause of death|died from|died of)[:\s]+([^)]+)', cell_text, re.IGNORECASE)
+    cause_match = CAUSE_OF_DEATH_RE.search(cell_text)
     if cause_match:
         death_info['cause'] = cause_match.group(1).strip()
     
     # Extract age at death
-    age_match = re.search(r'\(aged\s+(\d+)\)', cell_text, re.IGNORECASE)
+    age_match = AGE_AT_DEATH_RE.search(cell_text)
     if age_match:
         death_info['age_at_death'] = age_match.group(1)
     
@@ -635,14 +1041,14 @@ def extract_relationship_info(data_cell: BeautifulSoup, infobox_data: Dict[str,
             else:
                 text = item.get_text(strip=True)
                 # Clean citation references
-                text = re.sub(r'\[\d+\]', '', text)
+                text = CITATION_RE.sub('', text)
                 relationship['text'] = text
             
             # Extract marriage date/period if available
             text = item.get_text(strip=True)
             
             # Look for marriage dates
-            marriage_dates = re.search(r'\(\s*(?:m\.|married)\s*([\d\w\s\-–]+)(?:(?:;|,|\s+to\s+)?\s*(?:div\.|divorced)\s*([\d\w\s\-–]+))?\s*\)', text, re.IGNORECASE)
+            marriage_dates = MARRIAGE_RE.search(text)
             if marriage_dates:
                 if marriage_dates.group(1):
                     relationship['marriage_date'] = marriage_dates.group(1).strip()
@@ -651,7 +1057,7 @@ def extract_relationship_info(data_cell: BeautifulSoup, infobox_data: Dict[str,
             
             # If no specific marriage marker, look for date ranges in parentheses
             if 'marriage_date' not in relationship and 'text' in relationship:
-                date_range = re.search(r'\(\s*([\d\w\s\-–]+)\s*(?:to|–|-)\s*([\d\w\s\-–]+|\bpresent\b)\s*\)', text, re.IGNORECASE)
+                date_range = DATE_RANGE_RE.search(text)
                 if date_range:
                     relationship['start_date'] = date_range.group(1).strip()
                     relationship['end_date'] = date_range.group(2).strip()
@@ -670,20 +1076,15 @@ def extract_relationship_info(data_cell: BeautifulSoup, infobox_data: Dict[str,
         else:
             text = data_cell.get_text(strip=True)
             # Clean citation references
-            text = re.sub(r'\[\d+\]', '', text)
+            text = CITATION_RE.sub('', text)
             relationship['text'] = text
         
         # Extract marriage date/period if available
         text = data_cell.get_text(strip=True)
         
-        # Look for date patterns
-        date_patterns = [
-            r'\(\s*(?:m\.|married)\s*([\d\w\s\-–]+)\s*\)',  # married date
-            r'\(\s*([\d\w\s\-–]+)\s*(?:to|–|-)\s*([\d\w\s\-–]+|\bpresent\b)\s*\)'  # date range
-        ]
-        
-        for pattern in date_patterns:
-            date_match = re.search(pattern, text, re.IGNORECASE)
+        # Look for a married date, then a date range
+        for pattern in (MARRIED_DATE_RE, DATE_RANGE_RE):
+            date_match = pattern.search(text)
             if date_match:
                 if len(date_match.groups()) == 1:
                     relationship['date'] = date_match.group(1).strip()
@@ -724,20 +1125,17 @@ def extract_introduction(soup: BeautifulSoup) -> str:
             return text
     return ""
 
-def extract_table_of_contents(soup: BeautifulSoup) -> List[Dict[str, str]]:
+def extract_table_of_contents(soup: BeautifulSoup) -> List[TocEntry]:
     toc_list = []
     toc = soup.find('div', {'id': 'toc'})
     if toc:
         for li in toc.find_all('li'):
             link = li.find('a')
             if link and 'href' in link.attrs:
-                toc_list.append({
-                    "title": link.get_text(strip=True),
-                    "anchor": link['href']
-                })
+                toc_list.append(TocEntry(link.get_text(strip=True), link['href']))
     return toc_list
 
-def extract_sections(soup: BeautifulSoup) -> List[Dict[str, Any]]:
+def extract_sections(soup: BeautifulSoup) -> List[Section]:
     sections = []
     content = soup.select_one('#mw-content-text .mw-parser-output')
     if content:
@@ -746,31 +1144,26 @@ def extract_sections(soup: BeautifulSoup) -> List[Dict[str, Any]]:
             if element.name in ['h2', 'h3', 'h4']:
                 if current_section:
                     sections.append(current_section)
-                current_section = {
-                    "heading": element.get_text(strip=True),
-                    "content": ""
-                }
+                current_section = Section(element.get_text(strip=True), "")
             elif current_section and element.name in ['p', 'ul', 'ol']:
-                current_section['content'] += element.get_text(strip=True) + "\n"
+                current_section.content += element.get_text(strip=True) + "\n"
         if current_section:
             sections.append(current_section)
     return sections
 
-def extract_images(soup: BeautifulSoup) -> List[Dict[str, str]]:
+def extract_images(soup: BeautifulSoup) -> List[Image]:
     images = []
     for img in soup.select('.mw-parser-output img'):
         src = img.get('src')
         if src:
             full_url = urljoin('https:', src)
             caption = img.get('alt', '')
-            images.append({"url": full_url, "caption": caption})
+            images.append(Image(full_url, caption))
     return images
 
-def extract_tables(soup: BeautifulSoup) -> List[str]:
-    tables = []
-    for table in soup.find_all('table'):
-        tables.append(str(table))
-    return tables
+def extract_tables(soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    """Headers and typed rows of every data table (see tables.py)."""
+    return walk_document(soup, ["tables"])["tables"]
 
 def extract_references(soup: BeautifulSoup) -> List[str]:
     references = []
@@ -787,23 +1180,23 @@ def extract_categories(soup: BeautifulSoup) -> List[str]:
             categories.append(link.get_text(strip=True))
     return categories
 
-def extract_external_links(soup: BeautifulSoup) -> List[Dict[str, str]]:
+def extract_external_links(soup: BeautifulSoup) -> List[ExternalLink]:
     links = []
     ext_links = soup.select('#mw-content-text a[href^="http"]')
     for link in ext_links:
         href = link.get('href')
         text = link.get_text(strip=True)
         if href and text:
-            links.append({"text": text, "url": href})
+            links.append(ExternalLink(text, href))
     return links
 
-def extract_related_pages(soup: BeautifulSoup) -> List[Dict[str, str]]:
+def extract_related_pages(soup: BeautifulSoup) -> List[RelatedPage]:
     related = []
     for link in soup.select('#mw-content-text a[href^="/wiki/"]'):
         href = link.get('href')
         if ':' not in href:
             full_url = urljoin('https://en.wikipedia.org', href)
-            related.append({"title": link.get_text(strip=True), "url": full_url})
+            related.append(RelatedPage(link.get_text(strip=True), full_url))
     return related
 
 def extract_coordinates(soup: BeautifulSoup) -> Dict[str, str]:
@@ -813,20 +1206,17 @@ def extract_coordinates(soup: BeautifulSoup) -> Dict[str, str]:
         coords["value"] = coord_span.get_text(strip=True)
     return coords
 
-def extract_language_links(soup: BeautifulSoup) -> List[Dict[str, str]]:
+def extract_language_links(soup: BeautifulSoup) -> List[LanguageLink]:
     languages = []
     lang_links = soup.select('#p-lang li.interlanguage-link a')
     for link in lang_links:
-        languages.append({
-            "language": link.get('title'),
-            "url": link.get('href')
-        })
+        languages.append(LanguageLink(link.get('title'), link.get('href')))
     return languages
 
-def extract_special_data(soup: BeautifulSoup, page_type: str, infobox_data: Dict[str, Any], sections: List[Dict[str, Any]]) -> Dict[str, Any]:
+def extract_special_data(soup: BeautifulSoup, page_type: str, infobox_data: Dict[str, Any], sections: List[Section]) -> Dict[str, Any]:
     return {}
 
-def generate_summary(introduction: str, sections: List[Dict[str, Any]], page_type: str) -> str:
+def generate_summary(introduction: str, sections: List[Section], page_type: str) -> str:
     return introduction[:300] + '...'
 
 def extract_lists(soup: BeautifulSoup) -> List[str]:
@@ -861,13 +1251,13 @@ def extract_media(soup: BeautifulSoup) -> List[str]:
             media.append(urljoin('https:', source['src']))
     return media
 
-def extract_page_stats(soup: BeautifulSoup) -> Dict[str, Any]:
-    stats = {}
+def extract_page_stats(soup: BeautifulSoup) -> PageStats:
     # Optional: Count elements for fun stats
-    stats["paragraph_count"] = len(soup.find_all('p'))
-    stats["image_count"] = len(soup.find_all('img'))
-    stats["section_count"] = len(soup.find_all(['h2', 'h3']))
-    return stats
+    return PageStats(
+        paragraph_count=len(soup.find_all('p')),
+        image_count=len(soup.find_all('img')),
+        section_count=len(soup.find_all(['h2', 'h3']))
+    )
 
 def extract_population_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any], label: str):
     """Extract population information for place pages."""
@@ -877,7 +1267,7 @@ def extract_population_info(data_cell: BeautifulSoup, infobox_data: Dict[str, An
     text = data_cell.get_text(strip=True)
     
     # Try to extract the number
-    number_match = re.search(r'([\d,]+)', text)
+    number_match = NUMBER_RE.search(text)
     if number_match:
         try:
             population_info['count'] = int(number_match.group(1).replace(',', ''))
@@ -885,7 +1275,7 @@ def extract_population_info(data_cell: BeautifulSoup, infobox_data: Dict[str, An
             population_info['count'] = number_match.group(1)
     
     # Try to extract the year
-    year_match = re.search(r'\((\d{4})\)', text)
+    year_match = YEAR_IN_PARENS_RE.search(text)
     if year_match:
         population_info['year'] = int(year_match.group(1))
     
@@ -901,7 +1291,7 @@ def extract_area_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any], la
     text = data_cell.get_text(strip=True)
     
     # Try to extract the number and unit
-    area_match = re.search(r'([\d,.]+)\s*(km²|sq\s*km|square\s*kilometers?|mi²|square\s*miles?)', text, re.IGNORECASE)
+    area_match = AREA_RE.search(text)
     if area_match:
         try:
             area_info['value'] = float(area_match.group(1).replace(',', ''))
@@ -921,7 +1311,7 @@ def extract_location_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any]
     coords = data_cell.find('span', class_=['geo', 'coordinates'])
     if coords:
         coord_text = coords.get_text(strip=True)
-        coord_match = re.search(r'([-\d.]+)[°\s]*[NS][;\s]*([-\d.]+)[°\s]*[EW]', coord_text)
+        coord_match = COORDINATES_RE.search(coord_text)
         if coord_match:
             location_info['coordinates'] = {
                 'latitude': float(coord_match.group(1)),
@@ -993,13 +1383,8 @@ def extract_date_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any], la
     if not date_info:
         text = data_cell.get_text(strip=True)
         # Look for common date formats
-        date_patterns = [
-            r'(\d{1,2}\s+\w+\s+\d{4})',  # 25 December 2000
-            r'(\w+\s+\d{1,2},\s+\d{4})',  # December 25, 2000
-            r'(\d{4})',  # Just year
-        ]
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
+        for pattern in DATE_RES:
+            match = pattern.search(text)
             if match:
                 date_info['date'] = match.group(1)
                 break
@@ -1131,9 +1516,43 @@ def extract_website_info(data_cell: BeautifulSoup, infobox_data: Dict[str, Any],
     # If no links found but there's text that looks like a URL
     if not website_info:
         text = data_cell.get_text(strip=True)
-        if re.match(r'https?://', text):
+        if URL_RE.match(text):
             website_info['url'] = text
     
     # Store in infobox data if we found anything
     if website_info:
         infobox_data[label] = website_info
+
+# Infobox row handlers for each page type; rows with other labels go to extract_generic_field
+for _page_types, _labels, _handler in [
+    (("person",), ('born', 'birth date', 'date of birth'), lambda cell, data, label: extract_birth_info(cell, data)),
+    (("person",), ('died', 'death date', 'date of death'), lambda cell, data, label: extract_death_info(cell, data)),
+    (("person",), ('spouse', 'spouses', 'partner', 'partners'), extract_relationship_info),
+    (("person",), ('occupations', 'occupation', 'profession', 'professions'), extract_list_or_text),
+    (("person",), ('known for', 'notable works', 'works'), extract_list_or_text),
+    (("person",), ('education', 'alma mater', 'school'), extract_list_or_text),
+    (("place",), ('population', 'population total'), extract_population_info),
+    (("place",), ('area', 'area total'), extract_area_info),
+    (("place",), ('coordinates', 'location', 'position'), extract_location_info),
+    (("place",), ('country', 'state', 'province', 'region'), extract_administrative_info),
+    (("place",), ('time zone', 'climate', 'elevation'), extract_generic_field),
+    (("organization",), ('founded', 'formation', 'established'), extract_date_info),
+    (("organization",), ('headquarters', 'location'), extract_location_info),
+    (("organization",), ('key people', 'leaders', 'ceo', 'chairman'), extract_people_info),
+    (("organization",), ('industry', 'sector', 'revenue', 'employees'), extract_generic_field),
+    (("event",), ('date', 'period', 'duration'), extract_date_info),
+    (("event",), ('location', 'place', 'venue'), extract_location_info),
+    (("event",), ('participants', 'combatants'), extract_participants_info),
+    (("event",), ('casualties', 'result', 'outcome'), extract_generic_field),
+    (("media",), ('author', 'director', 'producer', 'creator'), extract_people_info),
+    (("media",), ('release date', 'published', 'publication date'), extract_date_info),
+    (("media",), ('genre', 'language', 'budget', 'box office'), extract_generic_field),
+    (("species",), ('kingdom', 'phylum', 'class', 'order', 'family', 'genus'), extract_taxonomic_field),
+    (("species",), ('binomial', 'conservation status', 'range'), extract_generic_field),
+    (("structure",), ('architect', 'architecture', 'built', 'height'), extract_generic_field),
+    (("concept",), ('field', 'sub-fields', 'main proponents'), extract_list_or_text),
+    # Common fields for all page types
+    ((None,), ('website', 'url', 'homepage'), extract_website_info),
+    ((None,), ('image', 'map', 'photo', 'flag', 'logo'), extract_infobox_image),
+]:
+    register_infobox_handler(_labels, _handler, _page_types)
@@ -0,0 +1,156 @@
+import html
+import json
+import re
+from typing import Dict, Any, List, Optional
+from urllib.parse import quote, urlencode
+
+import httpx # type: ignore
+
+from config import WIKI_BASE_URL
+
+# The "parse" fetch mode asks the MediaWiki action=parse API for just the rendered article
+# body and its structured metadata, instead of the whole skinned /wiki/ page with its
+# navigation, sidebars and scripts. compact_document() wraps the body in the few elements
+# the extractors read from the skin, and stores the metadata (revision ID, categories,
+# language links, ...) as JSON in the head, where read_page_data() finds it without parsing.
+
+PARSE_PROPS = ("text", "revid", "displaytitle", "categories", "langlinks", "indicators", "properties")
+
+# Most titles per action=query request for clients without the bot right
+QUERY_BATCH_SIZE = 50
+
+PAGE_DATA_RE = re.compile(r'<script type="application/json" id="page-data">(.*?)</script>', re.S)
+TAG_RE = re.compile(r'<[^>]+>')
+
+# Characters MediaWiki leaves unescaped in page URLs
+_TITLE_SAFE = ";@$!*(),/~:"
+
+
+def page_url(title: str) -> str:
+    """The /wiki/ URL of a page, as MediaWiki writes it."""
+    return f"{WIKI_BASE_URL}/wiki/{quote(title.replace(' ', '_'), safe=_TITLE_SAFE)}"
+
+
+def parse_api_url(title: str) -> str:
+    """The action=parse request for a page's body and metadata, following redirects."""
+    params = {
+        "action": "parse",
+        "format": "json",
+        "formatversion": "2",
+        "page": title,
+        "prop": "|".join(PARSE_PROPS),
+        "redirects": "1",
+        "disableeditsection": "1",
+        "disablelimitreport": "1",
+    }
+    return f"{WIKI_BASE_URL}/w/api.php?{urlencode(params)}"
+
+
+def revisions_api_url(titles: List[str]) -> str:
+    """The action=query request for the latest revision IDs of up to QUERY_BATCH_SIZE pages."""
+    params = {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "prop": "info",
+        "titles": "|".join(titles),
+        "redirects": "1",
+    }
+    return f"{WIKI_BASE_URL}/w/api.php?{urlencode(params)}"
+
+
+def api_response(response: httpx.Response) -> Dict[str, Any]:
+    """The JSON of an API response; raises httpx.HTTPStatusError like a failed page fetch.
+
+    The API reports errors in the body of a 200 response; a missing page becomes a 404.
+    """
+    response.raise_for_status()
+    data = response.json()
+    error = data.get("error")
+    if error:
+        status = 404 if error.get("code") in ("missingtitle", "invalidtitle") else 502
+        raise httpx.HTTPStatusError(f"MediaWiki API error '{error.get('code')}': {error.get('info', '')}",
+                                    request=response.request, response=httpx.Response(status, request=response.request))
+    return data
+
+
+def parse_response(response: httpx.Response) -> Dict[str, Any]:
+    """The "parse" object of an action=parse response (see api_response)."""
+    return api_response(response)["parse"]
+
+
+def latest_revisions(data: Dict[str, Any], titles: List[str]) -> Dict[str, Optional[int]]:
+    """Map each title of an action=query request to its page's latest revision ID.
+
+    Titles are followed through the normalizations and redirects the API reports; pages
+    that do not exist map to None.
+    """
+    query = data.get("query") or {}
+    renamed = {item["from"]: item["to"] for item in query.get("normalized", []) + query.get("redirects", [])}
+    pages = {page["title"]: page for page in query.get("pages", [])}
+    revisions = {}
+    for title in titles:
+        name, seen = title, set()
+        while name in renamed and name not in seen:
+            seen.add(name)
+            name = renamed[name]
+        page = pages.get(name)
+        exists = page is not None and not page.get("missing") and not page.get("invalid")
+        revisions[title] = page.get("lastrevid") if exists else None
+    return revisions
+
+
+def page_data(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata of an action=parse result, in the shapes the /v1/longSearch result uses."""
+    categories = parsed.get("categories") or []
+    properties = parsed.get("properties") or {}
+    return {
+        "revid": parsed.get("revid"),
+        "title": parsed["title"],
+        "displaytitle": parsed.get("displaytitle") or parsed["title"],
+        "description": properties.get("wikibase-shortdesc", ""),
+        # Hidden (maintenance) categories are not listed on the page, so they are left out here too
+        "categories": [c["category"].replace('_', ' ') for c in categories if not c.get("hidden")],
+        "language_links": [
+            {"language": f"{link['title']} – {link.get('langname', link['lang'])}", "url": link.get("url", "")}
+            for link in parsed.get("langlinks") or []
+        ],
+        "disambiguation": "disambiguation" in properties,
+    }
+
+
+def compact_document(parsed: Dict[str, Any]) -> str:
+    """Minimal article HTML for an action=parse result (see the module comment)."""
+    data = page_data(parsed)
+    name = parsed["title"].replace(' ', '_')
+    title = html.escape(html.unescape(TAG_RE.sub('', data["displaytitle"])))
+    href = html.escape(page_url(parsed["title"]))
+    name_path = quote(name, safe=_TITLE_SAFE)
+    # "</" would end the script element early
+    data_json = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
+    description = f'<meta name="description" content="{html.escape(data["description"])}">' if data["description"] else ''
+    indicators = ''.join(
+        f'<div id="mw-indicator-{html.escape(indicator)}" class="mw-indicator">{content}</div>'
+        for indicator, content in (parsed.get("indicators") or {}).items()
+    )
+    return (
+        '<!DOCTYPE html>\n<html><head>'
+        f'<script type="application/json" id="page-data">{data_json}</script>'
+        f'<title>{title} - Wikipedia</title>'
+        f'<link rel="canonical" href="{href}">'
+        f'{description}'
+        '</head><body>'
+        f'<div class="mw-indicators">{indicators}</div>'
+        f'<h1 id="firstHeading" class="firstHeading">{data["displaytitle"]}</h1>'
+        f'<ul><li id="ca-talk"><a href="/wiki/Talk:{name_path}">Talk</a></li>'
+        f'<li id="ca-history"><a href="/w/index.php?title={name_path}&amp;action=history">History</a></li></ul>'
+        f'<div id="mw-content-text" class="mw-body-content">{parsed.get("text", "")}</div>'
+        '</body></html>'
+    )
+
+
+def read_page_data(html_content: str) -> Optional[Dict[str, Any]]:
+    """The metadata stored in a compact document's head, or None for a skinned page."""
+    head_end = html_content.find('</head>')
+    match = PAGE_DATA_RE.search(html_content, 0, head_end if head_end >= 0 else len(html_content))
+    return json.loads(match.group(1)) if match else None
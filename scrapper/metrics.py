@@ -0,0 +1,102 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, and size buckets (1 Ki to 64 Mi)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))
+
+
+class Histogram:
+    """A Prometheus-style histogram with one series per label value."""
+
+    def __init__(self, name: str, help_text: str, label: Optional[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label value -> (per-bucket counts, sum, count)
+        self._series: Dict[str, Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: str = ""):
+        with self._lock:
+            counts, total, count = self._series.get(label_value) or ([0] * len(self.buckets), 0.0, 0)
+            index = bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            self._series[label_value] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_value, (counts, total, count) in series:
+            labels = f'{self.label}="{label_value}",' if self.label else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound:.10g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}le="+Inf"}} {count}')
+            plain_labels = "{" + labels.rstrip(",") + "}" if labels else ""
+            lines.append(f"{self.name}_sum{plain_labels} {total:.10g}")
+            lines.append(f"{self.name}_count{plain_labels} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("wikify_stage_seconds", "Time spent in each stage of a scrape.", "stage", LATENCY_BUCKETS)
+HTML_LENGTH = Histogram("wikify_html_length", "Length of the fetched article HTML in characters.", None, SIZE_BUCKETS)
+RESULT_BYTES = Histogram("wikify_result_bytes", "Size of the serialized response body.", None, SIZE_BUCKETS)
+
+HISTOGRAMS = [STAGE_SECONDS, HTML_LENGTH, RESULT_BYTES]
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Collects how long each stage of one request took."""
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float):
+        self.stages.append((name, seconds))
+
+    def server_timing(self) -> str:
+        """Format the stages as a Server-Timing header value (durations in milliseconds)."""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages)
+
+    def observe(self):
+        """Record the stages in the latency histogram."""
+        for name, seconds in self.stages:
+            STAGE_SECONDS.observe(seconds, name)
+
+
+class _NullTimer(StageTimer):
+    """Timer used when nobody is collecting timings."""
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def add(self, name: str, seconds: float):
+        pass
+
+
+NULL_TIMER = _NullTimer()
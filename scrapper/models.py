@@ -0,0 +1,160 @@
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Callable, Dict, List, Optional, Union, get_args, get_origin
+
+# Typed items of the /v1/longSearch result. A big article has tens of thousands of links,
+# images and sections; as slotted dataclasses they take a fraction of the memory of dicts.
+# Every encoder writes them through model_fields (see serialization.py). Their fields are
+# declared in the order the JSON keys are written, and json_schema() publishes the result's
+# shape for clients at /v1/schema.
+
+
+@dataclass(slots=True)
+class PageMetadata:
+    title: str
+    url: str
+    canonical_url: str
+    description: str
+    last_modified: str
+    protection_status: Dict[str, bool]
+    talk_page: str
+    view_history: str
+
+
+@dataclass(slots=True)
+class TocEntry:
+    title: str
+    anchor: str
+
+
+@dataclass(slots=True)
+class Section:
+    heading: str
+    content: str
+
+
+@dataclass(slots=True)
+class Image:
+    url: str
+    caption: str
+
+
+@dataclass(slots=True)
+class ExternalLink:
+    text: str
+    url: str
+
+
+@dataclass(slots=True)
+class RelatedPage:
+    title: str
+    url: str
+
+
+@dataclass(slots=True)
+class LanguageLink:
+    language: Optional[str]
+    url: Optional[str]
+
+
+@dataclass(slots=True)
+class PageStats:
+    paragraph_count: int
+    image_count: int
+    section_count: int
+
+
+MODELS = (PageMetadata, TocEntry, Section, Image, ExternalLink, RelatedPage, LanguageLink, PageStats)
+
+# Type of every /v1/longSearch result field; references, lists and the like stay plain strings,
+# and the infobox and tables, whose keys vary from page to page, stay dicts
+RESULT_TYPES: Dict[str, Any] = {
+    "page_metadata": PageMetadata,
+    "page_type": str,
+    "page_type_confidence": float,
+    "summary": str,
+    "infobox_data": Dict[str, Any],
+    "introduction": str,
+    "table_of_contents": List[TocEntry],
+    "sections": List[Section],
+    "images": List[Image],
+    "tables": List[Dict[str, Any]],
+    "lists": List[str],
+    "coordinates": Dict[str, str],
+    "references": List[str],
+    "external_links": List[ExternalLink],
+    "related_pages": List[RelatedPage],
+    "language_links": List[LanguageLink],
+    "categories": List[str],
+    "special_data": Dict[str, Any],
+    "disambiguation_info": List[str],
+    "taxonomic_data": Dict[str, str],
+    "media": List[str],
+    "page_stats": PageStats,
+    "html_length": int,
+    "disambiguation_options": List[Dict[str, str]],
+}
+
+
+def _dict_builder(model: type) -> Callable[[Any], Dict[str, Any]]:
+    # The field names are looked up once per model rather than on every call
+    names = tuple(field.name for field in fields(model))
+
+    def build(value: Any) -> Dict[str, Any]:
+        return {name: getattr(value, name) for name in names}
+
+    return build
+
+
+# Per-model functions behind model_fields
+_DICT_BUILDERS: Dict[type, Callable[[Any], Dict[str, Any]]] = {model: _dict_builder(model) for model in MODELS}
+
+
+def model_fields(value: Any) -> Dict[str, Any]:
+    """A model as a dict of its fields; the `default` hook of the encoders (see serialization.py)."""
+    build = _DICT_BUILDERS.get(type(value))
+    if build is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+    return build(value)
+
+
+def _type_schema(annotation: Any, definitions: Dict[str, Any]) -> Dict[str, Any]:
+    if annotation is Any:
+        return {}
+    if annotation in (str, int, float, bool):
+        return {"type": {str: "string", int: "integer", float: "number", bool: "boolean"}[annotation]}
+    if isinstance(annotation, type) and is_dataclass(annotation):
+        name = annotation.__name__
+        if name not in definitions:
+            definitions[name] = {
+                "type": "object",
+                "properties": {field.name: _type_schema(field.type, definitions) for field in fields(annotation)},
+                "required": [field.name for field in fields(annotation)],
+                "additionalProperties": False,
+            }
+        return {"$ref": f"#/$defs/{name}"}
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Union:
+        options = [_type_schema(arg, definitions) for arg in args if arg is not type(None)]
+        schema = options[0] if len(options) == 1 else {"anyOf": options}
+        return {"anyOf": [schema, {"type": "null"}]} if type(None) in args else schema
+    if origin is list:
+        return {"type": "array", "items": _type_schema(args[0], definitions)}
+    if origin is dict:
+        return {"type": "object", "additionalProperties": _type_schema(args[1], definitions)}
+    raise TypeError(f"No JSON Schema for {annotation!r}")
+
+
+def json_schema() -> Dict[str, Any]:
+    """JSON Schema (draft 2020-12) of the /v1/longSearch result.
+
+    Every field is optional, since empty and unrequested fields are left out.
+    """
+    definitions: Dict[str, Any] = {}
+    properties = {name: _type_schema(annotation, definitions) for name, annotation in RESULT_TYPES.items()}
+    return {
+        "$schema": "https://json-schema.org/draft/2020-12/schema",
+        "title": "Wikipedia page extraction result",
+        "type": "object",
+        "properties": properties,
+        "$defs": definitions,
+    }
@@ -0,0 +1,284 @@
+import asyncio
+import codecs
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx # type: ignore
+
+from config import PAGE_CACHE_MAX_BYTES, PAGE_CACHE_DIR, PAGE_CACHE_TTL, PAGE_LOCK_TIMEOUT, FETCH_MODE
+from mediawiki import compact_document, parse_api_url, parse_response
+from upstream import upstream
+from singleflight import SingleFlight
+from titles import normalize_title
+
+try:
+    import fcntl
+except ImportError:  # no cross-process fetch locks where flock is unavailable
+    fcntl = None
+
+
+@dataclass
+class CachedPage:
+    """Raw article HTML plus the validators needed to revalidate it."""
+    key: str
+    html: str
+    etag: str = ""
+    last_modified: str = ""
+    fetched_at: float = 0.0
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+
+def page_key(title: str, mode: str = FETCH_MODE) -> str:
+    """The page cache key for a title; compact documents are kept apart from skinned pages."""
+    return normalize_title(title) if mode == "page" else f"{mode}:{normalize_title(title)}"
+
+
+class PageCache:
+    """Two-tier raw HTML cache: an in-memory LRU bounded by bytes, backed by a directory."""
+
+    def __init__(self, max_bytes: int = PAGE_CACHE_MAX_BYTES, disk_dir: Optional[str] = PAGE_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir or None
+        self._entries: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "refreshed": 0, "disk_hits": 0, "evictions": 0,
+                      "lock_waits": 0, "fetched_by_other_worker": 0}
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # --- Memory tier ---
+
+    def get_memory(self, key: str) -> Optional[CachedPage]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put_memory(self, entry: CachedPage):
+        old = self._entries.pop(entry.key, None)
+        if old is not None:
+            self._bytes -= sys.getsizeof(old.html)
+        size = sys.getsizeof(entry.html)
+        if size > self.max_bytes:
+            return
+        self._entries[entry.key] = entry
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= sys.getsizeof(evicted.html)
+            self.stats["evictions"] += 1
+
+    # --- Disk tier ---
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get_disk(self, key: str) -> Optional[CachedPage]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(path + ".html", encoding="utf-8") as f:
+                html = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("key") != key:
+            return None
+        return CachedPage(key=key, html=html, etag=meta.get("etag", ""),
+                          last_modified=meta.get("last_modified", ""), fetched_at=meta.get("fetched_at", 0.0))
+
+    def put_disk(self, entry: CachedPage, html_changed: bool = True):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(entry.key)
+        meta = asdict(entry)
+        del meta["html"]
+        # Write to temporary files and rename so readers never see a partial entry
+        if html_changed:
+            with open(path + ".html.tmp", "w", encoding="utf-8") as f:
+                f.write(entry.html)
+            os.replace(path + ".html.tmp", path + ".html")
+        with open(path + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(path + ".json.tmp", path + ".json")
+
+    # --- Cross-process fetch lock ---
+
+    @asynccontextmanager
+    async def fetch_lock(self, key: str):
+        """Hold an exclusive lock file for a page while it is fetched.
+
+        Workers sharing the disk tier take turns, so a page wanted by many of them at once
+        is downloaded by the first and read from disk by the rest. Waiting gives up after
+        PAGE_LOCK_TIMEOUT seconds and proceeds without the lock.
+        """
+        if not self.disk_dir or fcntl is None:
+            yield
+            return
+        fd = os.open(self._disk_path(key) + ".lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            locked = False
+            deadline = time.monotonic() + PAGE_LOCK_TIMEOUT
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        break
+                    self.stats["lock_waits"] += 1
+                    await asyncio.sleep(0.05)
+            try:
+                yield
+            finally:
+                if locked:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    # --- Both tiers ---
+
+    async def get(self, key: str) -> Optional[CachedPage]:
+        entry = self.get_memory(key)
+        if entry is None and self.disk_dir:
+            entry = await asyncio.to_thread(self.get_disk, key)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self.put_memory(entry)
+        return entry
+
+    async def put(self, entry: CachedPage, html_changed: bool = True):
+        self.put_memory(entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self.put_disk, entry, html_changed)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Counters plus current memory usage, for the stats endpoint."""
+        return dict(self.stats, entries=len(self._entries), memory_bytes=self._bytes, max_bytes=self.max_bytes)
+
+
+page_cache = PageCache()
+
+
+# Refreshes of the same page share one upstream request
+page_fetches = SingleFlight()
+
+
+# Receives the text of a page body piece by piece while it downloads
+TextSink = Callable[[str], Awaitable[None]]
+
+
+async def fetch_page_html(title: str, url: str, ttl: float = PAGE_CACHE_TTL, mode: str = FETCH_MODE,
+                          on_text: Optional[TextSink] = None) -> str:
+    """Return the HTML for a page, using the cache and conditional GETs where possible.
+
+    Fresh entries are served without a request. Stale entries are revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged page costs a 304. Concurrent
+    refreshes of a page, in this process or in other workers sharing the disk tier,
+    make a single upstream request. In the "parse" mode (see config.FETCH_MODE) the
+    page comes from the action=parse API as a compact document instead of from `url`.
+    In the "page" mode, `on_text` is given the decoded body as it downloads, if this call
+    is the one that downloads it. Raises httpx.HTTPError when the request fails.
+    """
+    key = page_key(title, mode)
+    entry = await page_cache.get(key)
+    if entry is not None and entry.is_fresh(ttl):
+        page_cache.stats["hits"] += 1
+        return entry.html
+    if mode == "parse":
+        url = parse_api_url(title)
+    html, _ = await page_fetches.do(key, lambda: _refresh_page(key, url, ttl, entry, mode, on_text))
+    return html
+
+
+async def expire_page(title: str, mode: str = FETCH_MODE):
+    """Make the next fetch of a page revalidate it upstream, even if the cached copy is fresh."""
+    entry = await page_cache.get(page_key(title, mode))
+    if entry is not None:
+        entry.fetched_at = 0.0
+        await page_cache.put(entry, html_changed=False)
+
+
+async def _refresh_page(key: str, url: str, ttl: float, entry: Optional[CachedPage], mode: str,
+                        on_text: Optional[TextSink] = None) -> str:
+    async with page_cache.fetch_lock(key):
+        # Another worker may have fetched the page while this one waited for the lock
+        if page_cache.disk_dir:
+            on_disk = await asyncio.to_thread(page_cache.get_disk, key)
+            if on_disk is not None and on_disk.is_fresh(ttl):
+                page_cache.stats["fetched_by_other_worker"] += 1
+                page_cache.put_memory(on_disk)
+                return on_disk.html
+            entry = on_disk or entry
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        if on_text is not None and mode == "page":
+            async with upstream.stream(url, headers=headers) as response:
+                if response.status_code == 304 and entry is not None:
+                    return await _revalidated(entry)
+                response.raise_for_status()
+                html = await _read_text(response, on_text)
+        else:
+            response = await upstream.get(url, headers=headers)
+            if response.status_code == 304 and entry is not None:
+                return await _revalidated(entry)
+            if mode == "parse":
+                html = compact_document(parse_response(response))
+            else:
+                response.raise_for_status()
+                html = response.text
+
+        page_cache.stats["refreshed" if entry is not None else "misses"] += 1
+        entry = CachedPage(
+            key=key,
+            html=html,
+            etag=response.headers.get('ETag', ''),
+            last_modified=response.headers.get('Last-Modified', ''),
+            fetched_at=time.time()
+        )
+        await page_cache.put(entry)
+        return entry.html
+
+
+async def _revalidated(entry: CachedPage) -> str:
+    page_cache.stats["revalidated"] += 1
+    entry.fetched_at = time.time()
+    await page_cache.put(entry, html_changed=False)
+    return entry.html
+
+
+async def _read_text(response: httpx.Response, on_text: TextSink) -> str:
+    """Decode a streamed body chunk by chunk, passing each piece on; returns the whole text.
+
+    The raw bytes are dropped as soon as they are decoded, as response.text would decode them.
+    """
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    pieces = []
+    async for chunk in response.aiter_bytes():
+        text = decoder.decode(chunk)
+        if text:
+            pieces.append(text)
+            await on_text(text)
+    text = decoder.decode(b'', final=True)
+    if text:
+        pieces.append(text)
+        await on_text(text)
+    return ''.join(pieces)
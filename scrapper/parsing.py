@@ -0,0 +1,331 @@
+import asyncio
+import queue
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag # type: ignore
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+from config import PARSER_BACKEND
+from walker import walk_document
+
+try:
+    import lxml.html # type: ignore
+    from lxml import etree # type: ignore
+except ImportError:  # lxml is optional; only html.parser is available without it
+    lxml = None
+    etree = None
+
+# BeautifulSoup tree builders, keyed by backend name
+SOUP_BACKENDS = {
+    "html.parser": "html.parser",
+    "lxml": "lxml",
+}
+
+# Backend that walks a native lxml tree for the scan-heavy extractors
+NATIVE_BACKEND = "lxml-native"
+
+# BeautifulSoup backend that only builds the parts of the page the extractors read
+SCOPED_BACKEND = "lxml-scoped"
+
+PARSER_BACKENDS = tuple(SOUP_BACKENDS) + (NATIVE_BACKEND, SCOPED_BACKEND)
+
+
+def available_backends() -> List[str]:
+    """Return the parser backends that can run with the installed packages."""
+    if lxml is None:
+        return ["html.parser"]
+    return list(PARSER_BACKENDS)
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Validate a backend name, falling back to the configured default."""
+    backend = backend or PARSER_BACKEND
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{backend}', expected one of {', '.join(PARSER_BACKENDS)}")
+    if backend != "html.parser" and lxml is None:
+        return "html.parser"
+    return backend
+
+
+class LxmlDom:
+    """Element accessors for an lxml.html tree, mirroring walker.SoupDom.
+
+    Text follows BeautifulSoup's get_text(strip=True): comments and the contents of
+    script, style, template and ruby annotation elements are left out.
+    """
+
+    _text_nodes = None
+
+    def __init__(self):
+        if LxmlDom._text_nodes is None:
+            LxmlDom._text_nodes = etree.XPath(
+                "descendant::text()[not(ancestor::script or ancestor::style or ancestor::template"
+                " or ancestor::rt or ancestor::rp)]",
+                smart_strings=False
+            )
+        self._texts: Dict[Any, str] = {}
+
+    def roots(self, document) -> List[Any]:
+        return [document]
+
+    def name(self, element) -> str:
+        return element.tag
+
+    def get(self, element, attr: str, default: Any = None) -> Any:
+        return element.get(attr, default)
+
+    def classes(self, element) -> Iterable[str]:
+        value = element.get('class')
+        return value.split() if value else ()
+
+    def children(self, element) -> List[Any]:
+        # Comments and processing instructions have a non-string tag
+        return [child for child in element if isinstance(child.tag, str)]
+
+    def find(self, element, name: str):
+        return element.find('.//' + name)
+
+    def descendants(self, element, name: str) -> List[Any]:
+        return list(element.iterdescendants(name))
+
+    def html(self, element) -> str:
+        return lxml.html.tostring(element, encoding='unicode', with_tail=False)
+
+    def text(self, element) -> str:
+        text = self._texts.get(element)
+        if text is None:
+            text = ''.join(s.strip() for s in LxmlDom._text_nodes(element))
+            self._texts[element] = text
+        return text
+
+
+# Elements the targeted extractors (metadata, infobox, toc, categories, coordinates,
+# language links, disambiguation checks) read; a native parse keeps only these as soup.
+_SKELETON_XPATH = (
+    "//title | //link | //meta"
+    " | //*[@id='mw-indicator-protection-status' or @id='footer-info-lastmod' or @id='ca-talk'"
+    " or @id='ca-history' or @id='toc' or @id='mw-normal-catlinks' or @id='p-lang']"
+    " | //table"
+    " | //span[contains(concat(' ', normalize-space(@class), ' '), ' geo ')]"
+    " | //div[contains(concat(' ', normalize-space(@class), ' '), ' disambiguation ')]"
+    " | //a[contains(@href, 'Category:Disambiguation_pages')]"
+)
+
+
+# Elements a scoped parse keeps, with everything inside them: the head metadata, the
+# article body, and the skin elements the metadata, category and language extractors read.
+# Navigation, sidebars, the footer and scripts are never turned into soup.
+_SCOPE_TAGS = frozenset(("title", "link", "meta"))
+_SCOPE_IDS = frozenset((
+    "mw-content-text", "catlinks", "p-lang", "toc", "footer-info-lastmod", "ca-talk", "ca-history",
+    "mw-indicator-protection-status",
+))
+
+# Parts of the article body still read once the walk is done (table of contents,
+# coordinates, taxonomy infobox); a scoped parse releases the rest of the body then
+_KEEP_AFTER_WALK = '#toc, .geo, table[class*="infobox"]'
+
+
+def _in_scope(name: str, attrs: Optional[Dict[str, Any]]) -> bool:
+    return name in _SCOPE_TAGS or (attrs or {}).get('id') in _SCOPE_IDS
+
+
+class ScopeStrainer(SoupStrainer):
+    """A parse_only filter that keeps the elements in scope (see _SCOPE_IDS).
+
+    Only top-level tags are filtered; the subtree of a kept element is kept whole.
+    """
+
+    # BeautifulSoup 4.13 and later
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        return _in_scope(name, attrs)
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+    # Earlier versions
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        return markup_name if isinstance(markup_name, str) and _in_scope(markup_name, dict(markup_attrs)) else None
+
+
+class ParsedPage:
+    """A parsed article: the soup the extract_* functions read, plus the walker input.
+
+    For the BeautifulSoup backends `soup` is the whole document. For the native backend
+    the document is parsed by lxml, the walker runs on the lxml tree, and `soup` only
+    holds the elements the targeted extractors need. The scoped backend parses only the
+    head metadata, the article body and a few skin elements into `soup`, and releases
+    most of the body again after the walk (see release_body).
+    """
+
+    def __init__(self, html_content: str, backend: Optional[str] = None, tree: Any = None):
+        self.html_content = html_content
+        self.backend = resolve_backend(backend)
+        self.tree = None
+        if self.backend == NATIVE_BACKEND:
+            # A tree already built from html_content (see StreamingParse) is used as is
+            self.tree = tree if tree is not None else lxml.html.document_fromstring(html_content)
+            self.soup = BeautifulSoup(self._skeleton_html(), 'lxml')
+        elif self.backend == SCOPED_BACKEND:
+            self.soup = BeautifulSoup(html_content, 'lxml', parse_only=ScopeStrainer())
+        else:
+            self.soup = BeautifulSoup(html_content, SOUP_BACKENDS[self.backend])
+
+    def _skeleton_html(self) -> str:
+        selected = self.tree.xpath(_SKELETON_XPATH)
+        selected_set = set(selected)
+        parts = []
+        for element in selected:
+            # Skip elements already serialized as part of a selected ancestor
+            if any(ancestor in selected_set for ancestor in element.iterancestors()):
+                continue
+            parts.append(lxml.html.tostring(element, encoding='unicode', with_tail=False))
+        return '<html><body>' + ''.join(parts) + '</body></html>'
+
+    def full_soup(self) -> BeautifulSoup:
+        """Return a soup of the whole document, parsing it now for the native backend."""
+        if self.tree is not None or self.backend == SCOPED_BACKEND:
+            return BeautifulSoup(self.html_content, 'lxml')
+        return self.soup
+
+    def release_body(self):
+        """Decompose the parts of the article body no extractor reads after the walk.
+
+        Only the scoped backend does this; references, paragraphs, navboxes and the like
+        are then freed while the remaining extractors and the serializer run.
+        """
+        if self.backend != SCOPED_BACKEND:
+            return
+        content = self.soup.find(id='mw-content-text')
+        if content is None:
+            return
+        kept = content.select(_KEEP_AFTER_WALK)
+        keep = {id(element) for element in kept}
+        # Ancestors of kept elements stay, but their other children go
+        ancestors = {id(parent) for element in kept for parent in element.parents}
+        pending = [content]
+        while pending:
+            element = pending.pop()
+            for child in list(element.children):
+                if id(child) in ancestors:
+                    pending.append(child)
+                elif id(child) not in keep:
+                    if isinstance(child, Tag):
+                        child.decompose()
+                    else:
+                        child.extract()
+
+    def introduction(self) -> str:
+        """Text of the first non-empty lead paragraph, like main.extract_introduction.
+
+        Only the first article body is searched, which stops the scan early; the skeleton
+        soup of the native backend has no paragraphs, so its lxml tree is used instead.
+        """
+        if self.tree is None:
+            content = self.soup.find(id='mw-content-text')
+            body = content.find(class_='mw-parser-output') if content else None
+            texts = (para.get_text(strip=True) for para in body.find_all('p', recursive=False)) if body else ()
+        else:
+            dom = LxmlDom()
+            content = self.tree.get_element_by_id('mw-content-text', None)
+            body = None
+            if content is not None:
+                body = next((e for e in content.iter(etree.Element) if 'mw-parser-output' in dom.classes(e)), None)
+            texts = (dom.text(para) for para in body.iterchildren('p')) if body is not None else ()
+        return next((text for text in texts if text), "")
+
+    def walk(self, names: Optional[Iterable[str]] = None, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Run the single-pass walker over the page (see walker.walk_document)."""
+        if self.tree is None:
+            return walk_document(self.soup, names, timings=timings)
+        return walk_document(self.tree, names, LxmlDom(), timings)
+
+
+class StreamingParse:
+    """Builds the native backend's lxml tree of a page while its body downloads.
+
+    feed() is the `on_text` sink of page_cache.fetch_page_html. The text is parsed by one
+    worker thread, which it reaches through a queue, so the event loop only looks for the
+    end of the head: once that has arrived, its text is in `head` and `head_ready` is set,
+    so the page's revision can be looked up before the rest of the body is in. Every
+    stream that was fed must end with page() or discard(), which stop the worker.
+    """
+
+    # Give up looking for the end of the head after this many characters
+    HEAD_LIMIT = 1 << 20
+
+    def __init__(self):
+        # (False, text) for each piece, then (True, the whole HTML) or (True, None) to stop
+        self._pieces: "queue.SimpleQueue[Tuple[bool, Optional[str]]]" = queue.SimpleQueue()
+        self._worker: Optional[asyncio.Future] = None
+        self._discarded = False
+        self._head_text = ""
+        self.head: Optional[str] = None
+        self.head_ready = asyncio.Event()
+        self.length = 0
+        self.seconds = 0.0
+
+    async def feed(self, text: str):
+        self.length += len(text)
+        if not self._discarded:
+            if self._worker is None:
+                self._worker = asyncio.ensure_future(asyncio.to_thread(self._parse))
+            self._pieces.put((False, text))
+        if self.head is None and self._head_text is not None:
+            searched = max(0, len(self._head_text) - len('</head>'))
+            self._head_text += text
+            end = self._head_text.find('</head>', searched)
+            if end >= 0:
+                self.head = self._head_text[:end]
+                self._head_text = None
+                self.head_ready.set()
+            elif len(self._head_text) > self.HEAD_LIMIT:
+                self._head_text = None
+
+    def _parse(self) -> Optional[ParsedPage]:
+        # Runs in the worker thread until page() or discard() ends the stream
+        parser = lxml.html.HTMLParser()
+        while True:
+            done, text = self._pieces.get()
+            if done:
+                break
+            if parser is not None:
+                started = time.perf_counter()
+                try:
+                    parser.feed(text)
+                except etree.LxmlError:
+                    parser = None
+                self.seconds += time.perf_counter() - started
+        if parser is None or text is None:
+            return None
+        started = time.perf_counter()
+        try:
+            return ParsedPage(text, NATIVE_BACKEND, parser.close())
+        except etree.LxmlError:
+            return None
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def discard(self):
+        """Stop parsing; the text still downloading is not needed for extraction."""
+        if not self._discarded:
+            self._discarded = True
+            if self._worker is not None:
+                self._pieces.put((True, None))
+
+    async def page(self, html_content: str) -> Optional[ParsedPage]:
+        """The page parsed from what was fed, if that was all of html_content; otherwise None.
+
+        Nothing is fed when the page came from the cache or another request's download.
+        """
+        if self._discarded or self._worker is None or self.length != len(html_content):
+            self.discard()
+            return None
+        self._discarded = True
+        self._pieces.put((True, html_content))
+        return await self._worker
+
+
+def parse_html(html_content: str, backend: Optional[str] = None) -> ParsedPage:
+    """Parse article HTML with the given (or configured) backend."""
+    return ParsedPage(html_content, backend)
@@ -0,0 +1,95 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import unquote
+
+from config import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL
+
+# Both live in the page <head>, so they can be read without parsing the document; compact
+# documents (see mediawiki.py) carry the revision ID as "revid"
+REVISION_ID_RE = re.compile(r'"(?:wgRevisionId|revid)"\s*:\s*(\d+)')
+CANONICAL_RE = re.compile(r'<link\s+rel="canonical"\s+href="([^"]+)"')
+
+
+def canonical_title(html_content: str) -> Optional[str]:
+    """Return the canonical title read from raw page HTML, or None if it is missing."""
+    canonical = CANONICAL_RE.search(html_content)
+    if not canonical or '/wiki/' not in canonical.group(1):
+        return None
+    return unquote(canonical.group(1).split('/wiki/', 1)[1])
+
+
+def page_identity(html_content: str) -> Optional[Tuple[str, int]]:
+    """Return (canonical title, revision ID) read from raw page HTML, or None if either is missing."""
+    revision = REVISION_ID_RE.search(html_content)
+    title = canonical_title(html_content) if revision else None
+    if title is None:
+        return None
+    return title, int(revision.group(1))
+
+
+class ResultCache:
+    """Extraction results keyed by (canonical title, revision ID), with TTL and LRU eviction.
+
+    Only the newest revision of a title is kept: storing or looking up a newer revision
+    drops the older one, while older revisions are neither returned nor stored.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl: float = RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Any]]" = OrderedDict()
+        self._revisions: Dict[str, int] = {}
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0, "evictions": 0}
+
+    def _drop(self, key: Tuple[str, int]):
+        self._entries.pop(key, None)
+        if self._revisions.get(key[0]) == key[1]:
+            del self._revisions[key[0]]
+
+    def _is_stale(self, title: str, revision_id: int) -> bool:
+        """Whether a newer revision of the title is cached; drops an older one first."""
+        known = self._revisions.get(title)
+        if known is None or known == revision_id:
+            return False
+        if known > revision_id:
+            return True
+        self._drop((title, known))
+        self.stats["invalidated"] += 1
+        return False
+
+    def get(self, title: str, revision_id: int) -> Optional[Any]:
+        key = (title, revision_id)
+        entry = None if self._is_stale(title, revision_id) else self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        stored_at, result = entry
+        if time.time() - stored_at >= self.ttl:
+            self._drop(key)
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return result
+
+    def put(self, title: str, revision_id: int, result: Any):
+        if self._is_stale(title, revision_id):
+            return
+        key = (title, revision_id)
+        self._entries[key] = (time.time(), result)
+        self._entries.move_to_end(key)
+        self._revisions[title] = revision_id
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            if self._revisions.get(evicted[0]) == evicted[1]:
+                del self._revisions[evicted[0]]
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries)
+
+
+result_cache = ResultCache()
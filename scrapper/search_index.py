@@ -0,0 +1,401 @@
+import argparse
+import array
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import SEARCH_INDEX_DIR, SEARCH_FLUSH_DOCS, SEARCH_MERGE_FACTOR
+from mediawiki import page_url
+
+# Full-text search over pages already scraped, ranked with BM25. Each introduction,
+# section and infobox is a document. New documents collect in memory and are written out
+# as immutable segments of SEARCH_FLUSH_DOCS documents; once SEARCH_MERGE_FACTOR segments
+# exist, the smallest are merged in a background thread, dropping documents of pages that
+# were indexed again since. A segment is two files:
+#
+#   seg-N.json   its documents (page, section, length, page version) and a term dictionary
+#                mapping each term to (offset, document count, two array typecodes)
+#   seg-N.post   per term, the delta-encoded document numbers and then the term frequencies,
+#                each as an array of the smallest unsigned type that fits; memory-mapped
+#
+# manifest.json lists the live segments and the current version of every page; a document
+# only counts while its version is the page's current one.
+#
+#   python search_index.py add results.jsonl     (bulk.py or crawler.py output)
+#   python search_index.py query "general relativity"
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Fields of a /v1/longSearch result that are indexed
+SEARCHABLE_FIELDS = frozenset(("introduction", "sections", "infobox_data"))
+
+TOKEN_RE = re.compile(r"\w+")
+MAX_TOKEN_LENGTH = 64
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.casefold()) if len(token) <= MAX_TOKEN_LENGTH]
+
+
+def _infobox_text(value: Any) -> Iterator[str]:
+    """Label and value text of an infobox, leaving out its private keys and URLs."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not key.startswith('_') and key not in ("url", "src", "images", "width", "height"):
+                yield key
+                yield from _infobox_text(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _infobox_text(item)
+    elif isinstance(value, str) and not value.startswith(('http://', 'https://', '//')):
+        yield value
+
+
+def page_documents(result: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """The (section, text) documents of a result: introduction, sections, infobox."""
+    documents = []
+    if result.get("introduction"):
+        documents.append(("", result["introduction"]))
+    for section in result.get("sections") or []:
+        # Results read back from JSON have dicts where fresh ones have models
+        if isinstance(section, dict):
+            heading, content = section["heading"], section["content"]
+        else:
+            heading, content = section.heading, section.content
+        documents.append((heading, f"{heading}\n{content}"))
+    if result.get("infobox_data"):
+        documents.append(("Infobox", " ".join(_infobox_text(result["infobox_data"]))))
+    return documents
+
+
+def _typecode(largest: int) -> str:
+    return 'B' if largest < 1 << 8 else 'H' if largest < 1 << 16 else 'I'
+
+
+class MemorySegment:
+    """Documents not written to disk yet."""
+
+    def __init__(self):
+        self.docs: List[list] = []
+        self.terms: Dict[str, Tuple[List[int], List[int]]] = {}
+
+    def add(self, page: str, section: str, tokens: List[str], version: int):
+        doc = len(self.docs)
+        self.docs.append([page, section, len(tokens), version])
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, count in counts.items():
+            postings = self.terms.setdefault(term, ([], []))
+            postings[0].append(doc)
+            postings[1].append(count)
+
+    def postings(self, term: str) -> Optional[Tuple[List[int], List[int]]]:
+        return self.terms.get(term)
+
+
+class Segment:
+    """An immutable segment on disk; its postings are read from a memory map."""
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        self.base = os.path.join(directory, name)
+        with open(self.base + ".json", encoding='utf-8') as f:
+            meta = json.load(f)
+        self.docs: List[list] = meta["docs"]
+        self.terms: Dict[str, list] = meta["terms"]
+        self._file = open(self.base + ".post", 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def postings(self, term: str) -> Optional[Tuple[List[int], "array.array"]]:
+        entry = self.terms.get(term)
+        if entry is None:
+            return None
+        offset, count, doc_code, tf_code = entry
+        deltas, frequencies = array.array(doc_code), array.array(tf_code)
+        middle = offset + deltas.itemsize * count
+        deltas.frombytes(self._map[offset:middle])
+        frequencies.frombytes(self._map[middle:middle + frequencies.itemsize * count])
+        return list(accumulate(deltas)), frequencies
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def delete(self):
+        self.close()
+        for suffix in (".json", ".post"):
+            try:
+                os.remove(self.base + suffix)
+            except OSError:
+                pass
+
+    @staticmethod
+    def write(directory: str, name: str, docs: List[list], terms: Dict[str, Tuple[List[int], Any]]) -> "Segment":
+        """Write a segment (postings first, so a readable .json always has its .post) and open it."""
+        base = os.path.join(directory, name)
+        dictionary = {}
+        offset = 0
+        with open(base + ".post.tmp", 'wb') as f:
+            for term in sorted(terms):
+                documents, frequencies = terms[term]
+                deltas = [documents[0]] + [b - a for a, b in zip(documents, documents[1:])]
+                doc_code, tf_code = _typecode(max(deltas)), _typecode(max(frequencies))
+                data = array.array(doc_code, deltas).tobytes() + array.array(tf_code, frequencies).tobytes()
+                dictionary[term] = [offset, len(documents), doc_code, tf_code]
+                f.write(data)
+                offset += len(data)
+        os.replace(base + ".post.tmp", base + ".post")
+        with open(base + ".json.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"docs": docs, "terms": dictionary}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(base + ".json.tmp", base + ".json")
+        return Segment(directory, name)
+
+
+class SearchIndex:
+    """A BM25 index over scraped pages; see the module comment for the layout.
+
+    Without a directory the index only lives in memory. All methods are thread-safe.
+    """
+
+    def __init__(self, directory: Optional[str] = SEARCH_INDEX_DIR, flush_docs: int = SEARCH_FLUSH_DOCS,
+                 merge_factor: int = SEARCH_MERGE_FACTOR):
+        self.directory = directory or None
+        self.flush_docs = flush_docs
+        self.merge_factor = merge_factor
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._segments: List[Segment] = []
+        self._buffer = MemorySegment()
+        # page -> [version, documents, total length, revision]
+        self._pages: Dict[str, list] = {}
+        self._version = 0
+        self._next_segment = 1
+        self._merging = False
+        self.stats = {"pages_indexed": 0, "searches": 0, "flushes": 0, "merges": 0}
+
+    # --- Storage ---
+
+    def _load(self):
+        # Read on first use, so importing the module touches no files
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "manifest.json")
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self._segments = [Segment(self.directory, name) for name in manifest["segments"]]
+        self._pages = manifest["pages"]
+        self._version = manifest["version"]
+        self._next_segment = manifest["next_segment"]
+
+    def _save_manifest(self):
+        path = os.path.join(self.directory, "manifest.json")
+        manifest = {"segments": [segment.name for segment in self._segments], "pages": self._pages,
+                    "version": self._version, "next_segment": self._next_segment}
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _segment_name(self) -> str:
+        name = f"seg-{self._next_segment:06d}"
+        self._next_segment += 1
+        return name
+
+    def _write_buffer(self):
+        # Called with the lock held. The manifest lists page versions whose documents may
+        # still be buffered, so it is only saved right after the buffer is written out
+        if self._buffer.docs:
+            self._segments.append(Segment.write(self.directory, self._segment_name(), self._buffer.docs,
+                                                self._buffer.terms))
+            self._buffer = MemorySegment()
+            self.stats["flushes"] += 1
+
+    def flush(self):
+        """Write the documents held in memory out as a segment."""
+        with self._lock:
+            self._load()
+            if not self.directory or not self._buffer.docs:
+                return
+            self._write_buffer()
+            self._save_manifest()
+            self._maybe_merge()
+
+    def _maybe_merge(self):
+        # Called with the lock held; one merge runs at a time, and each one checks again when done
+        if len(self._segments) >= self.merge_factor and not self._merging:
+            self._merging = True
+            smallest = sorted(self._segments, key=lambda segment: len(segment.docs))[:self.merge_factor]
+            threading.Thread(target=self._merge, args=(smallest,), daemon=True).start()
+
+    def _merge(self, segments: List[Segment]):
+        """Merge segments into one, keeping only documents of current page versions."""
+        try:
+            with self._lock:
+                versions = {page: entry[0] for page, entry in self._pages.items()}
+                name = self._segment_name()
+            docs: List[list] = []
+            renumbered = []
+            for segment in segments:
+                numbers = {}
+                for number, doc in enumerate(segment.docs):
+                    if versions.get(doc[0]) == doc[3]:
+                        numbers[number] = len(docs)
+                        docs.append(doc)
+                renumbered.append(numbers)
+            terms: Dict[str, Tuple[List[int], List[int]]] = {}
+            for term in sorted(set().union(*(segment.terms for segment in segments))):
+                documents, frequencies = [], []
+                for segment, numbers in zip(segments, renumbered):
+                    postings = segment.postings(term)
+                    for doc, frequency in zip(*postings) if postings else ():
+                        if doc in numbers:
+                            documents.append(numbers[doc])
+                            frequencies.append(frequency)
+                if documents:
+                    terms[term] = (documents, frequencies)
+            merged = Segment.write(self.directory, name, docs, terms)
+            with self._lock:
+                self._segments = [segment for segment in self._segments if segment not in segments] + [merged]
+                self._write_buffer()
+                self._save_manifest()
+                self.stats["merges"] += 1
+                # Searches hold the lock, so none is reading the old segments now
+                for segment in segments:
+                    segment.delete()
+                self._merging = False
+                self._maybe_merge()
+        except BaseException:
+            self._merging = False
+            raise
+
+    def close(self):
+        self.flush()
+
+    # --- Indexing ---
+
+    def add_page(self, title: str, result: Dict[str, Any], revision: Optional[int] = None) -> int:
+        """Index a page's result, replacing an earlier version; returns the number of documents.
+
+        A page already indexed at the same revision is left alone.
+        """
+        with self._lock:
+            self._load()
+            current = self._pages.get(title)
+            if revision is not None and current is not None and current[3] == revision:
+                return 0
+            documents = [(section, tokenize(text)) for section, text in page_documents(result)]
+            self._version += 1
+            for section, tokens in documents:
+                if tokens:
+                    self._buffer.add(title, section, tokens, self._version)
+            self._pages[title] = [self._version, sum(1 for _, tokens in documents if tokens),
+                                  sum(len(tokens) for _, tokens in documents), revision]
+            self.stats["pages_indexed"] += 1
+            if len(self._buffer.docs) >= self.flush_docs:
+                self.flush()
+            return self._pages[title][1]
+
+    def remove_page(self, title: str) -> bool:
+        with self._lock:
+            self._load()
+            return self._pages.pop(title, None) is not None
+
+    # --- Searching ---
+
+    def search(self, query: str, limit: int = 10) -> Dict[str, Any]:
+        """The `limit` best documents for a query by BM25, with the number of matching documents."""
+        started = time.perf_counter()
+        terms = set(tokenize(query))
+        with self._lock:
+            self._load()
+            self.stats["searches"] += 1
+            document_count = sum(entry[1] for entry in self._pages.values())
+            average_length = sum(entry[2] for entry in self._pages.values()) / document_count if document_count else 0.0
+            segments = self._segments + [self._buffer]
+            scores: Dict[Tuple[int, int], float] = {}
+            for term in terms:
+                # Documents of replaced page versions stay in the segments until they are merged
+                # away; they are skipped, and left out of the document frequency
+                found = []
+                for index, segment in enumerate(segments):
+                    postings = segment.postings(term)
+                    for doc, tf in zip(*postings) if postings is not None else ():
+                        page, _, length, version = segment.docs[doc]
+                        if self._pages.get(page, (None,))[0] == version:
+                            found.append((index, doc, tf, length))
+                idf = math.log(1 + (document_count - len(found) + 0.5) / (len(found) + 0.5))
+                for index, doc, tf, length in found:
+                    norm = tf + K1 * (1 - B + B * length / average_length)
+                    scores[index, doc] = scores.get((index, doc), 0.0) + idf * tf * (K1 + 1) / norm
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            hits = []
+            for (index, doc), score in best:
+                page, section = segments[index].docs[doc][:2]
+                hits.append({"title": page.replace('_', ' '), "section": section, "score": round(score, 4),
+                             "url": page_url(page)})
+        return {"query": query, "total": len(scores), "hits": hits,
+                "took_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus the size of the index, for the stats endpoint."""
+        with self._lock:
+            self._load()
+            return dict(self.stats, pages=len(self._pages), documents=sum(entry[1] for entry in self._pages.values()),
+                        segments=len(self._segments), buffered_documents=len(self._buffer.docs),
+                        merging=self._merging)
+
+
+search_index = SearchIndex()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the local search index")
+    parser.add_argument("--index", default=SEARCH_INDEX_DIR, help="index directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="index the results in a JSONL file from bulk.py or crawler.py")
+    add.add_argument("file")
+    query = commands.add_parser("query", help="search the index")
+    query.add_argument("text")
+    query.add_argument("-n", "--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index)
+    if args.command == "add":
+        pages = 0
+        with open(args.file, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                result = record.get("result")
+                if not result:
+                    continue
+                metadata = result.get("page_metadata") or {}
+                url = metadata.get("canonical_url") or metadata.get("url") or record.get("url") or ""
+                title = record.get("title") or url.rsplit('/wiki/', 1)[-1]
+                index.add_page(title, result)
+                pages += 1
+        index.close()
+        print(f"{pages} pages indexed", file=sys.stderr)
+    else:
+        print(json.dumps(index.search(args.text, args.limit), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import gzip
+import json
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from config import COMPRESS_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY, ZSTD_LEVEL
+from metrics import StageTimer, NULL_TIMER
+from models import model_fields
+
+# Optional encoders and compressors; each format is offered only when its package is installed
+try:
+    import orjson # type: ignore
+except ImportError:
+    orjson = None
+try:
+    import msgpack # type: ignore
+except ImportError:
+    msgpack = None
+try:
+    import cbor2 # type: ignore
+except ImportError:
+    cbor2 = None
+try:
+    import brotli # type: ignore
+except ImportError:
+    brotli = None
+try:
+    import zstandard # type: ignore
+except ImportError:
+    zstandard = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def stdlib_json(value: Any) -> bytes:
+    """JSON with the standard library, as FastAPI's JSONResponse renders it."""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=model_fields).encode('utf-8')
+
+
+def fast_json(value: Any) -> bytes:
+    """JSON with orjson when it is installed; falls back to the standard library.
+
+    The result models (see models.py) go through model_fields: orjson reads slotted
+    dataclasses attribute by attribute, which is several times slower.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=model_fields, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+        except TypeError:  # orjson.JSONEncodeError, e.g. integers beyond 64 bits
+            pass
+    return stdlib_json(value)
+
+
+# Response body encoders by media type, in order of preference
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {JSON_MEDIA_TYPE: fast_json}
+if msgpack is not None:
+    ENCODERS["application/msgpack"] = lambda value: msgpack.packb(value, use_bin_type=True, default=model_fields)
+    ENCODERS["application/x-msgpack"] = ENCODERS["application/msgpack"]
+if cbor2 is not None:
+    ENCODERS["application/cbor"] = lambda value: cbor2.dumps(
+        value, default=lambda encoder, model: encoder.encode(model_fields(model)))
+
+# Content codings by Accept-Encoding token, in order of preference
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = lambda body: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+COMPRESSORS["gzip"] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def parse_accept(header: Optional[str]) -> List[Tuple[str, float]]:
+    """Split an Accept or Accept-Encoding header into (value, quality) pairs."""
+    accepted = []
+    for part in (header or "").split(','):
+        value, _, params = part.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, number = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if value:
+            accepted.append((value.strip().lower(), quality))
+    return accepted
+
+
+def _choose(accepted: List[Tuple[str, float]], offered: List[str], wildcards: Tuple[str, ...]) -> Optional[str]:
+    """The offered value with the highest quality; ties go to the earlier offer."""
+    best, best_quality = None, 0.0
+    for value in offered:
+        qualities = [quality for name, quality in accepted if name == value]
+        if not qualities:
+            qualities = [quality for name, quality in accepted
+                         if name in wildcards or (name.endswith('/*') and value.startswith(name[:-1]))]
+        quality = max(qualities, default=0.0)
+        if quality > best_quality:
+            best, best_quality = value, quality
+    return best
+
+
+def negotiate_media_type(accept: Optional[str]) -> Optional[str]:
+    """The response media type for an Accept header, or None when nothing offered is acceptable."""
+    if not accept:
+        return JSON_MEDIA_TYPE
+    return _choose(parse_accept(accept), list(ENCODERS), ('*/*',))
+
+
+def negotiate_coding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The content coding for an Accept-Encoding header, or None to send the body as is."""
+    return _choose(parse_accept(accept_encoding), list(COMPRESSORS), ('*',))
+
+
+def encode_body(value: Any, media_type: str = JSON_MEDIA_TYPE, coding: Optional[str] = None,
+                timer: StageTimer = NULL_TIMER) -> Tuple[bytes, Dict[str, str]]:
+    """Encode a response value; returns the body and the headers describing it."""
+    with timer.stage("serialize"):
+        body = ENCODERS[media_type](value)
+    headers = {"Content-Type": media_type, "Vary": "Accept, Accept-Encoding"}
+    if coding and len(body) >= COMPRESS_MIN_BYTES:
+        with timer.stage("compress"):
+            body = COMPRESSORS[coding](body)
+        headers["Content-Encoding"] = coding
+    return body, headers
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers with the same key share its outcome.
+
+    The call runs in its own task, so a caller that is cancelled (e.g. a client that
+    disconnects) does not cancel the work the other callers are waiting for.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result of func, whether it was shared with a call already in flight)."""
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.stats["shared"] += 1
+        else:
+            self.stats["calls"] += 1
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def snapshot(self) -> Dict[str, int]:
+        """Counters plus the number of calls in flight, for the stats endpoint."""
+        return dict(self.stats, in_flight=len(self._tasks))
@@ -0,0 +1,278 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import lxml.html # type: ignore
+
+from fixtures import FIXTURE_DIR, load_fixtures
+
+# A local stand-in for Wikipedia that serves the saved fixtures at /wiki/<title>, and their
+# body and metadata through /w/api.php?action=parse (see mediawiki.py), and injects failures,
+# so the fetch modes and the upstream policy can be exercised offline:
+#
+#   python stub_server.py --port 8765 --error-rate 0.2 --rate-limit 5 &
+#   WIKIFY_WIKI_BASE_URL=http://127.0.0.1:8765 [WIKIFY_FETCH_MODE=parse] uvicorn main:app
+#
+# Faults can also be changed while it runs, with POST /_stub/faults and a JSON object of
+# the fields in DEFAULT_FAULTS; GET /_stub/stats returns request counts by outcome. POST
+# /_stub/pages/<title> with an HTML body adds or replaces a page, e.g. to simulate an edit.
+
+DEFAULT_FAULTS: Dict[str, Any] = {
+    "error_rate": 0.0,      # share of requests answered with error_status
+    "error_status": 503,
+    "retry_after": None,    # Retry-After sent with 429 and 503 responses, in seconds
+    "latency": 0.0,         # seconds added to every response
+    "rate_limit": 0.0,      # requests per second allowed before answering 429 (0 = no limit)
+    "drop_rate": 0.0,       # share of connections closed without a response
+}
+
+
+REVISION_ID_RE = re.compile(r'"wgRevisionId"\s*:\s*(\d+)')
+
+
+def _inner_html(element: Any) -> str:
+    return (element.text or '') + ''.join(lxml.html.tostring(child, encoding='unicode') for child in element)
+
+
+def parse_result(title: str, html_content: str) -> Dict[str, Any]:
+    """What action=parse (formatversion=2) returns for a page, derived from its skinned HTML."""
+    tree = lxml.html.document_fromstring(html_content)
+    body = tree.xpath("//*[@id='mw-content-text']//*[contains(concat(' ', @class, ' '), ' mw-parser-output ')]")
+    heading = tree.get_element_by_id('firstHeading', None)
+    canonical = tree.xpath("//link[@rel='canonical']/@href")
+    revision = REVISION_ID_RE.search(html_content)
+    description = tree.xpath("//meta[@name='description']/@content")
+
+    categories = []
+    for box, hidden in (('mw-normal-catlinks', False), ('mw-hidden-catlinks', True)):
+        for href in tree.xpath(f"//*[@id='{box}']//li/a/@href"):
+            category = {"sortkey": "", "category": unquote(href.split('Category:', 1)[-1])}
+            if hidden:
+                category["hidden"] = True
+            categories.append(category)
+
+    langlinks = []
+    for link in tree.xpath("//*[@id='p-lang']//li[contains(@class, 'interlanguage-link')]/a"):
+        page_title, _, langname = (link.get('title') or '').rpartition(' – ')
+        langlinks.append({"lang": link.get('lang') or link.get('hreflang') or '', "url": link.get('href', ''),
+                          "langname": langname, "autonym": link.text_content().strip(), "title": page_title})
+
+    disambiguation = tree.xpath("//div[contains(concat(' ', @class, ' '), ' disambiguation ')]"
+                                " | //a[contains(@href, 'Category:Disambiguation_pages')]")
+    return {
+        "title": unquote(canonical[0].split('/wiki/', 1)[-1]).replace('_', ' ') if canonical else title.replace('_', ' '),
+        "pageid": 1,
+        # Fixtures without a revision ID get a stable one derived from their content
+        "revid": int(revision.group(1)) if revision else int(hashlib.sha1(html_content.encode()).hexdigest()[:8], 16),
+        "text": lxml.html.tostring(body[0], encoding='unicode') if body else '',
+        "displaytitle": _inner_html(heading).strip() if heading is not None else title.replace('_', ' '),
+        "categories": categories,
+        "langlinks": langlinks,
+        "indicators": {element.get('id')[len('mw-indicator-'):]: _inner_html(element)
+                       for element in tree.xpath("//*[starts-with(@id, 'mw-indicator-')]")},
+        "properties": dict({"disambiguation": ""} if disambiguation else {},
+                           **({"wikibase-shortdesc": description[0]} if description else {})),
+    }
+
+
+class StubState:
+    """Fixtures, fault settings and counters shared by the handler threads."""
+
+    def __init__(self, pages: Dict[str, str], faults: Dict[str, Any], seed: Optional[int] = None):
+        self.pages = {title.replace(' ', '_'): html for title, html in pages.items()}
+        self.parse_results: Dict[str, Dict[str, Any]] = {}
+        self.faults = dict(DEFAULT_FAULTS, **faults)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def count(self, outcome: str):
+        with self.lock:
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+
+    def over_rate_limit(self) -> bool:
+        """Whether this request exceeds rate_limit within the current one-second window."""
+        rate = self.faults["rate_limit"]
+        if not rate:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            return self._window_count > rate
+
+    def roll(self, name: str) -> bool:
+        with self.lock:
+            return self.random.random() < self.faults[name]
+
+    def parse_result(self, title: str) -> Optional[Dict[str, Any]]:
+        title = title.replace(' ', '_')
+        if title not in self.pages:
+            return None
+        if title not in self.parse_results:
+            self.parse_results[title] = parse_result(title, self.pages[title])
+        return self.parse_results[title]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "WikiStub/1.0"
+    protocol_version = "HTTP/1.1"
+    state: StubState
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status: int, value: Any):
+        self._send(status, json.dumps(value).encode(), {"Content-Type": "application/json"})
+
+    def _throttle_headers(self) -> Dict[str, str]:
+        retry_after = self.state.faults["retry_after"]
+        return {} if retry_after is None else {"Retry-After": str(retry_after)}
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path
+        state = self.state
+        if path == "/_stub/stats":
+            return self._send_json(200, dict(state.stats, faults=state.faults))
+        if not path.startswith("/wiki/") and path != "/w/api.php":
+            state.count("not_found")
+            return self._send(404)
+
+        if state.faults["latency"]:
+            time.sleep(state.faults["latency"])
+        if state.roll("drop_rate"):
+            state.count("dropped")
+            self.close_connection = True
+            return
+        if state.over_rate_limit():
+            state.count("rate_limited")
+            return self._send(429, b"Too many requests", self._throttle_headers())
+        if state.roll("error_rate"):
+            status = state.faults["error_status"]
+            state.count(f"error_{status}")
+            return self._send(status, b"Injected failure", self._throttle_headers() if status in (429, 503) else {})
+
+        if path == "/w/api.php":
+            return self._api(parse_qs(url.query))
+        html = state.pages.get(unquote(path[len("/wiki/"):]).replace(' ', '_'))
+        if html is None:
+            state.count("not_found")
+            return self._send(404, b"No such fixture")
+        body = html.encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            state.count("not_modified")
+            return self._send(304, headers={"ETag": etag})
+        state.count("ok")
+        self._send(200, body, {"Content-Type": "text/html; charset=UTF-8", "ETag": etag})
+
+    do_HEAD = do_GET
+
+    def _api(self, params: Dict[str, Any]):
+        """action=parse and action=query&prop=info; like MediaWiki, errors are reported in a 200 response."""
+        if params.get("action") == ["query"] and "titles" in params:
+            return self._query_info(params["titles"][0].split("|"))
+        if params.get("action") != ["parse"] or "page" not in params:
+            self.state.count("api_error")
+            return self._send_json(200, {"error": {"code": "badvalue", "info": "Only action=parse and action=query are stubbed"}})
+        parsed = self.state.parse_result(params["page"][0])
+        if parsed is None:
+            self.state.count("api_error")
+            return self._send_json(200, {"error": {"code": "missingtitle", "info": "The page you specified doesn't exist."}})
+        self.state.count("api_ok")
+        self._send_json(200, {"parse": parsed})
+
+    def _query_info(self, titles: List[str]):
+        normalized, pages = [], []
+        for title in titles:
+            name = title.replace('_', ' ').strip()
+            if name != title:
+                normalized.append({"from": title, "to": name})
+            parsed = self.state.parse_result(name)
+            if parsed is None:
+                pages.append({"ns": 0, "title": name, "missing": True})
+            else:
+                pages.append({"pageid": parsed["pageid"], "ns": 0, "title": name, "lastrevid": parsed["revid"]})
+        self.state.count("api_ok")
+        self._send_json(200, {"batchcomplete": True, "query": {"normalized": normalized, "pages": pages}})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path.startswith("/_stub/pages/"):
+            # Replace or add a page, e.g. to simulate an edit
+            title = unquote(path[len("/_stub/pages/"):]).replace(' ', '_')
+            with self.state.lock:
+                self.state.pages[title] = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+                self.state.parse_results.pop(title, None)
+            return self._send_json(200, {"title": title})
+        if path != "/_stub/faults":
+            return self._send(404)
+        try:
+            changes = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            unknown = set(changes) - set(DEFAULT_FAULTS)
+        except (ValueError, TypeError):
+            return self._send_json(400, {"detail": "expected a JSON object"})
+        if unknown:
+            return self._send_json(400, {"detail": f"unknown faults: {', '.join(sorted(unknown))}"})
+        with self.state.lock:
+            self.state.faults.update(changes)
+        self._send_json(200, self.state.faults)
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, fixture_dir: str = FIXTURE_DIR,
+                pages: Optional[Dict[str, str]] = None, seed: Optional[int] = None,
+                **faults: Any) -> ThreadingHTTPServer:
+    """A stub server for the given pages (the saved fixtures by default); call serve_forever() to run it."""
+    state = StubState(load_fixtures(fixture_dir) if pages is None else pages, faults, seed)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve saved fixtures as a fake Wikipedia, with injected failures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="directory of saved article HTML")
+    parser.add_argument("--seed", type=int, help="seed for the injected failures")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.fixtures, seed=args.seed, error_rate=args.error_rate,
+                         error_status=args.error_status, retry_after=args.retry_after, latency=args.latency,
+                         rate_limit=args.rate_limit, drop_rate=args.drop_rate)
+    print(f"Serving {len(server.RequestHandlerClass.state.pages)} fixtures on http://{args.host}:{args.port}/wiki/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
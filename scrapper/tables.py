@@ -0,0 +1,244 @@
+import io
+import re
+from datetime import date, datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import pyarrow # type: ignore
+    import pyarrow.parquet # type: ignore
+except ImportError:  # pyarrow is only needed for the Arrow and Parquet table formats
+    pyarrow = None
+
+# Turns article tables into headers plus rows of typed cell values. Works on any tree
+# through the walker's element accessors (walker.SoupDom, parsing.LxmlDom).
+
+# Classes of tables that are page furniture rather than data, by kind
+FURNITURE_CLASSES = {
+    "navbox": ("navbox", "navbox-inner", "navbox-subgroup", "vertical-navbox", "navbox-vertical"),
+    "infobox": ("infobox", "taxobox", "biota"),
+    "sidebar": ("sidebar",),
+    "message": ("ambox", "cmbox", "fmbox", "imbox", "ombox", "tmbox", "mbox-small", "metadata", "sistersitebox"),
+    "layout": ("multicol", "toc", "mw-hiero-table"),
+}
+_CLASS_KINDS = {cls: kind for kind, classes in FURNITURE_CLASSES.items() for cls in classes}
+
+# Classes that mark a table as data even without header cells
+DATA_TABLE_CLASSES = ("wikitable", "sortable")
+
+TABLE_FORMATS = ("rows", "columns")
+
+# The HTML limits on spans; larger values are clamped
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+
+CITATION_RE = re.compile(r'\[(?:\d+|[a-z]|note \d+|citation needed)\]')
+INTEGER_RE = re.compile(r'-?(?:\d{1,3}(?:,\d{3})+|\d+)')
+DECIMAL_RE = re.compile(r'-?(?:\d{1,3}(?:,\d{3})+|\d+)\.\d+')
+ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+DATE_FORMATS = ('%d %B %Y', '%B %d, %Y', '%d %b %Y', '%b %d, %Y')
+
+
+def table_kind(table: Any, dom: Any) -> Optional[str]:
+    """The kind of page furniture a table is (navbox, infobox, ...), or None."""
+    for cls in dom.classes(table):
+        if cls in _CLASS_KINDS:
+            return _CLASS_KINDS[cls]
+        if cls.startswith('infobox'):
+            return "infobox"
+    if dom.get(table, 'role') == 'presentation':
+        return "layout"
+    return None
+
+
+def typed_value(text: str) -> Any:
+    """Convert cell text to an int, float or ISO date string where it looks like one."""
+    text = CITATION_RE.sub('', text).strip().replace('−', '-')
+    if not text:
+        return None
+    if INTEGER_RE.fullmatch(text):
+        number = int(text.replace(',', ''))
+        # Keep integers within 64 bits so every response encoding can carry them
+        return number if -2 ** 63 <= number < 2 ** 63 else text
+    if DECIMAL_RE.fullmatch(text):
+        return float(text.replace(',', ''))
+    if ISO_DATE_RE.fullmatch(text):
+        return text
+    if text[0].isdigit() or text[-1].isdigit():
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(text, date_format).date().isoformat()
+            except ValueError:
+                pass
+    return text
+
+
+def _span(value: Any, limit: int) -> int:
+    try:
+        return min(max(int(value), 1), limit)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _rows(table: Any, dom: Any) -> List[Any]:
+    """The table's own rows, leaving out those of nested tables."""
+    rows = []
+    for child in dom.children(table):
+        name = dom.name(child)
+        if name == 'tr':
+            rows.append(child)
+        elif name in ('thead', 'tbody', 'tfoot'):
+            rows.extend(row for row in dom.children(child) if dom.name(row) == 'tr')
+    return rows
+
+
+def _grid(rows: List[Any], dom: Any) -> List[List[Optional[Tuple[bool, str]]]]:
+    """Lay the cells out on a grid, repeating spanned cells into every slot they cover.
+
+    Each slot holds (is header cell, text), or None where no cell covers it.
+    """
+    grid = []
+    spans: Dict[int, List[Any]] = {}  # column -> [rows still to cover, cell]
+
+    def take_span(row: List[Any]):
+        span = spans[len(row)]
+        row.append(span[1])
+        span[0] -= 1
+        if not span[0]:
+            del spans[len(row) - 1]
+
+    for tr in rows:
+        row: List[Any] = []
+        for cell in dom.children(tr):
+            name = dom.name(cell)
+            if name not in ('th', 'td'):
+                continue
+            while len(row) in spans:
+                take_span(row)
+            entry = (name == 'th', dom.text(cell))
+            rowspan = _span(dom.get(cell, 'rowspan'), MAX_ROWSPAN)
+            for _ in range(_span(dom.get(cell, 'colspan'), MAX_COLSPAN)):
+                if rowspan > 1:
+                    spans[len(row)] = [rowspan - 1, entry]
+                row.append(entry)
+        # Cells spanning down from earlier rows past this row's last cell
+        while spans and max(spans) >= len(row):
+            if len(row) in spans:
+                take_span(row)
+            else:
+                row.append(None)
+        grid.append(row)
+    return grid
+
+
+def parse_table(table: Any, dom: Any) -> Optional[Dict[str, Any]]:
+    """Headers and typed rows of a data table, or None for layout tables.
+
+    Leading rows made only of header cells become the column headers; when there are
+    several, the distinct texts of each column are joined with " / ".
+    """
+    grid = [row for row in _grid(_rows(table, dom), dom) if any(slot and slot[1] for slot in row)]
+    width = max((len(row) for row in grid), default=0)
+    has_header_cells = any(slot and slot[0] for row in grid for slot in row)
+    is_data = has_header_cells or any(cls in DATA_TABLE_CLASSES for cls in dom.classes(table))
+    if width < 2 or not is_data:
+        return None
+
+    header_count = 0
+    while header_count < len(grid) - 1 and all(slot is None or slot[0] for slot in grid[header_count]):
+        header_count += 1
+
+    headers = []
+    for column in range(width):
+        parts: List[str] = []
+        for row in grid[:header_count]:
+            slot = row[column] if column < len(row) else None
+            text = CITATION_RE.sub('', slot[1]).strip() if slot else ''
+            if text and text not in parts:
+                parts.append(text)
+        headers.append(" / ".join(parts))
+
+    rows = []
+    for row in grid[header_count:]:
+        values = [typed_value(slot[1]) if slot else None for slot in row]
+        rows.append(values + [None] * (width - len(values)))
+    if not rows:
+        return None
+
+    caption = next((child for child in dom.children(table) if dom.name(child) == 'caption'), None)
+    return {
+        "caption": dom.text(caption) if caption is not None else "",
+        "headers": headers if header_count else [],
+        "rows": rows,
+    }
+
+
+def to_columns(table: Dict[str, Any]) -> Dict[str, Any]:
+    """The column-oriented form of a parsed table: one value list per column."""
+    width = len(table["rows"][0]) if table["rows"] else len(table["headers"])
+    return {
+        "caption": table["caption"],
+        "headers": table["headers"],
+        "columns": [[row[column] for row in table["rows"]] for column in range(width)],
+    }
+
+
+def format_tables(tables: List[Dict[str, Any]], table_format: str = "rows") -> List[Dict[str, Any]]:
+    """Parsed tables in the requested orientation (see TABLE_FORMATS)."""
+    if table_format == "columns":
+        return [to_columns(table) for table in tables]
+    return tables
+
+
+# --- Arrow and Parquet ---
+
+def column_names(table: Dict[str, Any]) -> List[str]:
+    """Unique, non-empty column names for a parsed table."""
+    width = len(table["rows"][0]) if table["rows"] else len(table["headers"])
+    names: List[str] = []
+    for column in range(width):
+        name = (table["headers"][column] if column < len(table["headers"]) else "") or f"column_{column + 1}"
+        unique, suffix = name, 2
+        while unique in names:
+            unique, suffix = f"{name}_{suffix}", suffix + 1
+        names.append(unique)
+    return names
+
+
+def _arrow_column(values: List[Any]):
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, int) for value in present):
+        return pyarrow.array(values, type=pyarrow.int64())
+    if present and all(isinstance(value, (int, float)) for value in present):
+        return pyarrow.array(values, type=pyarrow.float64())
+    if present and all(isinstance(value, str) and ISO_DATE_RE.fullmatch(value) for value in present):
+        try:
+            return pyarrow.array([date.fromisoformat(value) if value else None for value in values],
+                                 type=pyarrow.date32())
+        except ValueError:
+            pass
+    return pyarrow.array([None if value is None else str(value) for value in values], type=pyarrow.string())
+
+
+def to_arrow(table: Dict[str, Any]):
+    """A pyarrow.Table with one typed column per table column."""
+    if pyarrow is None:
+        raise RuntimeError("The Arrow and Parquet table formats need the pyarrow package")
+    columns = to_columns(table)["columns"]
+    return pyarrow.table({name: _arrow_column(values) for name, values in zip(column_names(table), columns)})
+
+
+def to_arrow_ipc(table: Dict[str, Any]) -> bytes:
+    """A parsed table as an Arrow IPC stream."""
+    arrow_table = to_arrow(table)
+    sink = io.BytesIO()
+    with pyarrow.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue()
+
+
+def to_parquet(table: Dict[str, Any]) -> bytes:
+    """A parsed table as a Parquet file."""
+    arrow_table = to_arrow(table)
+    sink = io.BytesIO()
+    pyarrow.parquet.write_table(arrow_table, sink)
+    return sink.getvalue()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+
+import pytest
+
+# The scraper modules import each other as top-level modules and read their settings from
+# the environment when first imported, so the path, a scratch directory for every on-disk
+# store and the address of the stub Wikipedia (see stub_server.py) are set up before any
+# test imports them.
+SCRAPPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPPER_DIR)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="wikify-tests-")
+STUB_PORT = _free_port()
+os.environ.update({
+    "WIKIFY_PAGE_CACHE_DIR": os.path.join(SCRATCH_DIR, "pages"),
+    "WIKIFY_WATCHLIST_DB": os.path.join(SCRATCH_DIR, "watchlist.sqlite3"),
+    "WIKIFY_SEARCH_INDEX_DIR": "",
+    "WIKIFY_TITLE_ALIAS_DB": "",
+    "WIKIFY_WIKI_BASE_URL": f"http://127.0.0.1:{STUB_PORT}",
+    "WIKIFY_UPSTREAM_BACKOFF_BASE": "0.01",
+    "WIKIFY_PARSE_PROCESSES": "2",
+})
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    from stub_server import make_server
+    server = make_server(port=STUB_PORT, seed=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def stub(stub_server):
+    """The stub's state (pages, faults, request counts), reset for each test."""
+    from stub_server import DEFAULT_FAULTS
+    state = stub_server.RequestHandlerClass.state
+    with state.lock:
+        state.faults = dict(DEFAULT_FAULTS)
+        state.stats.clear()
+    return state
+
+
+@pytest.fixture
+def run():
+    """Runs a coroutine in a fresh event loop, closing the shared upstream client afterwards."""
+    from http_client import close_client
+
+    def run_coroutine(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await close_client()
+        return asyncio.run(main())
+    return run_coroutine
+
+
+@pytest.fixture
+def client(stub):
+    """A test client of the app, whose upstream is the stub."""
+    from fastapi.testclient import TestClient
+    from main import app
+    with TestClient(app) as client:
+        yield client
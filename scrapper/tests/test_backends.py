@@ -0,0 +1,18 @@
+import pytest
+
+from check_backends import EXPECTED_DIFFERENCES, compare_backends
+from fixtures import FIXTURE_TITLES, load_fixtures
+from parsing import available_backends
+
+FIXTURES = load_fixtures()
+
+
+def test_every_fixture_is_committed():
+    assert sorted(FIXTURES) == sorted(FIXTURE_TITLES.values())
+
+
+@pytest.mark.parametrize("title", sorted(FIXTURES))
+@pytest.mark.parametrize("backend", available_backends())
+def test_backend_matches_html_parser(title, backend):
+    differences = compare_backends(FIXTURES[title], f"https://en.wikipedia.org/wiki/{title}", [backend])[backend]
+    assert set(differences) <= EXPECTED_DIFFERENCES.get(backend, set())
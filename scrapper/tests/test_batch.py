@@ -0,0 +1,49 @@
+import main
+
+PAGE = """<html><head><link rel="canonical" href="https://en.wikipedia.org/wiki/{title}"></head>
+<body><div id="mw-content-text"><div class="mw-parser-output"><p>Page {title}.</p></div></div></body></html>"""
+
+
+def test_batch_keeps_the_order_and_reports_failures(stub, client, monkeypatch):
+    titles = [f"Batch_page_{number}" for number in range(6)]
+    for title in titles:
+        stub.pages[title] = PAGE.format(title=title)
+    stub.faults["latency"] = 0.05
+
+    # Count the fetches in flight at once
+    fetch_page_html = main.fetch_page_html
+    in_flight, most = 0, 0
+
+    async def counting_fetch(*args, **kwargs):
+        nonlocal in_flight, most
+        in_flight += 1
+        most = max(most, in_flight)
+        try:
+            return await fetch_page_html(*args, **kwargs)
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(main, "fetch_page_html", counting_fetch)
+    monkeypatch.setattr(main, "BATCH_FETCH_CONCURRENCY", 2)
+
+    requested = titles[:3] + ["No_such_batch_page"] + titles[3:]
+    response = client.post("/v1/longSearch/batch", json={"titles": requested, "fields": "introduction"})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["title"] for item in results] == requested
+    assert "404" in results[3]["error"]
+    for item in results[:3] + results[4:]:
+        assert item["result"] == {"introduction": f"Page {item['title']}."}
+    assert most == 2
+
+
+def test_batch_validates_its_input(client, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_TITLES", 2)
+    assert client.post("/v1/longSearch/batch", json={"titles": ["A", "B", "C"]}).status_code == 400
+    assert client.post("/v1/longSearch/batch", json={"titles": ["A"], "fields": "bogus"}).status_code == 400
+
+
+def test_parse_pool_is_recreated_after_a_restart(stub, client):
+    # The previous app shut its pool down on exit
+    response = client.post("/v1/longSearch/batch", json={"titles": ["Tiger"], "fields": "page_type"})
+    assert set(response.json()["results"][0]["result"]) == {"page_type"}
@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+
+import pytest
+
+import bulk
+from fixtures import FIXTURE_DIR, load_fixtures
+
+FIXTURES = load_fixtures(FIXTURE_DIR)
+
+
+def run_bulk(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["bulk.py", *args, "-j", "1", "--fields", "page_metadata"])
+    assert bulk.main() == 0
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def pages(tmp_path):
+    directory = tmp_path / "pages"
+    directory.mkdir()
+    for title in ("Albert_Einstein", "Mercury"):
+        (directory / f"{title}.html").write_text(FIXTURES[title], encoding='utf-8')
+    return directory
+
+
+def test_resume_drops_a_truncated_last_line(monkeypatch, tmp_path, pages):
+    output = tmp_path / "results.jsonl"
+    run_bulk(monkeypatch, str(pages), "-o", str(output))
+    lines = output.read_bytes().splitlines(keepends=True)
+    output.write_bytes(lines[0] + lines[1][:-20])
+
+    assert bulk.load_checkpoint(str(output)) == {json.loads(lines[0])["id"]}
+    assert output.read_bytes() == lines[0]
+    run_bulk(monkeypatch, str(pages), "-o", str(output))
+    assert sorted(record["id"] for record in read_records(output)) == sorted(os.listdir(pages))
+
+
+def test_failed_pages_are_retried_on_resume(monkeypatch, tmp_path, pages):
+    # A page that cannot be read on the first run, as after a transient failure
+    missing = tmp_path / "Tiger.html"
+    os.symlink(missing, pages / "Tiger.html")
+    output = tmp_path / "results.jsonl"
+    run_bulk(monkeypatch, str(pages), "-o", str(output))
+    assert [record["id"] for record in read_records(output) if "error" in record] == ["Tiger.html"]
+
+    missing.write_text(FIXTURES["Tiger"], encoding='utf-8')
+    run_bulk(monkeypatch, str(pages), "-o", str(output))
+    records = read_records(output)
+    assert sorted(record["id"] for record in records) == sorted(os.listdir(pages))
+    assert all("result" in record for record in records)
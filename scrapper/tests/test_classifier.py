@@ -0,0 +1,38 @@
+from classifier import TIER_CONFIDENCE, KeywordAutomaton, classify
+
+
+def test_automaton_finds_overlapping_keywords():
+    automaton = KeywordAutomaton([("he", 1), ("she", 2), ("his", 3), ("hers", 4)])
+    assert sorted(automaton.iter_matches("ushers")) == [1, 2, 4]
+    assert list(automaton.iter_matches("")) == []
+
+
+def test_infobox_class_beats_categories_and_introduction():
+    result = classify("infobox biography vcard", "1950 births | american films", "is an american film director")
+    assert (result.page_type, result.tier) == ("person", "class")
+    assert result.tier_types == {"class": "person", "category": "person", "intro": "person"}
+
+
+def test_categories_beat_the_introduction():
+    result = classify("", "Towns in France", "is a french novel")
+    assert (result.page_type, result.tier) == ("place", "category")
+    assert result.tier_types["intro"] == "media"
+
+
+def test_first_rule_in_a_tier_wins():
+    # "war" points to an event and "country" to a place; the place rule is listed first
+    result = classify("", "", "a war fought in the country")
+    assert result.page_type == "place"
+
+
+def test_confidence_is_capped_by_the_deciding_tier():
+    only_class = classify("infobox taxobox", "", "")
+    assert only_class.confidence == TIER_CONFIDENCE["class"]
+    # Evidence for another type lowers the confidence
+    mixed = classify("infobox taxobox", "Albums", "")
+    assert mixed.page_type == "species"
+    assert mixed.confidence == round(TIER_CONFIDENCE["class"] * 3 / 5, 3)
+
+
+def test_pages_without_evidence_are_unknown():
+    assert classify() == ("unknown", 0.0, None, {})
@@ -0,0 +1,62 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from crawler import Crawler, link_title
+from main import load_page_result
+
+PAGE = """<!DOCTYPE html><html><head><title>{title} - Wikipedia</title>
+<link rel="canonical" href="https://en.wikipedia.org/wiki/{href}"></head><body>
+<div id="mw-content-text"><div class="mw-parser-output"><p><b>{title}</b> is a page.</p></div></div></body></html>"""
+
+
+async def no_links(title, fields):
+    return {"related_pages": []}
+
+
+def crawl(directory, *args, **options) -> Crawler:
+    crawler = Crawler(str(directory), no_links, *args, **options)
+    asyncio.run(crawler.run(["Seed"]))
+    return crawler
+
+
+def test_resume_keeps_the_saved_options(tmp_path):
+    crawl(tmp_path, "priority", max_depth=1, max_pages=5, fields={"summary"})
+
+    resumed = Crawler(str(tmp_path), no_links)
+    assert resumed.resumed
+    assert (resumed.frontier.mode, resumed.max_depth, resumed.max_pages, resumed.fields) == ("priority", 1, 5, {"summary"})
+    # Giving the same options again is not a conflict
+    assert Crawler(str(tmp_path), no_links, "priority", 1, 5, {"summary"}).max_pages == 5
+
+
+@pytest.mark.parametrize("options", [{"mode": "bfs"}, {"max_depth": 3}, {"max_pages": 10}, {"fields": {"sections"}}])
+def test_resume_rejects_conflicting_options(tmp_path, options):
+    crawl(tmp_path, "priority", max_depth=1, max_pages=5, fields={"summary"})
+    with pytest.raises(ValueError, match=next(iter(options))):
+        Crawler(str(tmp_path), no_links, **options)
+
+
+def test_checkpoints_without_options_resume_with_the_defaults(tmp_path):
+    crawl(tmp_path, "priority")
+    path = os.path.join(tmp_path, "state.json")
+    with open(path) as f:
+        state = json.load(f)
+    del state["options"]
+    with open(path, "w") as f:
+        json.dump(state, f)
+
+    resumed = Crawler(str(tmp_path), no_links)
+    assert (resumed.frontier.mode, resumed.max_depth, resumed.max_pages) == ("priority", 2, 1000)
+
+
+@pytest.mark.parametrize("href, title", [("100%25_(song)", "100%_(song)"), ("Escape_%252F", "Escape_%2F")])
+def test_titles_with_a_percent_sign_are_decoded_once(stub, run, href, title):
+    stub.pages[title] = PAGE.format(title=title.replace("_", " "), href=href)
+    assert link_title(f"/wiki/{href}") == title
+
+    result = run(load_page_result(title, {"page_metadata"}))
+    assert result["page_metadata"].title == title.replace("_", " ")
+    assert stub.stats["ok"] == 1
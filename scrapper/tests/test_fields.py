@@ -0,0 +1,41 @@
+import pytest
+
+from fixtures import FIXTURE_DIR, load_fixtures
+from main import RESULT_FIELDS, build_page_result, project_result, resolve_fields
+from metrics import StageTimer
+
+FIXTURES = load_fixtures(FIXTURE_DIR)
+
+
+def test_resolve_fields():
+    assert resolve_fields() is None
+    assert resolve_fields("summary, sections") == {"summary", "sections"}
+    assert resolve_fields(exclude="references") == set(RESULT_FIELDS) - {"references"}
+    assert resolve_fields("summary,sections", "sections") == {"summary"}
+    with pytest.raises(ValueError, match="nonsense"):
+        resolve_fields("summary,nonsense")
+
+
+@pytest.mark.parametrize("title", sorted(FIXTURES))
+@pytest.mark.parametrize("fields", [{"page_metadata"}, {"summary"}, {"special_data", "tables"},
+                                    {"taxonomic_data", "related_pages"}])
+def test_projection_matches_the_full_result(title, fields):
+    url = f"https://en.wikipedia.org/wiki/{title}"
+    assert build_page_result(FIXTURES[title], url, "lxml", fields) == \
+        project_result(build_page_result(FIXTURES[title], url, "lxml"), fields)
+
+
+def test_only_needed_extractors_run():
+    timer = StageTimer()
+    build_page_result(FIXTURES["Tiger"], "https://en.wikipedia.org/wiki/Tiger", "lxml", {"page_metadata"}, timer)
+    # The walk runs no visitors, and no other extractor runs at all
+    assert [name for name, _ in timer.stages] == ["parse", "page_metadata", "walk"]
+
+
+def test_endpoint_rejects_unknown_fields(client):
+    response = client.get("/v1/longSearch", params={"query": "Tiger", "fields": "bogus"})
+    assert response.status_code == 400 and "bogus" in response.json()["detail"]
+
+    response = client.get("/v1/longSearch", params={"query": "Tiger", "fields": "page_metadata,page_type"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"page_metadata", "page_type"}
@@ -0,0 +1,26 @@
+import httpx
+import pytest
+
+from config import WIKI_BASE_URL
+from http_client import close_client, fetch_html, get_client
+
+
+def test_requests_share_one_pooled_client(stub, run):
+    async def fetches():
+        client = get_client()
+        pages = [await fetch_html(f"{WIKI_BASE_URL}/wiki/{title}") for title in ("Tiger", "Mercury", "Tiger")]
+        assert get_client() is client
+        # One keep-alive connection served all three requests
+        assert len(client._transport._pool.connections) == 1
+        await close_client()
+        assert client.is_closed and get_client() is not client
+        return pages
+
+    pages = run(fetches())
+    assert pages[0] == pages[2] and "Mercury" in pages[1]
+    assert stub.stats["ok"] == 3
+
+
+def test_failed_fetches_raise(stub, run):
+    with pytest.raises(httpx.HTTPStatusError):
+        run(fetch_html(f"{WIKI_BASE_URL}/wiki/No_such_pooled_page"))
@@ -0,0 +1,58 @@
+import pytest
+from bs4 import BeautifulSoup
+
+import main
+from main import extract_birth_info, extract_death_info, process_infobox_field, register_infobox_handler
+
+
+def cell(html):
+    return BeautifulSoup(f"<td>{html}</td>", "html.parser").td
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """The handler registry, restored after the test."""
+    monkeypatch.setattr(main, "INFOBOX_HANDLERS", dict(main.INFOBOX_HANDLERS))
+    return main.INFOBOX_HANDLERS
+
+
+def recording(name):
+    def handler(data_cell, infobox_data, label):
+        infobox_data[label] = name
+    return handler
+
+
+def test_page_type_handlers_win_over_catch_all_ones(handlers):
+    register_infobox_handler(["Motto"], recording("any page"))
+    register_infobox_handler(["Motto"], recording("place"), ["place"])
+    data = {}
+    process_infobox_field("Motto", cell("Fiat lux"), data, "place")
+    assert data == {"Motto": "place"}
+    process_infobox_field("motto", cell("Fiat lux"), data, "person")
+    assert data == {"Motto": "place", "motto": "any page"}
+
+
+def test_registering_a_label_again_replaces_its_handler(handlers):
+    register_infobox_handler(["Motto"], recording("first"))
+    register_infobox_handler(["MOTTO"], recording("second"))
+    data = {}
+    process_infobox_field("Motto", cell("Fiat lux"), data, "place")
+    assert data == {"Motto": "second"}
+
+
+def test_unknown_labels_use_the_generic_handler(handlers):
+    data = {}
+    process_infobox_field("Nickname[1]", cell("The Big Apple"), data, "place")
+    process_infobox_field("Floors", cell("1,234"), data, "structure")
+    process_infobox_field("Sister cities", cell('<a href="/wiki/A">A</a><a href="/wiki/B">B</a>'), data, "place")
+    assert data == {"Nickname": "The Big Apple", "Floors": 1234, "Sister cities": ["A", "B"]}
+
+
+@pytest.mark.parametrize("date", ["c. 1500 (?)", "[1 May 1990]", "1990+"])
+def test_dates_with_regex_characters_are_removed_literally(date):
+    data = {}
+    extract_birth_info(cell(f'<span class="bday">{date}</span> Springfield'), data)
+    assert data["Birth"] == {"date": date, "place": "Springfield"}
+    data = {}
+    extract_death_info(cell(f'<span class="dday">{date}</span> Shelbyville'), data)
+    assert data["Death"]["place"] == "Shelbyville"
@@ -0,0 +1,65 @@
+import httpx
+import pytest
+
+from fixtures import FIXTURE_DIR, load_fixtures
+from main import build_page_result
+from mediawiki import compact_document, latest_revisions, page_url, read_page_data
+from page_cache import fetch_page_html, page_key
+from result_cache import page_identity
+
+FIXTURES = load_fixtures(FIXTURE_DIR)
+
+# Fields that differ by design: the skin has paragraphs and images outside the article body,
+# and the compact document is shorter
+SKIN_ONLY = {"page_stats", "html_length"}
+
+
+def fetch_compact(run, title):
+    return run(fetch_page_html(title, page_url(title), mode="parse"))
+
+
+@pytest.mark.parametrize("title", sorted(FIXTURES))
+def test_compact_documents_give_the_same_result(stub, run, title):
+    compact = fetch_compact(run, title)
+    assert len(compact) < len(FIXTURES[title])
+    url = f"https://en.wikipedia.org/wiki/{title}"
+    skinned, parsed = build_page_result(FIXTURES[title], url, "lxml"), build_page_result(compact, url, "lxml")
+
+    # action=parse reports no last-edit time, and the stub serializes link URLs differently
+    assert set(parsed) - SKIN_ONLY == set(skinned) - SKIN_ONLY
+    compared = set(skinned) - SKIN_ONLY - {"page_metadata", "related_pages"}
+    assert {name: parsed.get(name) for name in compared} == {name: skinned[name] for name in compared}
+    assert [page.title for page in parsed.get("related_pages", [])] == \
+        [page.title for page in skinned.get("related_pages", [])]
+    assert (parsed["page_metadata"].title, parsed["page_metadata"].description) == \
+        (skinned["page_metadata"].title, skinned["page_metadata"].description)
+    assert parsed["page_metadata"].last_modified == ""
+    # The revision is read from the head, so the result cache works in both modes
+    assert page_identity(compact) == page_identity(FIXTURES[title])
+
+
+def test_compact_documents_carry_their_metadata(stub, run):
+    data = read_page_data(fetch_compact(run, "Mercury"))
+    assert data["disambiguation"] and data["title"] == "Mercury"
+    assert read_page_data(FIXTURES["Mercury"]) is None
+    assert page_key("Mercury", "parse") != page_key("Mercury", "page")
+
+
+def test_metadata_is_escaped_in_the_head():
+    document = compact_document({"title": "A</script>B", "revid": 1, "text": "<p>x</p>",
+                                 "properties": {"wikibase-shortdesc": 'Quote " and </script>'}})
+    assert read_page_data(document)["description"] == 'Quote " and </script>'
+
+
+def test_missing_pages_are_404s(stub, run):
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        fetch_compact(run, "No_such_parsed_page")
+    assert error.value.response.status_code == 404
+
+
+def test_latest_revisions_follow_normalizations_and_redirects():
+    data = {"query": {"normalized": [{"from": "tiger", "to": "Tiger"}],
+                      "redirects": [{"from": "Tigers", "to": "Tiger"}],
+                      "pages": [{"title": "Tiger", "lastrevid": 5}, {"title": "Nothing", "missing": True}]}}
+    assert latest_revisions(data, ["tiger", "Tigers", "Nothing", "Unlisted"]) == \
+        {"tiger": 5, "Tigers": 5, "Nothing": None, "Unlisted": None}
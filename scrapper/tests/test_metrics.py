@@ -0,0 +1,39 @@
+import re
+
+from metrics import Histogram, StageTimer
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test.", "stage", (0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "parse")
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="parse",le="0.1"} 1',
+        'test_seconds_bucket{stage="parse",le="1"} 3',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'test_seconds_sum{stage="parse"} 6.05',
+        'test_seconds_count{stage="parse"} 4',
+    ]
+
+
+def test_server_timing_lists_the_stages():
+    timer = StageTimer()
+    timer.add("fetch", 0.0125)
+    with timer.stage("parse"):
+        pass
+    assert re.fullmatch(r"fetch;dur=12\.50, parse;dur=\d+\.\d\d", timer.server_timing())
+
+
+def test_requests_report_their_stages(stub, client):
+    # A page no other test has extracted, so it is not served from the result cache
+    stub.pages["Timed_page"] = stub.pages["New_York_City"].replace("1249110002", "1249110099")
+    response = client.get("/v1/longSearch", params={"query": "Timed_page"})
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert stages[0] == "fetch" and {"parse", "page_metadata", "walk", "serialize"} <= set(stages)
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'wikify_stage_seconds_count{stage="fetch"}' in metrics.text
+    assert "wikify_result_bytes_count" in metrics.text
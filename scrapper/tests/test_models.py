@@ -0,0 +1,50 @@
+import json
+from dataclasses import fields
+
+import pytest
+
+import serialization
+from fixtures import FIXTURE_DIR, load_fixtures
+from main import build_page_result
+from models import MODELS, RESULT_TYPES, Section, json_schema, model_fields
+
+FIXTURES = load_fixtures(FIXTURE_DIR)
+
+
+def test_models_are_slotted():
+    for model in MODELS:
+        assert "__dict__" not in dir(model(*[None] * len(fields(model))))
+
+
+def test_model_fields_follow_the_declared_order():
+    for model in MODELS:
+        names = [field.name for field in fields(model)]
+        assert list(model_fields(model(*names))) == names
+    with pytest.raises(TypeError):
+        model_fields(object())
+
+
+@pytest.mark.parametrize("title", sorted(FIXTURES))
+def test_every_encoder_writes_the_same_result(title):
+    result = build_page_result(FIXTURES[title], f"https://en.wikipedia.org/wiki/{title}", "lxml")
+    body = serialization.fast_json(result)
+    assert body == serialization.stdlib_json(result)
+    decoded = json.loads(body)
+    assert set(decoded) <= set(RESULT_TYPES)
+    if serialization.orjson is not None:
+        # The model_fields path gives what orjson writes for dataclasses by itself
+        assert body == serialization.orjson.dumps(result)
+    if serialization.msgpack is not None:
+        assert serialization.msgpack.unpackb(serialization.ENCODERS["application/msgpack"](result)) == decoded
+    if serialization.cbor2 is not None:
+        assert serialization.cbor2.loads(serialization.ENCODERS["application/cbor"](result)) == decoded
+
+
+def test_schema_describes_every_model():
+    schema = json_schema()
+    assert set(schema["properties"]) == set(RESULT_TYPES)
+    assert set(schema["$defs"]) == {model.__name__ for model in MODELS}
+    assert schema["properties"]["sections"] == {"type": "array", "items": {"$ref": "#/$defs/Section"}}
+    assert schema["$defs"]["Section"]["required"] == [field.name for field in fields(Section)]
+    assert schema["$defs"]["LanguageLink"]["properties"]["language"] == {"anyOf": [{"type": "string"},
+                                                                                    {"type": "null"}]}
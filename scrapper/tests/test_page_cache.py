@@ -0,0 +1,102 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+import page_cache
+from mediawiki import page_url
+from page_cache import CachedPage, PageCache, expire_page, fetch_page_html, page_key
+
+PAGE = "<html><head><title>{title}</title></head><body><p>{text}</p></body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """A fresh page cache with a disk tier, in place of the shared one."""
+    cache = PageCache(disk_dir=str(tmp_path))
+    monkeypatch.setattr(page_cache, "page_cache", cache)
+    return cache
+
+
+def fetch(title, **options):
+    return fetch_page_html(title, page_url(title), mode="page", **options)
+
+
+def test_stale_pages_are_revalidated(stub, run, cache):
+    stub.pages["Cached_page"] = PAGE.format(title="Cached page", text="first")
+
+    async def fetches():
+        first = await fetch("Cached_page")
+        cached = await fetch("Cached_page")
+        unchanged = await fetch("Cached_page", ttl=0)
+        stub.pages["Cached_page"] = PAGE.format(title="Cached page", text="edited")
+        edited = await fetch("Cached_page", ttl=0)
+        return first, cached, unchanged, edited
+
+    first, cached, unchanged, edited = run(fetches())
+    assert first == cached == unchanged and "edited" in edited
+    assert (stub.stats["ok"], stub.stats["not_modified"]) == (2, 1)
+    assert {name: cache.stats[name] for name in ("misses", "hits", "revalidated", "refreshed")} == \
+        {"misses": 1, "hits": 1, "revalidated": 1, "refreshed": 1}
+
+
+def test_expired_pages_are_revalidated_within_their_ttl(stub, run, cache):
+    stub.pages["Expired_page"] = PAGE.format(title="Expired page", text="text")
+
+    async def fetches():
+        await fetch("Expired_page")
+        await expire_page("expired page", mode="page")
+        await fetch("Expired_page")
+
+    run(fetches())
+    assert (stub.stats["ok"], stub.stats["not_modified"]) == (1, 1)
+
+
+def test_disk_tier_is_shared_between_caches(stub, run, cache, tmp_path):
+    stub.pages["Disk_page"] = PAGE.format(title="Disk page", text="text")
+    html = run(fetch("Disk_page"))
+
+    other = PageCache(disk_dir=str(tmp_path))
+    entry = run(other.get(page_key("Disk_page", "page")))
+    assert entry.html == html and entry.etag
+    assert other.stats["disk_hits"] == 1
+    assert run(other.get(page_key("Missing_page", "page"))) is None
+
+
+def test_memory_tier_evicts_least_recently_used_pages():
+    html = "x" * 1000
+    cache = PageCache(max_bytes=3 * sys.getsizeof(html), disk_dir="")
+    for key in "abc":
+        cache.put_memory(CachedPage(key=key, html=html))
+    cache.get_memory("a")
+    cache.put_memory(CachedPage(key="d", html=html))
+    assert [key for key in "abcd" if cache.get_memory(key) is not None] == ["a", "c", "d"]
+    assert cache.stats["evictions"] == 1
+    # A page larger than the whole budget is not kept
+    cache.put_memory(CachedPage(key="e", html=html * 4))
+    assert cache.get_memory("e") is None and cache.snapshot()["entries"] == 3
+
+
+@pytest.mark.skipif(page_cache.fcntl is None, reason="flock is not available")
+def test_workers_sharing_the_disk_tier_fetch_a_page_once(stub, run, cache, tmp_path):
+    """While one worker holds a page's lock file, another waits and then reads its copy."""
+    stub.pages["Locked_page"] = PAGE.format(title="Locked page", text="text")
+    key = page_key("Locked_page", "page")
+    other_worker = PageCache(disk_dir=str(tmp_path))
+
+    async def fetches():
+        async def fetch_in_other_worker():
+            async with other_worker.fetch_lock(key):
+                await asyncio.sleep(0.2)
+                await other_worker.put(CachedPage(key=key, html="from the other worker", fetched_at=time.time()))
+
+        holder = asyncio.ensure_future(fetch_in_other_worker())
+        await asyncio.sleep(0.05)
+        html = await fetch("Locked_page")
+        await holder
+        return html
+
+    assert run(fetches()) == "from the other worker"
+    assert cache.stats["lock_waits"] > 0 and cache.stats["fetched_by_other_worker"] == 1
+    assert "ok" not in stub.stats
@@ -0,0 +1,75 @@
+import pytest
+
+import main
+from result_cache import ResultCache, page_identity
+
+PAGE = """<html><head><script>RLCONF={{"wgRevisionId":{revision}}};</script>
+<link rel="canonical" href="https://en.wikipedia.org/wiki/Revised_page"></head>
+<body><div id="mw-content-text"><div class="mw-parser-output"><p>Revision {revision}.</p></div></div></body></html>"""
+
+
+def test_page_identity_is_read_from_the_head():
+    assert page_identity(PAGE.format(revision=7)) == ("Revised_page", 7)
+    assert page_identity("<html><head></head></html>") is None
+
+
+def test_newer_revisions_replace_older_ones():
+    cache = ResultCache()
+    cache.put("Page", 1, "first")
+    assert cache.get("Page", 1) == "first"
+    assert cache.get("Page", 2) is None
+    # Seeing revision 2 dropped revision 1
+    assert cache.get("Page", 1) is None
+    assert cache.stats["invalidated"] == 1
+
+
+def test_older_revisions_leave_the_newer_one_alone():
+    cache = ResultCache()
+    cache.put("Page", 2, "newer")
+    assert cache.get("Page", 1) is None
+    cache.put("Page", 1, "older")
+    assert cache.get("Page", 2) == "newer"
+    assert cache.stats["invalidated"] == 0 and cache.snapshot()["entries"] == 1
+
+
+def test_entries_expire_and_are_evicted():
+    cache = ResultCache(max_entries=2, ttl=0)
+    cache.put("Page", 1, "result")
+    assert cache.get("Page", 1) is None and cache.stats["expired"] == 1
+
+    cache = ResultCache(max_entries=2)
+    for title in ("A", "B", "C"):
+        cache.put(title, 1, title)
+    assert [cache.get(title, 1) for title in ("A", "B", "C")] == [None, "B", "C"]
+    assert cache.snapshot()["entries"] == 2 and cache.stats["evictions"] == 1
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    """The titles build_page_result ran for, with a fresh result cache."""
+    monkeypatch.setattr(main, "result_cache", ResultCache())
+    build_page_result = main.build_page_result
+    built = []
+
+    def counting_build(html_content, *args, **kwargs):
+        built.append(page_identity(html_content))
+        return build_page_result(html_content, *args, **kwargs)
+
+    monkeypatch.setattr(main, "build_page_result", counting_build)
+    return built
+
+
+def test_repeat_requests_skip_extraction_until_the_revision_changes(stub, run, extractions):
+    stub.pages["Revised_page"] = PAGE.format(revision=1)
+
+    async def requests():
+        first = await main.load_page_result("Revised_page")
+        again = await main.load_page_result("Revised_page")
+        stub.pages["Revised_page"] = PAGE.format(revision=2)
+        edited = await main.refresh_page("Revised_page")
+        return first, again, edited
+
+    first, again, edited = run(requests())
+    assert again == first and edited != first
+    assert extractions == [("Revised_page", 1), ("Revised_page", 2)]
+    assert main.result_cache.stats["hits"] == 1
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("lxml")
+
+from fixtures import FIXTURE_DIR, load_fixtures
+from parsing import SCOPED_BACKEND, parse_html
+
+FIXTURES = load_fixtures(FIXTURE_DIR)
+
+
+@pytest.mark.parametrize("title", sorted(FIXTURES))
+def test_scoped_parse_keeps_only_what_the_extractors_read(title):
+    full = parse_html(FIXTURES[title], "lxml").soup
+    scoped = parse_html(FIXTURES[title], SCOPED_BACKEND).soup
+    assert len(scoped.find_all(True)) < len(full.find_all(True))
+    assert not scoped.find_all("script") and scoped.find(id="mw-content-text") is not None
+    assert scoped.find("link", rel="canonical")["href"] == full.find("link", rel="canonical")["href"]
+
+
+def test_release_body_keeps_the_parts_read_after_the_walk():
+    page = parse_html(FIXTURES["Tiger"], SCOPED_BACKEND)
+    kept = {str(element) for element in page.soup.select('#toc, .geo, table[class*="infobox"]')}
+    assert kept and page.soup.select("#mw-content-text p")
+    page.release_body()
+    assert not page.soup.select("#mw-content-text p")
+    assert {str(element) for element in page.soup.select('#toc, .geo, table[class*="infobox"]')} == kept
+    # Other backends keep their soup whole
+    full = parse_html(FIXTURES["Tiger"], "lxml")
+    full.release_body()
+    assert full.soup.select("#mw-content-text p")
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+from models import Section
+from search_index import SearchIndex, page_documents
+
+PAGES = {
+    "Tiger": ("The tiger is the largest living cat species.",
+              [("Hunting", "Tigers hunt deer and wild boar at night."), ("Range", "Tigers live across Asia.")]),
+    "Lion": ("The lion is a large cat of the genus Panthera.",
+             [("Hunting", "Lions hunt in groups called prides.")]),
+    "Deer": ("Deer are hoofed ruminant mammals.", [("Predators", "Deer are hunted by tigers and wolves.")]),
+    "Asia": ("Asia is the largest continent.", [("Wildlife", "Asia has tigers, elephants and pandas.")]),
+}
+
+
+def result(introduction, sections):
+    return {"introduction": introduction, "sections": [Section(heading, content) for heading, content in sections]}
+
+
+def hits(index, query, limit=10):
+    return [(hit["title"], hit["section"]) for hit in index.search(query, limit)["hits"]]
+
+
+def wait_for_merges(index, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while index.snapshot()["merging"]:
+        assert time.monotonic() < deadline, "merge did not finish"
+        time.sleep(0.01)
+
+
+def test_page_documents_read_models_and_dicts():
+    fresh = result("Intro", [("Heading", "Text")])
+    read_back = {"introduction": "Intro", "sections": [{"heading": "Heading", "content": "Text"}],
+                 "infobox_data": {"Genus": "Panthera", "url": "https://en.wikipedia.org/wiki/Tiger"}}
+    assert page_documents(fresh) == [("", "Intro"), ("Heading", "Heading\nText")]
+    assert page_documents(read_back) == page_documents(fresh) + [("Infobox", "Genus Panthera")]
+
+
+def test_bm25_ranking_and_replacement():
+    index = SearchIndex(None)
+    for title, (introduction, sections) in PAGES.items():
+        index.add_page(title, result(introduction, sections), revision=1)
+    assert hits(index, "hunt", 2) == [("Lion", "Hunting"), ("Tiger", "Hunting")]
+    assert hits(index, "largest continent")[0] == ("Asia", "")
+    assert index.search("zebra")["total"] == 0
+
+    # The same revision is not indexed twice; a new one replaces the old documents
+    assert index.add_page("Lion", result(*PAGES["Lion"]), revision=1) == 0
+    index.add_page("Lion", result("The lion sleeps.", []), revision=2)
+    assert ("Lion", "Hunting") not in hits(index, "hunt")
+    assert index.remove_page("Deer") and not index.remove_page("Deer")
+    assert "Deer" not in {title for title, _ in hits(index, "deer")}
+
+
+def test_segments_survive_a_restart(tmp_path):
+    index = SearchIndex(str(tmp_path), flush_docs=2, merge_factor=100)
+    for title, (introduction, sections) in PAGES.items():
+        index.add_page(title, result(introduction, sections), revision=1)
+    index.close()
+    expected = index.search("tigers hunt")
+
+    reopened = SearchIndex(str(tmp_path))
+    assert reopened.snapshot()["segments"] == index.snapshot()["segments"] > 1
+    assert reopened.search("tigers hunt")["hits"] == expected["hits"]
+
+
+def test_merges_drop_replaced_documents(tmp_path):
+    index = SearchIndex(str(tmp_path), flush_docs=1, merge_factor=3)
+    reference = SearchIndex(None)
+    for revision in (1, 2, 3):
+        for title, (introduction, sections) in PAGES.items():
+            page = result(f"{introduction} Revision {revision}.", sections)
+            index.add_page(title, page, revision)
+            reference.add_page(title, page, revision)
+            wait_for_merges(index)
+    index.close()
+    wait_for_merges(index)
+
+    snapshot = index.snapshot()
+    assert snapshot["merges"] > 0 and snapshot["segments"] < snapshot["flushes"]
+    # Merged segments are deleted; the documents of replaced revisions are gone from the rest
+    names = {name.split(".")[0] for name in os.listdir(tmp_path) if name.startswith("seg-")}
+    assert names == {segment.name for segment in index._segments}
+    live = sum(len(segment.docs) for segment in index._segments)
+    assert live < 3 * snapshot["documents"]
+    for query in ("tigers hunt", "revision", "largest", "asia wildlife"):
+        assert sorted(hits(index, query)) == sorted(hits(reference, query))
+    assert hits(SearchIndex(str(tmp_path)), "tigers hunt") == hits(index, "tigers hunt")
+
+
+def test_searches_run_while_segments_merge(tmp_path):
+    index = SearchIndex(str(tmp_path), flush_docs=1, merge_factor=2)
+    errors = []
+    done = threading.Event()
+
+    def search_continuously():
+        try:
+            while not done.is_set():
+                index.search("tigers hunt")
+        except Exception as e:
+            errors.append(e)
+
+    searcher = threading.Thread(target=search_continuously)
+    searcher.start()
+    try:
+        for revision in range(1, 20):
+            for title, (introduction, sections) in PAGES.items():
+                index.add_page(title, result(introduction, sections), revision)
+    finally:
+        done.set()
+        searcher.join()
+    wait_for_merges(index)
+    assert not errors
+    # Every merge checks for the next one, so the segments do not pile up
+    assert index.snapshot()["segments"] < index.merge_factor
+    # Replaced documents leave the scores alone, merged or not
+    assert hits(index, "hunt", 2) == [("Lion", "Hunting"), ("Tiger", "Hunting")]
+    assert all(hit["score"] > 0 for hit in index.search("hunt")["hits"])
+
+
+def test_merges_save_buffered_pages_with_the_manifest(tmp_path):
+    index = SearchIndex(str(tmp_path), flush_docs=100, merge_factor=100)
+    for title in ("Tiger", "Lion"):
+        index.add_page(title, result(*PAGES[title]), revision=1)
+        index.flush()
+    index.add_page("Asia", result(*PAGES["Asia"]), revision=1)
+    index._merging = True
+    index._merge(list(index._segments))
+    assert index.snapshot()["buffered_documents"] == 0
+
+    # Reopened without closing: every page the manifest lists can be found
+    reopened = SearchIndex(str(tmp_path))
+    assert hits(reopened, "largest continent")[0] == ("Asia", "")
+    assert reopened.add_page("Asia", result(*PAGES["Asia"]), revision=1) == 0
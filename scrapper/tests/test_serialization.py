@@ -0,0 +1,82 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import main
+import serialization
+from serialization import (COMPRESSORS, ENCODERS, JSON_MEDIA_TYPE, encode_body, negotiate_coding,
+                           negotiate_media_type, parse_accept)
+
+
+def test_parse_accept():
+    assert parse_accept("application/json;q=0.5, application/msgpack") == [("application/json", 0.5),
+                                                                            ("application/msgpack", 1.0)]
+    assert parse_accept("gzip;q=bogus") == [("gzip", 0.0)]
+    assert parse_accept(None) == []
+
+
+def test_media_type_negotiation():
+    assert negotiate_media_type(None) == JSON_MEDIA_TYPE
+    assert negotiate_media_type("*/*") == JSON_MEDIA_TYPE
+    assert negotiate_media_type("application/*") == JSON_MEDIA_TYPE
+    assert negotiate_media_type("text/html") is None
+    if "application/msgpack" in ENCODERS:
+        assert negotiate_media_type("application/json;q=0.5, application/msgpack") == "application/msgpack"
+        # An explicit quality wins over a wildcard
+        assert negotiate_media_type("application/*, application/json;q=0.1") == "application/msgpack"
+
+
+def test_coding_negotiation():
+    assert negotiate_coding(None) is None
+    assert negotiate_coding("gzip") == "gzip"
+    assert negotiate_coding("gzip;q=0") is None
+    assert negotiate_coding("identity") is None
+    # Ties go to the coding offered first
+    assert negotiate_coding("*") == next(iter(COMPRESSORS))
+
+
+def test_small_bodies_are_not_compressed():
+    body, headers = encode_body({"x": 1}, coding="gzip")
+    assert "Content-Encoding" not in headers and json.loads(body) == {"x": 1}
+
+    value = {"text": "x" * serialization.COMPRESS_MIN_BYTES}
+    body, headers = encode_body(value, coding="gzip")
+    assert headers["Content-Encoding"] == "gzip" and json.loads(gzip.decompress(body)) == value
+    assert headers["Vary"] == "Accept, Accept-Encoding"
+
+
+@pytest.mark.parametrize("media_type", sorted(ENCODERS))
+def test_endpoint_answers_in_the_negotiated_encoding(client, media_type):
+    response = client.get("/v1/longSearch", params={"query": "Mercury", "fields": "page_type,categories"},
+                          headers={"Accept": media_type})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    expected = client.get("/v1/longSearch", params={"query": "Mercury", "fields": "page_type,categories"}).json()
+    decode = {"application/json": json.loads}
+    if serialization.msgpack is not None:
+        decode["application/msgpack"] = decode["application/x-msgpack"] = serialization.msgpack.unpackb
+    if serialization.cbor2 is not None:
+        decode["application/cbor"] = serialization.cbor2.loads
+    assert decode[media_type](response.content) == expected
+
+
+def test_endpoint_refuses_unacceptable_media_types(client):
+    response = client.get("/v1/longSearch", params={"query": "Mercury"}, headers={"Accept": "text/html"})
+    assert response.status_code == 406
+
+
+def test_endpoint_encodes_off_the_event_loop(client, monkeypatch):
+    loops = []
+
+    def recording_encode_body(*args):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return encode_body(*args)
+
+    monkeypatch.setattr(main, "encode_body", recording_encode_body)
+    assert client.get("/v1/longSearch", params={"query": "Mercury", "fields": "page_type"}).status_code == 200
+    assert loops == [None]
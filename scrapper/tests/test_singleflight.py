@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import main
+from singleflight import SingleFlight
+
+PAGE = """<html><head><link rel="canonical" href="https://en.wikipedia.org/wiki/Popular_page"></head>
+<body><div id="mw-content-text"><div class="mw-parser-output"><p>Everyone wants this.</p></div></div></body></html>"""
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return len(runs)
+
+    async def calls():
+        shared = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        again = await flight.do("key", work)
+        return shared, again
+
+    shared, again = asyncio.run(calls())
+    assert shared == [(1, False)] + [(1, True)] * 4
+    # Once the call is done, the next one runs again
+    assert again == (2, False)
+    assert flight.snapshot() == {"calls": 2, "shared": 4, "in_flight": 0}
+
+
+def test_failures_are_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def calls():
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    assert [str(outcome) for outcome in asyncio.run(calls())] == ["upstream down"] * 2
+    assert flight.snapshot()["in_flight"] == 0
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def calls():
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(calls()) == ("done", True)
+
+
+def test_identical_requests_make_one_fetch_and_extraction(stub, run, monkeypatch):
+    stub.pages["Popular_page"] = PAGE
+    stub.faults["latency"] = 0.1
+    build_page_result = main.build_page_result
+    built = []
+    monkeypatch.setattr(main, "build_page_result", lambda *args: built.append(1) or build_page_result(*args))
+
+    async def requests():
+        return await asyncio.gather(*(main.load_page_result("Popular_page") for _ in range(5)),
+                                    main.load_page_result("Popular_page", {"introduction"}))
+
+    results = run(requests())
+    assert all(result == results[0] for result in results[:5])
+    assert results[5] == {"introduction": "Everyone wants this."}
+    # The projection is a different key, but shares the page fetch
+    assert stub.stats["ok"] == 1 and len(built) == 2
@@ -0,0 +1,40 @@
+import json
+
+from main import iter_ndjson
+
+
+def reassemble(lines):
+    """The result the NDJSON records describe, as JSON values."""
+    result = {}
+    records = [json.loads(line) for line in lines]
+    assert records[-1] == {"done": True}
+    for record in records[:-1]:
+        if "index" in record:
+            assert record["index"] == len(result.setdefault(record["field"], []))
+            result[record["field"]].append(record["value"])
+        else:
+            result[record["field"]] = record["value"]
+    return result
+
+
+def test_stream_gives_the_same_result(client):
+    full = client.get("/v1/longSearch", params={"query": "World_War_II"}).json()
+    response = client.get("/v1/longSearch/stream", params={"query": "World_War_II"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert reassemble(response.iter_lines()) == full
+
+
+def test_stream_projects_fields(client):
+    response = client.get("/v1/longSearch/stream", params={"query": "Tiger", "fields": "page_type,categories"})
+    assert set(reassemble(response.iter_lines())) == {"page_type", "categories"}
+    assert client.get("/v1/longSearch/stream", params={"query": "Tiger", "fields": "bogus"}).status_code == 400
+
+
+def test_failures_after_the_first_line_are_reported_in_band():
+    def parts():
+        yield "page_type", "animal"
+        raise ValueError("broken page")
+
+    lines = [json.loads(line) for line in iter_ndjson(parts())]
+    assert lines == [{"field": "page_type", "value": "animal"}, {"error": "Error processing page: broken page"}]
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("lxml")
+
+import parsing
+from fixtures import FIXTURE_DIR, load_fixtures
+from main import build_page_result, stream_page_html
+from mediawiki import page_url
+from parsing import NATIVE_BACKEND, StreamingParse
+
+HTML = load_fixtures(FIXTURE_DIR)["Albert_Einstein"]
+URL = "https://en.wikipedia.org/wiki/Albert_Einstein"
+
+
+async def feed_in_pieces(stream: StreamingParse, html_content: str, size: int = 1000):
+    for start in range(0, len(html_content), size):
+        await stream.feed(html_content[start:start + size])
+
+
+def test_streamed_page_gives_the_same_result(monkeypatch):
+    skeleton = parsing.ParsedPage._skeleton_html
+    threads = []
+
+    def recording_skeleton(page):
+        threads.append(threading.get_ident())
+        return skeleton(page)
+
+    monkeypatch.setattr(parsing.ParsedPage, "_skeleton_html", recording_skeleton)
+
+    async def stream_page():
+        stream = StreamingParse()
+        await feed_in_pieces(stream, HTML)
+        assert stream.head is not None and stream.head_ready.is_set()
+        return await stream.page(HTML)
+
+    page = asyncio.run(stream_page())
+    assert page is not None and page.backend == NATIVE_BACKEND
+    # The tree and the soup skeleton are built by the worker, not on the event loop
+    assert threads and threads[0] != threading.get_ident()
+    assert build_page_result(HTML, URL, NATIVE_BACKEND, page=page) == build_page_result(HTML, URL, NATIVE_BACKEND)
+
+
+def test_incomplete_or_discarded_streams_stop_the_worker():
+    async def incomplete():
+        stream = StreamingParse()
+        await feed_in_pieces(stream, HTML[:5000])
+        assert await stream.page(HTML) is None
+        return await stream._worker
+
+    async def discarded():
+        stream = StreamingParse()
+        await feed_in_pieces(stream, HTML[:5000])
+        stream.discard()
+        await stream.feed(HTML[5000:])
+        return await stream._worker, await stream.page(HTML)
+
+    assert asyncio.run(incomplete()) is None
+    assert asyncio.run(discarded()) == (None, None)
+
+
+def test_download_is_parsed_while_it_arrives(stub, run):
+    stub.pages["Streamed_page"] = HTML
+
+    async def fetch():
+        stream = StreamingParse()
+        html_content, cached_result = await stream_page_html("Streamed_page", page_url("Streamed_page"), stream)
+        return html_content, await stream.page(html_content), stream
+
+    html_content, page, stream = run(fetch())
+    assert html_content == HTML
+    assert page is not None and stream.length == len(HTML) and stream.seconds > 0
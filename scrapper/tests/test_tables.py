@@ -0,0 +1,58 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from tables import format_tables, parse_table, table_kind, to_arrow, typed_value
+from walker import SoupDom
+
+SPANNED = """<table class="wikitable"><caption>Results</caption>
+<tr><th rowspan="2">Year</th><th colspan="2">Votes</th></tr>
+<tr><th>For</th><th>Against</th></tr>
+<tr><td rowspan="2">1990</td><td>1,200</td><td>3.5[1]</td></tr>
+<tr><td>900</td><td>12 March 1991</td></tr>
+</table>"""
+
+
+def parse(html):
+    table = BeautifulSoup(html, "html.parser").table
+    return parse_table(table, SoupDom())
+
+
+@pytest.mark.parametrize("text, value", [
+    ("1,234", 1234), ("−42", -42), ("3.25", 3.25), ("2001-02-03", "2001-02-03"),
+    ("3 February 2001", "2001-02-03"), ("February 3, 2001", "2001-02-03"),
+    ("12[citation needed]", 12), ("9" * 30, "9" * 30), ("", None), ("Paris", "Paris"),
+])
+def test_typed_value(text, value):
+    assert typed_value(text) == value
+
+
+def test_spanned_cells_fill_every_slot_they_cover():
+    table = parse(SPANNED)
+    assert table == {
+        "caption": "Results",
+        "headers": ["Year", "Votes / For", "Votes / Against"],
+        "rows": [[1990, 1200, 3.5], [1990, 900, "1991-03-12"]],
+    }
+
+
+def test_columns_hold_the_same_values_as_rows():
+    table = parse(SPANNED)
+    columns = format_tables([table], "columns")[0]
+    assert columns["headers"] == table["headers"]
+    assert [list(row) for row in zip(*columns["columns"])] == table["rows"]
+    assert format_tables([table]) == [table]
+
+
+def test_layout_tables_are_skipped():
+    assert parse("<table><tr><td>a</td><td>b</td></tr></table>") is None
+    assert parse("<table class='wikitable'><tr><td>only</td></tr></table>") is None
+    navbox = BeautifulSoup("<table class='navbox'><tr><td>x</td></tr></table>", "html.parser").table
+    assert table_kind(navbox, SoupDom()) == "navbox"
+
+
+def test_arrow_columns_are_typed():
+    pyarrow = pytest.importorskip("pyarrow")
+    arrow_table = to_arrow(parse(SPANNED))
+    assert arrow_table.column_names == ["Year", "Votes / For", "Votes / Against"]
+    assert arrow_table.schema.field("Year").type == pyarrow.int64()
+    assert arrow_table.schema.field("Votes / Against").type == pyarrow.string()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import main
+from titles import AliasIndex, normalize_title
+
+PAGE = """<html><head><link rel="canonical" href="https://en.wikipedia.org/wiki/{canonical}"></head>
+<body><div id="mw-content-text"><div class="mw-parser-output"><p>{text}</p></div></div></body></html>"""
+
+
+@pytest.mark.parametrize("title, normalized", [
+    ("Albert_Einstein", "Albert_Einstein"),
+    ("albert  einstein", "Albert_einstein"),
+    (" :New York City#History ", "New_York_City"),
+    ("category: living people", "Category:Living_people"),
+    ("wp:About", "Wikipedia:About"),
+    ("Mission: Impossible", "Mission:_Impossible"),
+    ("ßeta", "ßeta"),
+    ("Left\u200eto\u00a0right", "Leftto_right"),
+])
+def test_normalize_title(title, normalized):
+    assert normalize_title(title) == normalized
+
+
+def test_aliases_are_learned_and_persisted(tmp_path):
+    path = str(tmp_path / "aliases.sqlite3")
+    index = AliasIndex(path, max_entries=1)
+
+    async def lookups():
+        assert await index.resolve("einstein") == "Einstein"
+        await index.learn(["einstein", "Albert einstein"], "Albert Einstein")
+        return [await index.resolve(title) for title in ("Einstein", "albert_einstein", "Albert Einstein")]
+
+    assert asyncio.run(lookups()) == ["Albert_Einstein"] * 3
+    assert index.stats["aliased"] == 2 and index.snapshot()["in_memory"] == 1
+    index.close()
+
+    # A new index reads them back from the database
+    reopened = AliasIndex(path)
+    assert asyncio.run(reopened.resolve("EINSTEIN")) == "EINSTEIN"
+    assert asyncio.run(reopened.resolve("einstein")) == "Albert_Einstein"
+    reopened.close()
+
+
+def test_old_aliases_are_not_used(tmp_path):
+    index = AliasIndex(str(tmp_path / "aliases.sqlite3"), ttl=0)
+
+    async def lookups():
+        await index.learn(["Einstein"], "Albert Einstein")
+        return await index.resolve("Einstein")
+
+    assert asyncio.run(lookups()) == "Einstein"
+    index.close()
+
+
+def test_redirects_share_one_cached_page(stub, run, monkeypatch):
+    """Once a redirect is known, requests for it are fetched and cached under the canonical title."""
+    monkeypatch.setattr(main, "title_aliases", AliasIndex(""))
+    stub.pages["Canonical_page"] = PAGE.format(canonical="Canonical_page", text="The page.")
+    stub.pages["Redirect_page"] = PAGE.format(canonical="Canonical_page", text="The page.")
+
+    async def requests():
+        first = await main.load_page_result("redirect page", {"introduction"})
+        before = dict(stub.stats)
+        again = [await main.load_page_result(title, {"introduction"})
+                 for title in ("Redirect_page", "Canonical page", "canonical_page")]
+        return first, again, before
+
+    first, again, before = run(requests())
+    assert again == [first] * 3
+    # The first request fetched the redirect; the others share one fetch of the canonical page
+    assert before == {"ok": 1}
+    assert stub.stats["ok"] == 2
+    assert main.title_aliases.stats["aliased"] == 1
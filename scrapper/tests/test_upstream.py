@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from config import WIKI_BASE_URL
+from upstream import AdaptiveLimiter, upstream
+
+URL = f"{WIKI_BASE_URL}/wiki/Albert_Einstein"
+
+
+def test_retries_transient_failures(stub, run):
+    stub.faults.update(error_rate=1.0, error_status=503)
+
+    async def fetch():
+        task = asyncio.ensure_future(upstream.get(URL))
+        await asyncio.sleep(0.05)
+        stub.faults["error_rate"] = 0.0
+        return await task
+
+    response = run(fetch())
+    assert response.status_code == 200
+    assert stub.stats["ok"] == 1 and stub.stats["error_503"] >= 1
+    assert upstream.limiter.in_flight == 0
+
+
+def test_gives_up_after_max_retries(stub, run):
+    stub.faults.update(error_rate=1.0, error_status=500)
+    response = run(upstream.get(URL))
+    assert response.status_code == 500
+    with pytest.raises(httpx.HTTPStatusError):
+        response.raise_for_status()
+
+
+def test_retry_after_pauses_new_requests(stub, run):
+    # The stub counts requests in one-second windows, so one pause of a second lets the third through
+    stub.faults.update(rate_limit=2, retry_after=1)
+
+    async def fetch_all():
+        started = time.monotonic()
+        responses = await asyncio.gather(*(upstream.get(URL) for _ in range(3)))
+        return responses, time.monotonic() - started
+
+    responses, elapsed = run(fetch_all())
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert stub.stats["rate_limited"] == 1
+    assert elapsed >= 1
+    assert upstream.limiter.limit < 16
+
+
+def test_cancelled_request_releases_its_slot(stub, run):
+    stub.faults.update(latency=0.5)
+
+    async def cancel_midway():
+        task = asyncio.ensure_future(upstream.get(URL))
+        await asyncio.sleep(0.1)
+        assert upstream.limiter.in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return upstream.limiter.in_flight
+
+    assert run(cancel_midway()) == 0
+
+
+def test_timed_out_requests_do_not_shrink_concurrency(stub, run):
+    stub.faults.update(latency=0.3)
+
+    async def time_out_many():
+        for _ in range(5):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(upstream.get(URL), 0.05)
+        stub.faults["latency"] = 0.0
+        return await asyncio.wait_for(upstream.get(URL), 5)
+
+    assert run(time_out_many()).status_code == 200
+    assert upstream.limiter.in_flight == 0
+
+
+def test_limiter_halves_on_throttling_and_grows_back():
+    async def exercise():
+        limiter = AdaptiveLimiter(8, 1, 16)
+        await limiter.acquire()
+        limiter.release(throttled=True)
+        halved = limiter.limit
+        for _ in range(8):
+            await limiter.acquire()
+            limiter.release()
+        return halved, limiter.limit
+
+    halved, grown = asyncio.run(exercise())
+    assert halved == 4
+    assert 5 < grown < 6
+
+
+def test_limiter_waits_for_a_free_slot():
+    async def exercise():
+        limiter = AdaptiveLimiter(1, 1, 1)
+        await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        blocked = not waiting.done()
+        limiter.release()
+        await asyncio.wait_for(waiting, 1)
+        return blocked, limiter.in_flight
+
+    assert asyncio.run(exercise()) == (True, 1)
@@ -0,0 +1,36 @@
+import pytest
+from bs4 import BeautifulSoup
+
+import main
+from fixtures import FIXTURE_DIR, load_fixtures
+from walker import VISITORS, walk_document
+
+FIXTURES = load_fixtures(FIXTURE_DIR)
+
+# The extractor each visitor replaces; tables only ever had the walker (see test_tables.py)
+LEGACY_EXTRACTORS = {
+    "introduction": main.extract_introduction,
+    "sections": main.extract_sections,
+    "images": main.extract_images,
+    "references": main.extract_references,
+    "external_links": main.extract_external_links,
+    "related_pages": main.extract_related_pages,
+    "lists": main.extract_lists,
+    "disambiguation_info": main.extract_disambiguation,
+    "media": main.extract_media,
+    "page_stats": main.extract_page_stats,
+}
+
+
+def test_every_visitor_has_a_legacy_extractor():
+    assert set(VISITORS) == set(LEGACY_EXTRACTORS) | {"tables"}
+
+
+@pytest.mark.parametrize("title", sorted(FIXTURES))
+def test_walk_matches_the_legacy_extractors(title):
+    soup = BeautifulSoup(FIXTURES[title], "html.parser")
+    walked = walk_document(soup)
+    for name, extract in LEGACY_EXTRACTORS.items():
+        assert walked[name] == extract(soup), name
+    # A walk over a subset of visitors gives the same values
+    assert walk_document(soup, ["sections", "media"]) == {name: walked[name] for name in ("sections", "media")}
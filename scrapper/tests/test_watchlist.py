@@ -0,0 +1,74 @@
+from watchlist import Watchlist
+
+PAGE = """<html><head><script>RLCONF={{"wgRevisionId":{revision}}};</script></head>
+<body><p>Revision {revision}</p></body></html>"""
+
+
+def edit(stub, title, revision):
+    with stub.lock:
+        stub.pages[title] = PAGE.format(revision=revision)
+        stub.parse_results.pop(title, None)
+
+
+def test_only_changed_pages_are_scraped_within_the_budget(stub, run, tmp_path):
+    edit(stub, "Watched_one", 1)
+    edit(stub, "Watched_two", 1)
+    scraped = []
+
+    async def scrape(title):
+        scraped.append(title)
+
+    watchlist = Watchlist(str(tmp_path / "watchlist.sqlite3"), scrape, budget=1)
+
+    async def cycles():
+        assert await watchlist.add(["Watched_one", "watched two", "Never_existed", " "]) == 3
+        assert await watchlist.add(["Watched_one"]) == 0
+        reports = [await watchlist.refresh(), await watchlist.refresh(), await watchlist.refresh()]
+        edit(stub, "Watched_two", 2)
+        reports.append(await watchlist.refresh())
+        return reports, await watchlist.snapshot()
+
+    reports, snapshot = run(cycles())
+    counts = [{name: report[name] for name in ("checked", "missing", "changed", "scraped", "deferred")}
+              for report in reports]
+    assert counts == [
+        {"checked": 3, "missing": 1, "changed": 2, "scraped": 1, "deferred": 1},
+        {"checked": 3, "missing": 1, "changed": 1, "scraped": 1, "deferred": 0},
+        {"checked": 3, "missing": 1, "changed": 0, "scraped": 0, "deferred": 0},
+        {"checked": 3, "missing": 1, "changed": 1, "scraped": 1, "deferred": 0},
+    ]
+    assert scraped == ["Watched_one", "Watched_two", "Watched_two"]
+    assert (snapshot["watched"], snapshot["changed"], snapshot["missing"]) == (3, 0, 1)
+
+
+def test_failed_scrapes_are_retried_next_cycle(stub, run, tmp_path):
+    edit(stub, "Flaky_page", 1)
+    failures = [RuntimeError("extraction failed")]
+
+    async def scrape(title):
+        if failures:
+            raise failures.pop()
+
+    watchlist = Watchlist(str(tmp_path / "watchlist.sqlite3"), scrape)
+
+    async def cycles():
+        await watchlist.add(["Flaky_page"])
+        first = await watchlist.refresh()
+        failed = (await watchlist.snapshot())["failed"]
+        return first, failed, await watchlist.refresh(), await watchlist.snapshot()
+
+    first, failed, second, snapshot = run(cycles())
+    assert (first["scrape_failures"], failed) == (1, 1)
+    assert second["scraped"] == 1 and (snapshot["changed"], snapshot["failed"]) == (0, 0)
+
+
+def test_check_failures_are_counted(stub, run, tmp_path):
+    stub.faults.update(error_rate=1.0, error_status=500)
+    watchlist = Watchlist(str(tmp_path / "watchlist.sqlite3"))
+
+    async def cycle():
+        await watchlist.add(["Tiger"])
+        return await watchlist.refresh()
+
+    report = run(cycle())
+    assert (report["checked"], report["check_failures"]) == (0, 1)
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import TITLE_ALIAS_DB, TITLE_ALIAS_CACHE_ENTRIES, TITLE_ALIAS_TTL
+
+# Page titles as MediaWiki identifies them. normalize_title() applies the title rules
+# (underscores and runs of spaces, the first letter, namespace names), so "Albert_Einstein"
+# and "albert  Einstein" are one page. Redirects such as "Einstein", and spellings that only
+# the wiki can tell apart, are learned instead: AliasIndex remembers the canonical title each
+# fetched title led to, so the next request for it is fetched and cached under that title.
+#
+#   python titles.py "albert einstein" Einstein
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,     -- a normalized title that was requested
+    title TEXT NOT NULL,        -- the canonical title its page had
+    learned_at REAL NOT NULL
+);
+"""
+
+# Namespace names and aliases of the English Wikipedia, by their lowercase form
+NAMESPACES: Dict[str, str] = {name.lower(): name for name in (
+    "Media", "Special", "Talk", "User", "User talk", "Wikipedia", "Wikipedia talk", "File", "File talk",
+    "MediaWiki", "MediaWiki talk", "Template", "Template talk", "Help", "Help talk", "Category",
+    "Category talk", "Portal", "Portal talk", "Draft", "Draft talk", "Module", "Module talk",
+)}
+NAMESPACES.update({"image": "File", "image talk": "File talk", "project": "Wikipedia",
+                   "project talk": "Wikipedia talk", "wp": "Wikipedia", "wt": "Wikipedia talk"})
+
+# The characters MediaWiki treats as spaces in titles, and the direction marks it drops
+SPACES_RE = re.compile('[ _\u00a0\u1680\u180e\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+')
+DIRECTION_MARKS_RE = re.compile('[\u200e\u200f\u202a-\u202e]')
+
+
+def _capitalize(text: str) -> str:
+    # Letters whose uppercase form is longer (like "ß") are left as they are
+    first = text[:1].upper()
+    return first + text[1:] if len(first) == 1 else text
+
+
+def normalize_title(title: str) -> str:
+    """A title in MediaWiki's canonical key form, e.g. "category: living people" -> "Category:Living_people".
+
+    The fragment is dropped, since it names a place on the page and not a page.
+    """
+    title = DIRECTION_MARKS_RE.sub('', title.split('#', 1)[0])
+    title = SPACES_RE.sub(' ', title).strip().lstrip(':').strip()
+    prefix, colon, rest = title.partition(':')
+    namespace = NAMESPACES.get(prefix.strip().lower()) if colon else None
+    if namespace is not None:
+        title = f"{namespace}:{_capitalize(rest.strip())}"
+    else:
+        title = _capitalize(title)
+    return title.replace(' ', '_')
+
+
+class AliasIndex:
+    """Normalized titles mapped to the canonical titles their pages have, stored in SQLite.
+
+    Up to `max_entries` recently used mappings are also kept in memory. A mapping older than
+    `ttl` seconds is not used, so a redirect that was pointed elsewhere is fetched again.
+    """
+
+    def __init__(self, path: str = TITLE_ALIAS_DB, max_entries: int = TITLE_ALIAS_CACHE_ENTRIES,
+                 ttl: float = TITLE_ALIAS_TTL):
+        self.path = path or ":memory:"
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "aliased": 0, "learned": 0}
+
+    # --- Storage ---
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use, so importing the module creates no files
+        if self._db is None:
+            if self.path != ":memory:" and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _read(self, alias: str) -> Optional[Tuple[str, float]]:
+        with self._db_lock:
+            row = self._connect().execute("SELECT title, learned_at FROM aliases WHERE alias = ?", (alias,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _write(self, rows: List[Tuple[str, str, float]]):
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.executemany("INSERT OR REPLACE INTO aliases (alias, title, learned_at) VALUES (?, ?, ?)", rows)
+
+    def _remember(self, alias: str, entry: Tuple[str, float]):
+        self._entries[alias] = entry
+        self._entries.move_to_end(alias)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _fresh(self, entry: Optional[Tuple[str, float]]) -> bool:
+        return entry is not None and time.time() - entry[1] < self.ttl
+
+    # --- Lookups ---
+
+    async def resolve(self, title: str) -> str:
+        """The canonical title a title is known to lead to, or else the title itself, normalized."""
+        alias = normalize_title(title)
+        entry = self._entries.get(alias)
+        if entry is None:
+            entry = await asyncio.to_thread(self._read, alias)
+            if entry is not None:
+                self._remember(alias, entry)
+        else:
+            self._entries.move_to_end(alias)
+        if not self._fresh(entry):
+            self.stats["misses"] += 1
+            return alias
+        self.stats["hits"] += 1
+        if entry[0] != alias:
+            self.stats["aliased"] += 1
+        return entry[0]
+
+    async def learn(self, titles: Iterable[str], canonical: str):
+        """Record that fetching each of `titles` gave the page whose canonical title is `canonical`."""
+        canonical = normalize_title(canonical)
+        now = time.time()
+        rows = []
+        for alias in {normalize_title(title) for title in titles} | {canonical}:
+            entry = self._entries.get(alias)
+            if entry is not None and entry[0] == canonical and self._fresh(entry):
+                continue
+            rows.append((alias, canonical, now))
+            self._remember(alias, (canonical, now))
+        if rows:
+            self.stats["learned"] += len(rows)
+            await asyncio.to_thread(self._write, rows)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.stats, in_memory=len(self._entries))
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+title_aliases = AliasIndex()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize titles and look them up in the alias index")
+    parser.add_argument("titles", nargs="+")
+    parser.add_argument("--db", default=TITLE_ALIAS_DB, help="alias database")
+    args = parser.parse_args()
+
+    index = AliasIndex(args.db)
+    for title in args.titles:
+        print(f"{title}\t{normalize_title(title)}\t{asyncio.run(index.resolve(title))}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
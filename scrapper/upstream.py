@@ -0,0 +1,203 @@
+import asyncio
+import email.utils
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+import httpx # type: ignore
+
+from config import (
+    UPSTREAM_RATE, UPSTREAM_BURST, UPSTREAM_INITIAL_CONCURRENCY, UPSTREAM_MIN_CONCURRENCY,
+    UPSTREAM_MAX_CONCURRENCY, UPSTREAM_MAX_RETRIES, UPSTREAM_BACKOFF_BASE, UPSTREAM_BACKOFF_MAX,
+    UPSTREAM_RETRY_AFTER_MAX
+)
+from http_client import get_client
+
+# Policy for every request to Wikipedia: a token-bucket rate limit, a concurrency limit
+# that adapts to throttling (additive increase, multiplicative decrease), Retry-After
+# pauses and jittered exponential backoff between retries.
+
+# Responses that mean "slow down" and shrink the concurrency limit
+THROTTLE_STATUSES = (429, 503)
+# Responses worth retrying; anything else is returned to the caller as is
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # The lock makes waiters take tokens in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that grows by about one per limit's worth of successes and halves on throttling.
+
+    A Retry-After from upstream also pauses every new request until it has passed.
+    release() never waits, so a request being cancelled can always give its slot back.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        while True:
+            pause = self.paused_until - time.monotonic()
+            if pause <= 0 and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            # Wake up when the pause ends, or earlier if something changes
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, pause if pause > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if not waiter.done():
+                    self._waiters.remove(waiter)
+
+    def release(self, throttled: bool = False, retry_after: Optional[float] = None):
+        self.in_flight -= 1
+        if throttled:
+            self.limit = max(self.minimum, self.limit / 2)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """The delay asked for by a Retry-After header (seconds or an HTTP date), capped."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), UPSTREAM_RETRY_AFTER_MAX)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry (1 for the first)."""
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+class UpstreamPolicy:
+    """Applies the rate limit, adaptive concurrency and retries to upstream GETs."""
+
+    def __init__(self):
+        self._loop = None
+        self._reset()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "transport_errors": 0}
+
+    def _reset(self):
+        self.bucket = TokenBucket(UPSTREAM_RATE, UPSTREAM_BURST)
+        self.limiter = AdaptiveLimiter(UPSTREAM_INITIAL_CONCURRENCY, UPSTREAM_MIN_CONCURRENCY,
+                                       UPSTREAM_MAX_CONCURRENCY)
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET a URL, retrying transient failures; raises httpx.HTTPError once retries run out.
+
+        The last response is returned even when its status is an error, so callers can
+        still use raise_for_status() as with a plain client.
+        """
+        return await self._send(url, headers, stream=False)
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict[str, str]] = None) -> AsyncIterator[httpx.Response]:
+        """Like get(), but the body is left for the caller to read as it arrives.
+
+        Only failures before the body starts are retried. The response is closed on exit.
+        """
+        response = await self._send(url, headers, stream=True)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def _send(self, url: str, headers: Optional[Dict[str, str]], stream: bool) -> httpx.Response:
+        # asyncio primitives belong to one event loop; start afresh if it changed
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._reset()
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            await self.limiter.acquire()
+            self.stats["requests"] += 1
+            response = None
+            throttled, retry_after = False, None
+            # The slot goes back however the send ends, including by cancellation
+            try:
+                client = get_client()
+                response = await client.send(client.build_request("GET", url, headers=headers), stream=stream)
+                throttled = response.status_code in THROTTLE_STATUSES
+                retry_after = retry_after_seconds(response) if throttled else None
+            except httpx.TransportError:
+                self.stats["transport_errors"] += 1
+                if attempt >= UPSTREAM_MAX_RETRIES:
+                    raise
+            finally:
+                self.limiter.release(throttled, retry_after)
+            if response is None:
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            if throttled:
+                self.stats["throttled"] += 1
+            if response.status_code not in RETRY_STATUSES or attempt >= UPSTREAM_MAX_RETRIES:
+                return response
+            if stream:
+                await response.aclose()
+            attempt += 1
+            self.stats["retries"] += 1
+            # The limiter already waits out a Retry-After; otherwise back off with jitter
+            if retry_after is None:
+                await asyncio.sleep(backoff_delay(attempt))
+
+    def snapshot(self) -> Dict[str, float]:
+        """Counters plus the current concurrency limit, for the stats endpoint."""
+        return dict(self.stats, concurrency_limit=round(self.limiter.limit, 2), in_flight=self.limiter.in_flight,
+                    paused_for=round(max(0.0, self.limiter.paused_until - time.monotonic()), 3))
+
+
+upstream = UpstreamPolicy()
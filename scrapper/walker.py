@@ -0,0 +1,363 @@
+from bs4 import Tag # type: ignore
+from typing import Dict, List, Any, Optional, Iterable, NamedTuple
+from time import perf_counter
+from urllib.parse import urljoin
+
+from models import ExternalLink, Image, PageStats, RelatedPage, Section
+from tables import parse_table, table_kind
+
+
+class WalkContext(NamedTuple):
+    """Where an element sits in the page, derived from its ancestors."""
+    in_content: bool = False            # below #mw-content-text
+    in_parser_output: bool = False      # below any .mw-parser-output
+    in_article_body: bool = False       # below the first .mw-parser-output of #mw-content-text
+    parent_is_article_output: bool = False  # parent is a .mw-parser-output inside #mw-content-text
+
+
+class SoupDom:
+    """Element accessors used by the walker and visitors for a BeautifulSoup tree.
+
+    Other tree types (see parsing.LxmlDom) provide the same methods. Element text is
+    memoized so several visitors can share it.
+    """
+
+    def __init__(self):
+        self._texts: Dict[int, str] = {}
+
+    def roots(self, document: Any) -> List[Tag]:
+        return self.children(document)
+
+    def name(self, element: Tag) -> str:
+        return element.name
+
+    def get(self, element: Tag, attr: str, default: Any = None) -> Any:
+        return element.get(attr, default)
+
+    def classes(self, element: Tag) -> Iterable[str]:
+        return element.get('class') or ()
+
+    def children(self, element: Tag) -> List[Tag]:
+        return [child for child in element.contents if isinstance(child, Tag)]
+
+    def find(self, element: Tag, name: str) -> Optional[Tag]:
+        return element.find(name)
+
+    def descendants(self, element: Tag, name: str) -> List[Tag]:
+        return element.find_all(name)
+
+    def html(self, element: Tag) -> str:
+        return str(element)
+
+    def text(self, element: Tag) -> str:
+        key = id(element)
+        text = self._texts.get(key)
+        if text is None:
+            text = element.get_text(strip=True)
+            self._texts[key] = text
+        return text
+
+
+class Visitor:
+    """Base class for the per-element collectors driven by walk_document.
+
+    `tags` limits which element names are dispatched to the visitor; None means every element.
+    """
+    name = ""
+    tags: Optional[Iterable[str]] = None
+
+    def visit(self, element: Any, ctx: WalkContext, dom: SoupDom):
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        raise NotImplementedError
+
+
+class IntroductionVisitor(Visitor):
+    """First non-empty `#mw-content-text .mw-parser-output > p` (extract_introduction)."""
+    name = "introduction"
+    tags = ("p",)
+
+    def __init__(self):
+        self.introduction = ""
+
+    def visit(self, element, ctx, dom):
+        if not self.introduction and ctx.parent_is_article_output:
+            self.introduction = dom.text(element)
+
+    def result(self):
+        return self.introduction
+
+
+class SectionsVisitor(Visitor):
+    """Headings and their text below the article body (extract_sections)."""
+    name = "sections"
+    tags = ("h2", "h3", "h4", "p", "ul", "ol")
+
+    def __init__(self):
+        self.sections: List[Section] = []
+        self.current_section: Optional[Section] = None
+
+    def visit(self, element, ctx, dom):
+        if not ctx.in_article_body:
+            return
+        if dom.name(element) in ("h2", "h3", "h4"):
+            if self.current_section:
+                self.sections.append(self.current_section)
+            self.current_section = Section(dom.text(element), "")
+        elif self.current_section:
+            self.current_section.content += dom.text(element) + "\n"
+
+    def result(self):
+        if self.current_section:
+            self.sections.append(self.current_section)
+            self.current_section = None
+        return self.sections
+
+
+class ImagesVisitor(Visitor):
+    """`.mw-parser-output img` with a src (extract_images)."""
+    name = "images"
+    tags = ("img",)
+
+    def __init__(self):
+        self.images: List[Image] = []
+
+    def visit(self, element, ctx, dom):
+        if not ctx.in_parser_output:
+            return
+        src = dom.get(element, 'src')
+        if src:
+            self.images.append(Image(urljoin('https:', src), dom.get(element, 'alt', '')))
+
+    def result(self):
+        return self.images
+
+
+class TablesVisitor(Visitor):
+    """Headers and typed rows of every data table (see tables.parse_table).
+
+    Navboxes, infoboxes, sidebars, message boxes and layout tables are skipped, and so
+    is every table nested inside another; its text is part of the outer table's cells.
+    """
+    name = "tables"
+    tags = ("table",)
+
+    def __init__(self):
+        self.tables: List[Dict[str, Any]] = []
+        self._nested = set()
+        # Keep nested elements alive so their ids are not reused
+        self._nested_elements: List[Any] = []
+
+    def visit(self, element, ctx, dom):
+        if id(element) in self._nested:
+            return
+        nested = dom.descendants(element, 'table')
+        self._nested.update(id(table) for table in nested)
+        self._nested_elements.extend(nested)
+        if table_kind(element, dom) is None:
+            table = parse_table(element, dom)
+            if table is not None:
+                self.tables.append(table)
+
+    def result(self):
+        return self.tables
+
+
+class ReferencesVisitor(Visitor):
+    """Text of every `li[id^=cite_note]` (extract_references)."""
+    name = "references"
+    tags = ("li",)
+
+    def __init__(self):
+        self.references: List[str] = []
+
+    def visit(self, element, ctx, dom):
+        element_id = dom.get(element, 'id')
+        if element_id and element_id.startswith('cite_note'):
+            self.references.append(dom.text(element))
+
+    def result(self):
+        return self.references
+
+
+class ExternalLinksVisitor(Visitor):
+    """`#mw-content-text a[href^="http"]` with text (extract_external_links)."""
+    name = "external_links"
+    tags = ("a",)
+
+    def __init__(self):
+        self.links: List[ExternalLink] = []
+
+    def visit(self, element, ctx, dom):
+        if not ctx.in_content:
+            return
+        href = dom.get(element, 'href')
+        if href and href.startswith('http'):
+            link_text = dom.text(element)
+            if link_text:
+                self.links.append(ExternalLink(link_text, href))
+
+    def result(self):
+        return self.links
+
+
+class RelatedPagesVisitor(Visitor):
+    """`#mw-content-text a[href^="/wiki/"]` outside other namespaces (extract_related_pages)."""
+    name = "related_pages"
+    tags = ("a",)
+
+    def __init__(self):
+        self.related: List[RelatedPage] = []
+
+    def visit(self, element, ctx, dom):
+        if not ctx.in_content:
+            return
+        href = dom.get(element, 'href')
+        if href and href.startswith('/wiki/') and ':' not in href:
+            full_url = urljoin('https://en.wikipedia.org', href)
+            self.related.append(RelatedPage(dom.text(element), full_url))
+
+    def result(self):
+        return self.related
+
+
+class ListsVisitor(Visitor):
+    """Text of every `.mw-parser-output ul` (extract_lists)."""
+    name = "lists"
+    tags = ("ul",)
+
+    def __init__(self):
+        self.lists: List[str] = []
+
+    def visit(self, element, ctx, dom):
+        if ctx.in_parser_output:
+            self.lists.append(dom.text(element))
+
+    def result(self):
+        return self.lists
+
+
+class HatnotesVisitor(Visitor):
+    """Text of every `.hatnote` (extract_disambiguation)."""
+    name = "disambiguation_info"
+
+    def __init__(self):
+        self.notes: List[str] = []
+
+    def visit(self, element, ctx, dom):
+        if 'hatnote' in dom.classes(element):
+            self.notes.append(dom.text(element))
+
+    def result(self):
+        return self.notes
+
+
+class MediaVisitor(Visitor):
+    """Source URL of every `<audio>` (extract_media)."""
+    name = "media"
+    tags = ("audio",)
+
+    def __init__(self):
+        self.media: List[str] = []
+
+    def visit(self, element, ctx, dom):
+        source = dom.find(element, 'source')
+        if source is not None and dom.get(source, 'src'):
+            self.media.append(urljoin('https:', dom.get(source, 'src')))
+
+    def result(self):
+        return self.media
+
+
+class PageStatsVisitor(Visitor):
+    """Paragraph, image and heading counts for the whole document (extract_page_stats)."""
+    name = "page_stats"
+    tags = ("p", "img", "h2", "h3")
+
+    def __init__(self):
+        self.counts = {"p": 0, "img": 0, "h2": 0, "h3": 0}
+
+    def visit(self, element, ctx, dom):
+        self.counts[dom.name(element)] += 1
+
+    def result(self):
+        return PageStats(self.counts["p"], self.counts["img"], self.counts["h2"] + self.counts["h3"])
+
+
+# Visitors run by walk_document, keyed by the result field they produce
+VISITORS: Dict[str, type] = {}
+
+
+def register_visitor(visitor_class: type) -> type:
+    """Register a Visitor subclass under its `name` so walk_document runs it."""
+    VISITORS[visitor_class.name] = visitor_class
+    return visitor_class
+
+
+for _visitor_class in (IntroductionVisitor, SectionsVisitor, ImagesVisitor, TablesVisitor,
+                       ReferencesVisitor, ExternalLinksVisitor, RelatedPagesVisitor,
+                       ListsVisitor, HatnotesVisitor, MediaVisitor, PageStatsVisitor):
+    register_visitor(_visitor_class)
+
+
+def _timed(visit, timings: Dict[str, float], name: str):
+    def timed_visit(element, ctx, dom):
+        started = perf_counter()
+        visit(element, ctx, dom)
+        timings[name] = timings.get(name, 0.0) + perf_counter() - started
+    return timed_visit
+
+
+def walk_document(root: Any, names: Optional[Iterable[str]] = None, dom: Optional[SoupDom] = None,
+                  timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Walk the parsed page once and return the output of each registered visitor.
+
+    Produces the same values as the matching extract_* functions, which each scan the whole
+    tree on their own. `names` restricts the walk to a subset of visitors; `dom` supplies the
+    element accessors when `root` is not a BeautifulSoup tree. When `timings` is given, the
+    seconds spent in each visitor are added to it.
+    """
+    if dom is None:
+        dom = SoupDom()
+    visitors = [VISITORS[name]() for name in (VISITORS if names is None else names)]
+    if timings is not None:
+        for visitor in visitors:
+            visitor.visit = _timed(visitor.visit, timings, visitor.name)
+    by_tag: Dict[str, List[Visitor]] = {}
+    any_tag: List[Visitor] = []
+    for visitor in visitors:
+        if visitor.tags is None:
+            any_tag.append(visitor)
+        else:
+            for tag in visitor.tags:
+                by_tag.setdefault(tag, []).append(visitor)
+
+    article_body_found = False
+    root_ctx = WalkContext()
+    stack = [(child, root_ctx) for child in reversed(dom.roots(root))]
+    while stack:
+        element, ctx = stack.pop()
+
+        for visitor in by_tag.get(dom.name(element), ()):
+            visitor.visit(element, ctx, dom)
+        for visitor in any_tag:
+            visitor.visit(element, ctx, dom)
+
+        # Work out the context the children of this element are walked with
+        is_parser_output = 'mw-parser-output' in dom.classes(element)
+        is_article_output = is_parser_output and ctx.in_content
+        starts_body = is_article_output and not article_body_found
+        if starts_body:
+            article_body_found = True
+        child_ctx = WalkContext(
+            ctx.in_content or dom.get(element, 'id') == 'mw-content-text',
+            ctx.in_parser_output or is_parser_output,
+            ctx.in_article_body or starts_body,
+            is_article_output
+        )
+
+        for child in reversed(dom.children(element)):
+            stack.append((child, child_ctx))
+
+    return {visitor.name: visitor.result() for visitor in visitors}
@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx # type: ignore
+
+from config import (
+    WATCHLIST_DB, WATCHLIST_INTERVAL, WATCHLIST_REFRESH_BUDGET, WATCHLIST_CHECK_CONCURRENCY,
+    WATCHLIST_SCRAPE_CONCURRENCY
+)
+from mediawiki import QUERY_BATCH_SIZE, api_response, latest_revisions, revisions_api_url
+from titles import normalize_title
+from upstream import upstream
+
+# Keeps a set of titles fresh without re-scraping all of them. A refresh cycle first asks
+# the API for the latest revision of every title, QUERY_BATCH_SIZE titles per request, and
+# then re-scrapes only the pages whose revision changed, at most `budget` of them; the rest
+# wait for the next cycle, oldest change first.
+#
+#   python watchlist.py add titles.txt
+#   python watchlist.py run [--once]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    title TEXT PRIMARY KEY,
+    scraped_revision INTEGER,   -- revision of the last successful scrape
+    latest_revision INTEGER,    -- newest revision seen by a check
+    checked_at REAL,
+    changed_at REAL,            -- set while latest_revision is ahead of scraped_revision
+    scraped_at REAL,
+    missing INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_changed ON pages (changed_at) WHERE changed_at IS NOT NULL;
+"""
+
+Scraper = Callable[[str], Awaitable[Any]]
+
+
+class Watchlist:
+    """Titles to keep fresh, with their last known revisions, stored in SQLite.
+
+    `scrape` re-runs the extraction pipeline for one title (main.py passes one that
+    bypasses the page cache's freshness window).
+    """
+
+    def __init__(self, path: str = WATCHLIST_DB, scrape: Optional[Scraper] = None,
+                 budget: int = WATCHLIST_REFRESH_BUDGET, check_concurrency: int = WATCHLIST_CHECK_CONCURRENCY,
+                 scrape_concurrency: int = WATCHLIST_SCRAPE_CONCURRENCY):
+        self.path = path
+        self.scrape = scrape
+        self.budget = budget
+        self.check_concurrency = check_concurrency
+        self.scrape_concurrency = scrape_concurrency
+        self.last_cycle: Dict[str, Any] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._refreshing: Optional[asyncio.Lock] = None
+
+    # --- Storage ---
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use, so importing the module creates no files
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _run(self, statement: str, rows: Iterable[tuple] = ((),), many: bool = False) -> List[tuple]:
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                if many:
+                    db.executemany(statement, rows)
+                    return []
+                return db.execute(statement, next(iter(rows))).fetchall()
+
+    async def _query(self, statement: str, *params: Any) -> List[tuple]:
+        return await asyncio.to_thread(self._run, statement, (params,))
+
+    async def _update(self, statement: str, rows: List[tuple]):
+        await asyncio.to_thread(self._run, statement, rows, True)
+
+    async def add(self, titles: Iterable[str]) -> int:
+        """Start watching titles; returns how many were not watched yet."""
+        before = (await self._query("SELECT COUNT(*) FROM pages"))[0][0]
+        await self._update("INSERT OR IGNORE INTO pages (title) VALUES (?)",
+                           [(normalize_title(title),) for title in titles if title.strip()])
+        return (await self._query("SELECT COUNT(*) FROM pages"))[0][0] - before
+
+    async def remove(self, titles: Iterable[str]) -> int:
+        """Stop watching titles; returns how many were removed."""
+        before = (await self._query("SELECT COUNT(*) FROM pages"))[0][0]
+        await self._update("DELETE FROM pages WHERE title = ?", [(normalize_title(title),) for title in titles])
+        return before - (await self._query("SELECT COUNT(*) FROM pages"))[0][0]
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Counts of watched, changed, missing and unchecked titles, plus the last cycle's report."""
+        watched, changed, missing, unchecked, failed = (await self._query(
+            "SELECT COUNT(*), COUNT(changed_at), SUM(missing), COUNT(*) - COUNT(checked_at), COUNT(error) FROM pages"
+        ))[0]
+        return {"watched": watched, "changed": changed, "missing": missing or 0, "unchecked": unchecked,
+                "failed": failed, "refreshing": self.refreshing, "last_cycle": self.last_cycle}
+
+    # --- Refresh cycle ---
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refreshing is not None and self._refreshing.locked()
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Run one refresh cycle: check every title's revision, then re-scrape changed pages."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.Lock()
+        async with self._refreshing:
+            started = time.time()
+            report = {"started_at": started, "checked": 0, "changed": 0, "missing": 0, "check_failures": 0,
+                      "scraped": 0, "scrape_failures": 0, "deferred": 0}
+            await self._check_revisions(report)
+            await self._scrape_changed(report)
+            report["seconds"] = round(time.time() - started, 3)
+            self.last_cycle = report
+            return report
+
+    async def _check_revisions(self, report: Dict[str, Any]):
+        titles = [row[0] for row in await self._query(
+            "SELECT title FROM pages ORDER BY checked_at IS NOT NULL, checked_at")]
+        batches = [titles[i:i + QUERY_BATCH_SIZE] for i in range(0, len(titles), QUERY_BATCH_SIZE)]
+        limit = asyncio.Semaphore(self.check_concurrency)
+
+        async def check(batch: List[str]):
+            async with limit:
+                try:
+                    revisions = latest_revisions(api_response(await upstream.get(revisions_api_url(batch))), batch)
+                except (httpx.HTTPError, ValueError, KeyError):
+                    report["check_failures"] += len(batch)
+                    return
+            now = time.time()
+            found = [(revision, now, revision, now, title) for title, revision in revisions.items() if revision is not None]
+            gone = [(now, title) for title, revision in revisions.items() if revision is None]
+            # A page counts as changed from the first check that sees a revision it was not scraped at
+            await self._update(
+                "UPDATE pages SET latest_revision = ?, checked_at = ?, missing = 0,"
+                " changed_at = CASE WHEN scraped_revision IS ? THEN NULL ELSE COALESCE(changed_at, ?) END"
+                " WHERE title = ?", found)
+            await self._update(
+                "UPDATE pages SET checked_at = ?, missing = 1, changed_at = NULL WHERE title = ?", gone)
+            report["checked"] += len(batch)
+            report["missing"] += len(gone)
+
+        await asyncio.gather(*(check(batch) for batch in batches))
+
+    async def _scrape_changed(self, report: Dict[str, Any]):
+        report["changed"] = (await self._query("SELECT COUNT(changed_at) FROM pages"))[0][0]
+        if self.scrape is None or self.budget <= 0:
+            report["deferred"] = report["changed"]
+            return
+        changed = await self._query(
+            "SELECT title, latest_revision FROM pages WHERE changed_at IS NOT NULL ORDER BY changed_at LIMIT ?",
+            self.budget)
+        report["deferred"] = report["changed"] - len(changed)
+        limit = asyncio.Semaphore(self.scrape_concurrency)
+
+        async def scrape(title: str, revision: int):
+            async with limit:
+                try:
+                    await self.scrape(title)
+                except Exception as e:
+                    report["scrape_failures"] += 1
+                    await self._update("UPDATE pages SET error = ? WHERE title = ?", [(f"{type(e).__name__}: {e}", title)])
+                    return
+            # A check may have seen a newer revision meanwhile; then the page stays changed
+            await self._update(
+                "UPDATE pages SET scraped_revision = ?, scraped_at = ?, error = NULL,"
+                " changed_at = CASE WHEN latest_revision IS ? THEN NULL ELSE changed_at END WHERE title = ?",
+                [(revision, time.time(), revision, title)])
+            report["scraped"] += 1
+
+        await asyncio.gather(*(scrape(title, revision) for title, revision in changed))
+
+    async def run_forever(self, interval: float = WATCHLIST_INTERVAL):
+        """Refresh every `interval` seconds, measured from the start of each cycle."""
+        while True:
+            started = time.monotonic()
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep the schedule going; the failure shows up in the stats
+                self.last_cycle = {"started_at": time.time(), "error": f"{type(e).__name__}: {e}"}
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep watched titles fresh, re-scraping only changed pages")
+    parser.add_argument("--db", default=WATCHLIST_DB, help="watchlist database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("add", "remove"):
+        command = commands.add_parser(name, help=f"{name} titles, one per line")
+        command.add_argument("file", nargs="?", default="-", help="file of titles (default: stdin)")
+    run = commands.add_parser("run", help="run refresh cycles")
+    run.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    run.add_argument("--interval", type=float, default=WATCHLIST_INTERVAL or 600, help="seconds between cycles")
+    run.add_argument("--budget", type=int, default=WATCHLIST_REFRESH_BUDGET, help="most re-scrapes per cycle")
+    commands.add_parser("stats", help="print watchlist counts")
+    args = parser.parse_args()
+
+    from main import refresh_page  # main.py imports this module
+    watchlist = Watchlist(args.db, refresh_page, budget=getattr(args, "budget", WATCHLIST_REFRESH_BUDGET))
+
+    async def run_command():
+        if args.command in ("add", "remove"):
+            with (sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")) as f:
+                titles = [line.strip() for line in f if line.strip()]
+            count = await (watchlist.add(titles) if args.command == "add" else watchlist.remove(titles))
+            print(f"{count} titles {'added' if args.command == 'add' else 'removed'}")
+        elif args.command == "run" and args.once:
+            print(json.dumps(await watchlist.refresh()))
+        elif args.command == "run":
+            await watchlist.run_forever(args.interval)
+        else:
+            print(json.dumps(await watchlist.snapshot()))
+
+    asyncio.run(run_command())
+
+
+if __name__ == "__main__":
+    main()